@@ -1,14 +1,32 @@
 import streamlit as st
-import pandas as pd
-import altair as alt
 from datetime import datetime, timedelta
 import os
 import sys
 import json
-import requests
-from io import BytesIO
 import time
-import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Importa o módulo de dados do Jira (mesma estratégia de caminhos do ia.py)
+try:
+    from jira_utils import (obter_snapshot, montar_tarefas, calcular_pacote_metricas, filtrar_tarefas,
+                            adicionar_colunas_temporais, requisitar_jira, buscar_facetas, valor_jql,
+                            CAMPOS_FILTRO_JQL, MAX_CONEXOES_JIRA, INTERVALO_ATUALIZACAO)
+    from export_utils import FORMATOS_EXPORTACAO, exportar_para_arquivo, nome_arquivo
+    from cache_utils import exibir_grafico_memorizado, cache_data_medido
+    from metricas_utils import registrar_cache
+    from sessao_utils import registrar_chaves_sessao
+    from perf_utils import fragmento
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from jira_utils import (obter_snapshot, montar_tarefas, calcular_pacote_metricas, filtrar_tarefas,
+                            adicionar_colunas_temporais, requisitar_jira, buscar_facetas, valor_jql,
+                            CAMPOS_FILTRO_JQL, MAX_CONEXOES_JIRA, INTERVALO_ATUALIZACAO)
+    from export_utils import FORMATOS_EXPORTACAO, exportar_para_arquivo, nome_arquivo
+    from cache_utils import exibir_grafico_memorizado, cache_data_medido
+    from metricas_utils import registrar_cache
+    from sessao_utils import registrar_chaves_sessao
+    from perf_utils import fragmento
 
 # Função para adicionar CSS personalizado
 def local_css():
@@ -141,15 +159,26 @@ def local_css():
 # Aplicar CSS
 local_css()
 
+# Quantidade máxima de combinações de filtro com métricas guardadas por sessão
+MAX_PACOTES_METRICAS = 16
+
+# Montados juntos a partir dos snapshots e despejados um a um das sessões paradas: faltando
+# qualquer um, os dois são remontados. jira_dados só referencia os snapshots do processo
+DADOS_REMONTAVEIS = ['jira_df', 'jira_worklogs']
+registrar_chaves_sessao(recarregaveis=DADOS_REMONTAVEIS + ['jira_pacotes'], compartilhadas=['jira_dados'])
+
+# Opção do filtro de responsável na consulta que vira o accountId do usuário conectado no JQL
+RESPONSAVEL_EU = "Eu (usuário conectado)"
+
 # ======= FUNÇÕES DE UTILIDADE =======
 
-@st.cache_data(ttl=3600)  # Cache por 1 hora
+@cache_data_medido('conectar_jira', ttl=3600)  # Cache por 1 hora
 def conectar_jira(url, email, token):
     """Tenta conectar à API do Jira e retorna o status da conexão"""
     try:
         # Endpoint básico para testar a conexão
         auth = (email, token)
-        response = requests.get(f"{url}/rest/api/3/myself", auth=auth)
+        response = requisitar_jira('GET', f"{url}/rest/api/3/myself", auth=auth)
         if response.status_code == 200:
             return True, response.json()
         else:
@@ -157,278 +186,18 @@ def conectar_jira(url, email, token):
     except Exception as e:
         return False, f"Erro ao conectar ao Jira: {str(e)}"
 
-@st.cache_data(ttl=300)  # Cache por 5 minutos
-def buscar_dados_jira(url, email, token, project_key, data_inicio=None, data_fim=None):
-    """Busca dados de tarefas do Jira com um JQL específico e datas personalizadas"""
-    try:
-        auth = (email, token)
-
-        # Configurar JQL com datas personalizadas ou usar padrão
-        if data_inicio and data_fim:
-            data_inicio_str = data_inicio.strftime("%Y-%m-%d")
-            data_fim_str = data_fim.strftime("%Y-%m-%d")
-            jql = f'project = "{project_key}" AND created >= "{data_inicio_str}" AND created <= "{data_fim_str}" ORDER BY created DESC'
-        else:
-            # Padrão: últimos 30 dias
-            data_inicio_padrao = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
-            jql = f'project = "{project_key}" AND created >= "{data_inicio_padrao}" ORDER BY created DESC'
-
-        # Implementação de paginação para buscar até 500 tarefas
-        start_at = 0
-        max_per_page = 100  # API Jira geralmente limita a 100 itens por página
-        max_results = 500  # Limitar a 500 tarefas no total
-        
-        all_issues = []
-        total_fetched = 0
-        
-        while total_fetched < max_results:
-            # Parâmetros para a consulta
-            params = {
-                'jql': jql,
-                'maxResults': max_per_page,
-                'startAt': start_at,
-                'fields': 'summary,status,assignee,duedate,created,updated,priority,timetracking,worklog'
-            }
-
-            response = requests.get(
-                f"{url}/rest/api/3/search",
-                params=params,
-                auth=auth
-            )
-
-            if response.status_code != 200:
-                return False, f"Erro: {response.status_code} - {response.text}"
-            
-            data = response.json()
-            issues = data.get('issues', [])
-            
-            # Se não há mais resultados, sair do loop
-            if not issues:
-                break
-                
-            all_issues.extend(issues)
-            total_fetched += len(issues)
-            
-            # Se já buscamos todos os resultados disponíveis, sair do loop
-            total_issues = data.get('total', 0)
-            if start_at + len(issues) >= total_issues or len(issues) < max_per_page:
-                break
-                
-            # Avançar para a próxima página
-            start_at += len(issues)
-        
-        # Montar a resposta final no mesmo formato esperado pelo código existente
-        final_response = {
-            'issues': all_issues,
-            'total': total_fetched
-        }
-        
-        return True, final_response
-    except Exception as e:
-        return False, f"Erro ao buscar dados do Jira: {str(e)}"
-
-def processar_dados_jira(dados_raw):
-    """Processa os dados brutos do Jira e retorna um DataFrame"""
-    if not dados_raw or 'issues' not in dados_raw:
-        return pd.DataFrame()
-
-    issues = dados_raw['issues']
-    dados_processados = []
-
-    for issue in issues:
-        # Extrair dados básicos
-        issue_id = issue.get('key', 'N/A')
-        summary = issue.get('fields', {}).get('summary', 'Sem título')
-
-        # Status
-        status = issue.get('fields', {}).get('status', {}).get('name', 'Sem status')
-
-        # Atribuído a
-        assignee = "Não atribuído"
-        if issue.get('fields', {}).get('assignee'):
-            assignee = issue.get('fields', {}).get('assignee', {}).get('displayName', 'Não atribuído')
-
-        # Datas
-        created = issue.get('fields', {}).get('created', None)
-        if created:
-            created = datetime.strptime(created.split('T')[0], "%Y-%m-%d")
-
-        updated = issue.get('fields', {}).get('updated', None)
-        if updated:
-            updated = datetime.strptime(updated.split('T')[0], "%Y-%m-%d")
-
-        due_date = issue.get('fields', {}).get('duedate', None)
-        if due_date:
-            due_date = datetime.strptime(due_date, "%Y-%m-%d")
-
-        # Cálculo de atraso
-        hoje = datetime.now().date()
-        is_atrasada = False
-        dias_restantes = None
-
-        if due_date:
-            dias_restantes = (due_date.date() - hoje).days
-            is_atrasada = dias_restantes < 0 and status != 'Done' and status != 'Concluído'
-
-        # Prioridade
-        priority = issue.get('fields', {}).get('priority', {}).get('name', 'Normal')
-
-        # Tempo estimado e gasto (em segundos)
-        original_estimate = issue.get('fields', {}).get('timetracking', {}).get('originalEstimateSeconds', 0) or 0
-        time_spent = issue.get('fields', {}).get('timetracking', {}).get('timeSpentSeconds', 0) or 0
-
-        # Adicionar ao dataset
-        dados_processados.append({
-            'ID': issue_id,
-            'Resumo': summary,
-            'Status': status,
-            'Responsável': assignee,
-            'Criada': created,
-            'Atualizada': updated,
-            'Prazo': due_date,
-            'Dias Restantes': dias_restantes,
-            'Atrasada': is_atrasada,
-            'Prioridade': priority,
-            'Tempo Estimado (h)': round(original_estimate / 3600, 1) if original_estimate else 0,
-            'Tempo Gasto (h)': round(time_spent / 3600, 1) if time_spent else 0
-        })
-
-    return pd.DataFrame(dados_processados)
-
-def calcular_metricas(df):
-    """Calcula métricas a partir do DataFrame de tarefas"""
-    if df.empty:
-        return {
-            'total_tarefas': 0,
-            'concluidas': 0,
-            'andamento': 0,
-            'atrasadas': 0,
-            'percentual_prazo': 0,
-            'media_dias_conclusao': 0,
-            'proximas_vencer': 0,
-            'tempo_total_gasto': 0,
-            'tempo_medio_tarefa': 0
-        }
-
-    # Identificar tarefas por status
-    concluidas = df[df['Status'].isin(['Done', 'Concluído'])].shape[0]
-    andamento = df[df['Status'].isin(['In Progress', 'Em andamento'])].shape[0]
-    atrasadas = df[df['Atrasada'] == True].shape[0]
-
-    # Calcular percentual de tarefas entregues no prazo
-    tarefas_prazo = 0
-    if concluidas > 0:
-        df_concluidas = df[df['Status'].isin(['Done', 'Concluído'])]
-        tarefas_prazo = df_concluidas[df_concluidas['Atrasada'] == False].shape[0]
-        percentual_prazo = (tarefas_prazo / concluidas) * 100
-    else:
-        percentual_prazo = 0
-
-    # Calcular média de dias para conclusão (se houver dados suficientes)
-    media_dias = 0
-    df_com_datas = df[df['Criada'].notna() & df['Atualizada'].notna() & df['Status'].isin(['Done', 'Concluído'])]
-    if not df_com_datas.empty:
-        df_com_datas['Dias_Conclusao'] = (df_com_datas['Atualizada'] - df_com_datas['Criada']).dt.days
-        media_dias = df_com_datas['Dias_Conclusao'].mean()
-
-    # Identificar tarefas próximas do vencimento (próximos 7 dias)
-    proximas_vencer = df[(df['Dias Restantes'] >= 0) & (df['Dias Restantes'] <= 7) & 
-                          ~df['Status'].isin(['Done', 'Concluído'])].shape[0]
-
-    # Calcular tempo total gasto e tempo médio por tarefa
-    tempo_total_gasto = df['Tempo Gasto (h)'].sum()
-    tempo_medio_tarefa = df['Tempo Gasto (h)'].mean() if df.shape[0] > 0 else 0
-
-    return {
-        'total_tarefas': df.shape[0],
-        'concluidas': concluidas,
-        'andamento': andamento,
-        'atrasadas': atrasadas,
-        'percentual_prazo': percentual_prazo,
-        'media_dias_conclusao': media_dias,
-        'proximas_vencer': proximas_vencer,
-        'tempo_total_gasto': tempo_total_gasto,
-        'tempo_medio_tarefa': tempo_medio_tarefa
-    }
-
-def gerar_insights(df, periodo='semana'):
-    """Gera insights a partir dos dados para um determinado período"""
-    if df.empty:
-        return []
-
-    insights = []
-
-    # Filtrar pelo período
-    hoje = datetime.now().date()
-    if periodo == 'semana':
-        inicio_periodo = hoje - timedelta(days=hoje.weekday())  # Segunda-feira da semana atual
-        nome_periodo = "semana"
-    else:  # mês
-        inicio_periodo = hoje.replace(day=1)  # Primeiro dia do mês atual
-        nome_periodo = "mês"
-
-    df_periodo = df[df['Atualizada'] >= pd.Timestamp(inicio_periodo)]
-
-    # Análise por responsável
-    responsaveis = df_periodo['Responsável'].dropna().unique()
-
-    for responsavel in responsaveis:
-        df_resp = df_periodo[df_periodo['Responsável'] == responsavel]
-
-        # Tarefas concluídas
-        concluidas = df_resp[df_resp['Status'].isin(['Done', 'Concluído'])]
-        n_concluidas = concluidas.shape[0]
-
-        if n_concluidas > 0:
-            tempo_gasto = concluidas['Tempo Gasto (h)'].sum()
-            insights.append(
-                f"{responsavel} concluiu {n_concluidas} tarefas nesta {nome_periodo}, " +
-                f"gastando um total de {tempo_gasto:.1f}h ({(tempo_gasto/n_concluidas):.1f}h por tarefa)."
-            )
-
-        # Tarefas em andamento
-        em_andamento = df_resp[df_resp['Status'].isin(['In Progress', 'Em andamento'])]
-        n_andamento = em_andamento.shape[0]
-
-        if n_andamento > 0:
-            insights.append(
-                f"{responsavel} está trabalhando em {n_andamento} tarefas atualmente."
-            )
-
-        # Tarefas atrasadas
-        atrasadas = df_resp[df_resp['Atrasada'] == True]
-        n_atrasadas = atrasadas.shape[0]
-
-        if n_atrasadas > 0:
-            insights.append(
-                f"{responsavel} tem {n_atrasadas} tarefas atrasadas que precisam de atenção."
-            )
-
-    # Insights gerais
-    tempo_total = df_periodo['Tempo Gasto (h)'].sum()
-    if not df_periodo.empty:
-        insights.append(
-            f"No total, a equipe gastou {tempo_total:.1f}h trabalhando em tarefas nesta {nome_periodo}."
-        )
-
-    # Tarefas que mudaram de prazo
-    df_com_mudanca = df_periodo[df_periodo['Prazo'].notna()]
-    tarefas_com_mudanca = 0
-
-    # Aqui precisaria de dados históricos para detectar mudanças de prazo
-    # Como simplificação, podemos apenas contar tarefas atualizadas recentemente
-
-    return insights
+@cache_data_medido('facetas_jira', ttl=3600, show_spinner=False)  # Cache por 1 hora
+def carregar_facetas(url, email, token, project_key):
+    """Opções dos filtros da consulta (responsáveis, status, tipos e labels) de um projeto"""
+    return buscar_facetas(url, email, token, project_key)
 
-def gerar_grafico_status(df):
+# O Altair (quase 1 s para importar) só é carregado ao montar um gráfico ainda não memorizado: a tela de
+# conexão e as execuções que reaproveitam as especificações de exibir_grafico_memorizado não o importam
+def gerar_grafico_status(status_counts):
     """Gera um gráfico de barras por status com cores personalizadas"""
-    if df.empty:
+    if status_counts.empty:
         return None
 
-    # Contar tarefas por status
-    status_counts = df['Status'].value_counts().reset_index()
-    status_counts.columns = ['Status', 'Quantidade']
-
     # Definir ordem personalizada de status (adicionar mais status se necessário)
     status_ordem = ['To Do', 'A Fazer', 'Backlog', 'In Progress', 'Em andamento', 'Em Andamento', 'Review', 'In Review', 'Done', 'Concluído']
 
@@ -457,6 +226,7 @@ def gerar_grafico_status(df):
     cores = [status_cores.get(s, cor_padrao) for s in status_counts['Status']]
 
     # Criar o gráfico com Altair
+    import altair as alt
     chart = alt.Chart(status_counts).mark_bar(
         cornerRadiusTopLeft=4,
         cornerRadiusTopRight=4
@@ -481,15 +251,11 @@ def gerar_grafico_status(df):
 
     return chart
 
-def gerar_grafico_prioridades(df):
+def gerar_grafico_prioridades(prioridade_counts):
     """Gera um gráfico de pizza para prioridades"""
-    if df.empty:
+    if prioridade_counts.empty:
         return None
 
-    # Contar tarefas por prioridade
-    prioridade_counts = df['Prioridade'].value_counts().reset_index()
-    prioridade_counts.columns = ['Prioridade', 'Quantidade']
-
     # Cores para prioridades
     cores_prioridades = {
         'Highest': '#D50000',     # Vermelho escuro
@@ -512,6 +278,7 @@ def gerar_grafico_prioridades(df):
     cores = [cores_prioridades.get(p, cor_padrao) for p in prioridade_counts['Prioridade']]
 
     # Criar o gráfico com Altair
+    import altair as alt
     chart = alt.Chart(prioridade_counts).mark_arc(innerRadius=50).encode(
         theta=alt.Theta(field="Quantidade", type="quantitative"),
         color=alt.Color('Prioridade:N', scale=alt.Scale(domain=list(prioridade_counts['Prioridade']), range=cores)),
@@ -531,15 +298,11 @@ def gerar_grafico_prioridades(df):
 
     return chart
 
-def gerar_grafico_responsaveis(df):
+def gerar_grafico_responsaveis(resp_counts):
     """Gera um gráfico de barras horizontal para responsáveis"""
-    if df.empty or df['Responsável'].nunique() <= 1:
+    if len(resp_counts) <= 1:
         return None
 
-    # Contar tarefas por responsável
-    resp_counts = df['Responsável'].value_counts().reset_index()
-    resp_counts.columns = ['Responsável', 'Quantidade']
-    
     # Limitar a 10 responsáveis mais ativos
     if len(resp_counts) > 10:
         resp_counts = resp_counts.head(10)
@@ -563,6 +326,7 @@ def gerar_grafico_responsaveis(df):
         cores.append(cor_hex)
 
     # Criar o gráfico com Altair
+    import altair as alt
     chart = alt.Chart(resp_counts).mark_bar(
         cornerRadiusEnd=4
     ).encode(
@@ -586,29 +350,179 @@ def gerar_grafico_responsaveis(df):
 
     return chart
 
-def exportar_dataframe(df, formato='csv'):
-    """Exporta o DataFrame para CSV ou Excel"""
-    if df.empty:
-        return None, None
-
-    if formato == 'csv':
-        csv = df.to_csv(index=False)
-        b64 = base64.b64encode(csv.encode()).decode()
-        href = f'data:file/csv;base64,{b64}'
-        filename = f'dadosjira{datetime.now().strftime("%Y%m%d")}.csv'
-    else:  # excel
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, index=False, sheet_name='Dados Jira')
-        excel_data = output.getvalue()
-        b64 = base64.b64encode(excel_data).decode()
-        href = f'data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64}'
-        filename = f'dadosjira{datetime.now().strftime("%Y%m%d")}.xlsx'
-
-    return href, filename
+def chave_fonte(fonte):
+    """Identifica um projeto configurado (site + chave do projeto)"""
+    return f"{fonte['url']}|{fonte['projeto']}"
+
+def filtros_jql(fonte):
+    """Filtros da consulta como pares (campo JQL, valor) para o projeto, ou None se algum valor não existir nele"""
+    selecionados = st.session_state.get('jira_filtros_consulta', {})
+    if not selecionados:
+        return ()
+
+    sucesso, facetas = carregar_facetas(fonte['url'], fonte['email'], fonte['token'], fonte['projeto'])
+    if not sucesso:
+        return ()
+
+    filtros = []
+    for faceta, valor in selecionados.items():
+        campo = CAMPOS_FILTRO_JQL[faceta]
+        if faceta == 'responsaveis' and valor == RESPONSAVEL_EU:
+            # accountId de quem conectou em vez de currentUser(): o filtro (e o snapshot) fica de uma conta só
+            sucesso, usuario = conectar_jira(fonte['url'], fonte['email'], fonte['token'])
+            if not sucesso or not usuario.get('accountId'):
+                return None
+            filtros.append((campo, valor_jql(usuario['accountId'])))
+        elif faceta == 'responsaveis':
+            # O JQL identifica usuários pelo accountId
+            if valor not in facetas['responsaveis']:
+                return None
+            filtros.append((campo, valor_jql(facetas['responsaveis'][valor])))
+        elif valor in facetas[faceta]:
+            filtros.append((campo, valor_jql(valor)))
+        else:
+            return None
+    return tuple(filtros)
+
+def buscar_dados_fontes(fontes, data_inicio=None, data_fim=None, forcar=False):
+    """Obtém em paralelo o snapshot de cada projeto configurado; só busca no Jira os que ainda não têm snapshot"""
+    # Projetos em que algum filtro da consulta não existe ficam de fora
+    filtros = {chave_fonte(fonte): filtros_jql(fonte) for fonte in fontes}
+    fontes = [fonte for fonte in fontes if filtros[chave_fonte(fonte)] is not None]
+
+    def buscar(fonte):
+        return obter_snapshot(fonte['url'], fonte['email'], fonte['token'], fonte['projeto'],
+                              data_inicio, data_fim, forcar, filtros=filtros[chave_fonte(fonte)])
+
+    with ThreadPoolExecutor(max_workers=MAX_CONEXOES_JIRA) as executor:
+        return dict(zip([chave_fonte(fonte) for fonte in fontes], executor.map(buscar, fontes)))
+
+def obter_pacote_metricas(responsavel, status, projeto="Todos"):
+    """Retorna o pacote de métricas do filtro atual, reaproveitando os já calculados (LRU na sessão)"""
+    if 'jira_pacotes' not in st.session_state:
+        st.session_state.jira_pacotes = OrderedDict()
+    cache = st.session_state.jira_pacotes
+
+    # A data entra na chave porque Dias Restantes e Atrasada dependem do dia atual
+    hoje = datetime.now().date()
+    chave = (st.session_state.get('jira_df_versao', 0), projeto, responsavel, status, hoje)
+
+    registrar_cache('pacotes_metricas', chave in cache)
+    if chave in cache:
+        cache.move_to_end(chave)
+        return cache[chave]
+
+    pacote = calcular_pacote_metricas(
+        st.session_state.jira_df, responsavel, status, hoje, st.session_state.jira_worklogs, projeto)
+    cache[chave] = pacote
+    while len(cache) > MAX_PACOTES_METRICAS:
+        cache.popitem(last=False)
+
+    return pacote
+
+def atualizar_dados_sessao(snapshots):
+    """Guarda os snapshots dos projetos na sessão e incrementa a versão usada pelo cache de métricas"""
+    fontes = {chave_fonte(fonte): fonte for fonte in st.session_state.jira_fontes}
+
+    for snapshot in snapshots.values():
+        for aviso in snapshot['avisos']:
+            st.warning(aviso)
+
+    # Os snapshots já trazem o DataFrame processado de cada projeto
+    df, worklogs = montar_tarefas([(fontes[chave]['url'], snapshot) for chave, snapshot in snapshots.items()])
+    st.session_state.jira_worklogs = worklogs
+
+    st.session_state.jira_dados = snapshots
+    st.session_state.jira_df = df
+    st.session_state.jira_df_versao = st.session_state.get('jira_df_versao', 0) + 1
+
+def carregar_fontes(fontes=None, forcar=False):
+    """Obtém os projetos informados (ou todos os configurados) e atualiza os dados da sessão"""
+    data_inicio, data_fim = st.session_state.get('jira_periodo', (None, None))
+    resultados = buscar_dados_fontes(fontes or st.session_state.jira_fontes, data_inicio, data_fim, forcar)
+
+    # Projetos não buscados agora continuam com os dados já carregados
+    snapshots = dict(st.session_state.get('jira_dados', {})) if fontes else {}
+    for chave, (sucesso, resultado) in resultados.items():
+        if sucesso:
+            snapshots[chave] = resultado
+        else:
+            st.error(f"Erro ao buscar dados do projeto {chave.split('|', 1)[1]}: {resultado}")
+
+    # Com filtros na consulta, nenhum projeto buscado significa que nenhum tem os valores escolhidos
+    if snapshots or (not resultados and st.session_state.get('jira_filtros_consulta')):
+        atualizar_dados_sessao(snapshots)
+        return True
+    return False
+
+def atualizar_projeto(fonte):
+    """Busca novamente um único projeto, mantendo os demais como estão"""
+    return carregar_fontes([fonte], forcar=True)
+
+def sincronizar_snapshots():
+    """Troca os dados da sessão pelos snapshots mais recentes publicados pelo agendador, sem esperar o Jira"""
+    atuais = st.session_state.get('jira_dados', {})
+    if not atuais:
+        return
+
+    data_inicio, data_fim = st.session_state.get('jira_periodo', (None, None))
+    resultados = buscar_dados_fontes(st.session_state.jira_fontes, data_inicio, data_fim)
+    novos = {chave: resultado for chave, (sucesso, resultado) in resultados.items() if sucesso}
+
+    # Snapshots publicados nunca são alterados, então basta comparar a identidade
+    if any(snapshot is not atuais.get(chave) for chave, snapshot in novos.items()):
+        atualizar_dados_sessao({**atuais, **novos})
 
 # ======= INTERFACE DA APLICAÇÃO =======
 
+def secao_filtros_consulta():
+    """Filtros aplicados direto no JQL, para trazer do Jira só as tarefas que interessam"""
+    ativos = st.session_state.get('jira_filtros_consulta', {})
+    filtrar = st.toggle("Filtrar na consulta ao Jira", key="jira_filtrar_consulta",
+                        help="Busca no Jira só as tarefas do responsável, status, tipo e label escolhidos, "
+                             "em vez de baixar o projeto inteiro e filtrar aqui")
+
+    if not filtrar:
+        if ativos:
+            st.session_state.jira_filtros_consulta = {}
+            with st.spinner("Buscando dados sem os filtros da consulta..."):
+                carregar_fontes()
+        return
+
+    # Opções de todos os projetos configurados
+    opcoes = {'responsaveis': set(), 'status': set(), 'tipos': set(), 'labels': set()}
+    for fonte in st.session_state.jira_fontes:
+        sucesso, facetas = carregar_facetas(fonte['url'], fonte['email'], fonte['token'], fonte['projeto'])
+        if not sucesso:
+            st.warning(f"Opções de filtro indisponíveis para o projeto {fonte['projeto']}: {facetas}")
+            continue
+        for faceta in opcoes:
+            opcoes[faceta].update(facetas[faceta])
+
+    rotulos = {'responsaveis': "Responsável", 'status': "Status", 'tipos': "Tipo de tarefa", 'labels': "Label"}
+    with st.form("filtros_consulta_form"):
+        colunas = st.columns(len(rotulos))
+        selecionados = {}
+        for coluna, (faceta, rotulo) in zip(colunas, rotulos.items()):
+            valores = ["Todos"] + ([RESPONSAVEL_EU] if faceta == 'responsaveis' else []) + sorted(opcoes[faceta])
+            chave = f"filtro_consulta_{faceta}"
+            if st.session_state.get(chave) not in valores:
+                st.session_state[chave] = ativos.get(faceta, "Todos") if ativos.get(faceta) in valores else "Todos"
+            selecionados[faceta] = coluna.selectbox(rotulo, valores, key=chave)
+        aplicar = st.form_submit_button("Buscar com filtros")
+
+    if aplicar:
+        novos = {faceta: valor for faceta, valor in selecionados.items() if valor != "Todos"}
+        if novos != ativos:
+            st.session_state.jira_filtros_consulta = novos
+            with st.spinner("Buscando dados filtrados no Jira..."):
+                if carregar_fontes():
+                    st.success(f"Dados atualizados com sucesso! {len(st.session_state.jira_df)} tarefas encontradas.")
+
+    ativos = st.session_state.get('jira_filtros_consulta', {})
+    if ativos:
+        st.caption("Filtros da consulta: " + ", ".join(f"{rotulos[faceta]} = {valor}" for faceta, valor in ativos.items()))
+
 def pagina_configuracao():
     """Mostra a página de configuração do Jira"""
     st.subheader("Configurar Conexão com Jira")
@@ -622,7 +536,7 @@ def pagina_configuracao():
                                  value=st.session_state.get('jira_token', ''))
 
         st.markdown("Configurações de Projeto")
-        jira_project = st.text_input("Chave do Projeto (ex: PROJ)", 
+        jira_project = st.text_input("Chaves dos Projetos, separadas por vírgula (ex: PROJ, OPS)", 
                                    value=st.session_state.get('jira_project', ''))
 
         st.info("O token API pode ser gerado em: Perfil > Configurações de Conta > Tokens de API")
@@ -630,7 +544,8 @@ def pagina_configuracao():
         testar_btn = st.form_submit_button("Testar Conexão e Salvar")
 
     if testar_btn:
-        if not jira_url or not jira_email or not jira_token or not jira_project:
+        projetos = [projeto.strip() for projeto in jira_project.split(',') if projeto.strip()]
+        if not jira_url or not jira_email or not jira_token or not projetos:
             st.error("Preencha todos os campos para testar a conexão")
         else:
             # Teste de conexão
@@ -647,45 +562,144 @@ def pagina_configuracao():
                 st.session_state.jira_project = jira_project
                 st.session_state.jira_conectado = True
 
-                # Realizar busca inicial de dados
-                with st.spinner("Buscando dados do projeto..."):
-                    sucesso_busca, dados_jira = buscar_dados_jira(
-                        jira_url, jira_email, jira_token, jira_project)
+                # Projetos deste site + projetos de outros sites já adicionados
+                outros_sites = [fonte for fonte in st.session_state.get('jira_fontes', []) if fonte['url'] != jira_url]
+                st.session_state.jira_fontes = [
+                    {'url': jira_url, 'email': jira_email, 'token': jira_token, 'projeto': projeto}
+                    for projeto in projetos
+                ] + outros_sites
+
+                # Realizar busca inicial de dados (projetos em paralelo)
+                with st.spinner("Buscando dados dos projetos..."):
+                    sucesso_busca = carregar_fontes()
 
                 if sucesso_busca:
-                    st.session_state.jira_dados = dados_jira
-                    st.session_state.jira_df = processar_dados_jira(dados_jira)
                     st.success(f"Dados carregados com sucesso! {len(st.session_state.jira_df)} tarefas encontradas.")
-                else:
-                    st.error(f"Erro ao buscar dados do projeto: {dados_jira}")
             else:
                 st.error(f"Erro na conexão: {resultado}")
 
+    if st.session_state.get('jira_conectado', False):
+        pagina_outros_sites()
+
+def pagina_outros_sites():
+    """Permite adicionar projetos hospedados em outros sites do Jira"""
+    st.markdown("#### Projetos em outros sites Jira")
+
+    outros_sites = [fonte for fonte in st.session_state.jira_fontes if fonte['url'] != st.session_state.jira_url]
+    for fonte in outros_sites:
+        col_a, col_b = st.columns([3, 1])
+        col_a.write(f"**{fonte['projeto']}**  \n{fonte['url']}")
+        if col_b.button("Remover", key=f"remover_fonte_{chave_fonte(fonte)}"):
+            st.session_state.jira_fontes = [f for f in st.session_state.jira_fontes if f != fonte]
+            snapshots = dict(st.session_state.get('jira_dados', {}))
+            snapshots.pop(chave_fonte(fonte), None)
+            atualizar_dados_sessao(snapshots)
+            st.rerun()
+
+    with st.form("outro_site_form", clear_on_submit=True):
+        site_url = st.text_input("URL do Jira")
+        site_email = st.text_input("Email")
+        site_token = st.text_input("Token API", type="password")
+        site_projetos = st.text_input("Chaves dos Projetos, separadas por vírgula")
+        adicionar_btn = st.form_submit_button("Adicionar Projetos")
+
+    if adicionar_btn:
+        projetos = [projeto.strip() for projeto in site_projetos.split(',') if projeto.strip()]
+        if not site_url or not site_email or not site_token or not projetos:
+            st.error("Preencha todos os campos para adicionar os projetos")
+            return
+
+        with st.spinner("Testando conexão..."):
+            sucesso, resultado = conectar_jira(site_url, site_email, site_token)
+        if not sucesso:
+            st.error(f"Erro na conexão: {resultado}")
+            return
+
+        novas = [
+            {'url': site_url, 'email': site_email, 'token': site_token, 'projeto': projeto}
+            for projeto in projetos
+        ]
+        existentes = {chave_fonte(fonte) for fonte in st.session_state.jira_fontes}
+        novas = [fonte for fonte in novas if chave_fonte(fonte) not in existentes]
+        st.session_state.jira_fontes = st.session_state.jira_fontes + novas
+
+        with st.spinner("Buscando dados dos novos projetos..."):
+            if novas and carregar_fontes(novas):
+                st.success(f"Projetos adicionados! {len(st.session_state.jira_df)} tarefas no total.")
+
 def pagina_dashboard():
     """Mostra o dashboard do Jira com os dados carregados"""
     st.subheader("Dashboard de Produtividade do Jira")
 
-    # Verificar se temos dados carregados
-    if 'jira_df' not in st.session_state or st.session_state.jira_df.empty:
+    # Dados retirados da sessão enquanto ela estava parada são remontados dos snapshots
+    if dados_despejados() and st.session_state.get('jira_dados'):
+        with st.spinner("Recarregando dados..."):
+            carregar_fontes()
+
+    # Verificar se temos dados carregados (com filtros na consulta, o resultado pode vir vazio)
+    if 'jira_df' not in st.session_state or (st.session_state.jira_df.empty
+                                             and not st.session_state.get('jira_filtros_consulta')):
         st.warning("Nenhum dado disponível. Por favor, configure a conexão com o Jira.")
         return
 
-    # Obter dados do estado da sessão
-    df_original = st.session_state.jira_df.copy()
+    # Os dados são atualizados em segundo plano; aqui só se troca pelo snapshot mais recente
+    sincronizar_snapshots()
+    if st.session_state.get('jira_dados'):
+        atualizado_em = min(snapshot['atualizado_em'] for snapshot in st.session_state.jira_dados.values())
+        minutos = int((datetime.now() - atualizado_em).total_seconds() // 60)
+        st.caption(f"Dados atualizados há {minutos} min "
+                   f"(atualização automática a cada {INTERVALO_ATUALIZACAO // 60} min)")
 
     # Inicializar filtros na sessão se não existirem
     if 'filtro_responsavel' not in st.session_state:
         st.session_state.filtro_responsavel = "Todos"
     if 'filtro_status' not in st.session_state:
         st.session_state.filtro_status = "Todos"
-        
-    # Função para atualizar filtros
-    def atualizar_filtro_responsavel():
-        st.session_state.filtro_responsavel = st.session_state.novo_filtro_responsavel
-        
-    def atualizar_filtro_status():
-        st.session_state.filtro_status = st.session_state.novo_filtro_status
+    if 'filtro_projeto' not in st.session_state:
+        st.session_state.filtro_projeto = "Todos"
+
+    # Aviso deixado por um trecho que atualizou os dados e rodou a página inteira de novo
+    mensagem = st.session_state.pop('jira_mensagem', None)
+    if mensagem:
+        st.success(mensagem)
+
+    secao_filtros_data()
+    secao_filtros_consulta()
+    if st.session_state.jira_df.empty:
+        st.info("Nenhuma tarefa encontrada com os filtros da consulta.")
+        return
 
+    # Projetos carregados, com atualização individual
+    if len(st.session_state.get('jira_fontes', [])) > 1:
+        with st.expander("Projetos carregados"):
+            contagem = st.session_state.jira_df['Projeto'].value_counts()
+            for fonte in st.session_state.jira_fontes:
+                col_a, col_b = st.columns([3, 1])
+                col_a.write(f"**{fonte['projeto']}** ({contagem.get(fonte['projeto'], 0)} tarefas)  \n{fonte['url']}")
+                if col_b.button("Atualizar", key=f"atualizar_fonte_{chave_fonte(fonte)}"):
+                    with st.spinner(f"Buscando dados do projeto {fonte['projeto']}..."):
+                        if atualizar_projeto(fonte):
+                            st.rerun()
+
+    secao_indicadores()
+    secao_exportacao()
+
+# Trechos do dashboard que rodam de novo sozinhos. Dependências: datas e filtros da consulta -> jira_df
+# (mudam os dados e rodam a página inteira); jira_df + filtros adicionais -> pacote de métricas -> cards,
+# gráfico, insights e tabelas; jira_df + filtros adicionais -> exportação (lidos no clique).
+
+def dados_despejados():
+    """Se a limpeza de memória retirou da sessão algum dos dados montados dos snapshots"""
+    return any(chave not in st.session_state for chave in DADOS_REMONTAVEIS)
+
+def exigir_dados_sessao():
+    """Se os dados foram retirados da sessão parada, a página inteira roda de novo para remontá-los"""
+    if dados_despejados():
+        st.rerun()
+
+@fragmento('jira_filtros_data')
+def secao_filtros_data():
+    """Período da busca; as datas só valem ao clicar em atualizar"""
     # Seletor de período personalizado
     st.markdown("### Filtros de Data")
     col1, col2 = st.columns(2)
@@ -720,31 +734,53 @@ def pagina_dashboard():
             if data_inicio > data_fim:
                 st.error("A data de início não pode ser posterior à data de fim.")
             else:
+                st.session_state.jira_periodo = (data_inicio, data_fim)
                 with st.spinner("Buscando dados com filtro de data..."):
-                    sucesso, dados_jira = buscar_dados_jira(
-                        st.session_state.jira_url, 
-                        st.session_state.jira_email, 
-                        st.session_state.jira_token, 
-                        st.session_state.jira_project,
-                        data_inicio=data_inicio,
-                        data_fim=data_fim
-                    )
+                    sucesso = carregar_fontes()
+                if sucesso:
+                    # Os dados novos valem para a página inteira, não só para este trecho
+                    st.session_state.jira_mensagem = (f"Dados atualizados com sucesso! "
+                                                      f"{len(st.session_state.jira_df)} tarefas encontradas.")
+                    st.rerun()
+
+@fragmento('jira_indicadores')
+def secao_indicadores():
+    """Filtros adicionais e tudo o que é calculado a partir deles"""
+    exigir_dados_sessao()
 
-                    if sucesso:
-                        st.session_state.jira_dados = dados_jira
-                        st.session_state.jira_df = processar_dados_jira(dados_jira)
-                        st.success(f"Dados atualizados com sucesso! {len(st.session_state.jira_df)} tarefas encontradas.")
-                        # Atualizar a referência ao DataFrame
-                        df_original = st.session_state.jira_df.copy()
-                    else:
-                        st.error(f"Erro ao buscar dados filtrados: {dados_jira}")
+    # Função para atualizar filtros
+    def atualizar_filtro_projeto():
+        st.session_state.filtro_projeto = st.session_state.novo_filtro_projeto
+
+    def atualizar_filtro_responsavel():
+        st.session_state.filtro_responsavel = st.session_state.novo_filtro_responsavel
+        
+    def atualizar_filtro_status():
+        st.session_state.filtro_status = st.session_state.novo_filtro_status
 
     # Filtros adicionais
     st.markdown("### Filtros Adicionais")
+
+    # As categorias do DataFrame já são os valores distintos de cada coluna
+    df_original = st.session_state.jira_df
+
+    # Filtro de projeto só aparece quando há mais de um projeto carregado
+    projetos = ["Todos"] + sorted(df_original['Projeto'].cat.categories.tolist())
+    if len(projetos) > 2:
+        st.selectbox(
+            "Projeto",
+            projetos,
+            key="novo_filtro_projeto",
+            on_change=atualizar_filtro_projeto,
+            index=projetos.index(st.session_state.filtro_projeto) if st.session_state.filtro_projeto in projetos else 0
+        )
+    if st.session_state.filtro_projeto not in projetos:
+        st.session_state.filtro_projeto = "Todos"
+
     col1, col2 = st.columns(2)
 
     with col1:
-        responsaveis = ["Todos"] + sorted(df_original['Responsável'].unique().tolist())
+        responsaveis = ["Todos"] + sorted(df_original['Responsável'].cat.categories.tolist())
         st.selectbox(
             "Responsável", 
             responsaveis, 
@@ -754,7 +790,7 @@ def pagina_dashboard():
         )
 
     with col2:
-        status_filtro = ["Todos"] + sorted(df_original['Status'].unique().tolist())
+        status_filtro = ["Todos"] + sorted(df_original['Status'].cat.categories.tolist())
         st.selectbox(
             "Status", 
             status_filtro, 
@@ -763,19 +799,10 @@ def pagina_dashboard():
             index=status_filtro.index(st.session_state.filtro_status) if st.session_state.filtro_status in status_filtro else 0
         )
 
-    # Filtrar os dados conforme seleção
-    df_filtrado = df_original.copy()
-
-    # Filtro de responsável
-    if st.session_state.filtro_responsavel != "Todos":
-        df_filtrado = df_filtrado[df_filtrado['Responsável'] == st.session_state.filtro_responsavel]
-
-    # Filtro de status
-    if st.session_state.filtro_status != "Todos":
-        df_filtrado = df_filtrado[df_filtrado['Status'] == st.session_state.filtro_status]
-
-    # Calcular métricas
-    metricas = calcular_metricas(df_filtrado)
+    # Métricas, alertas e agregados do filtro atual (calculados apenas quando o filtro ou os dados mudam)
+    pacote = obter_pacote_metricas(st.session_state.filtro_responsavel, st.session_state.filtro_status,
+                                   st.session_state.filtro_projeto)
+    metricas = pacote['metricas']
 
     # Mostrar métricas em cards
     st.markdown("<div class='dashboard-container'>", unsafe_allow_html=True)
@@ -820,40 +847,45 @@ def pagina_dashboard():
         )
         st.markdown("</div>", unsafe_allow_html=True)
 
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(
+            "Lead Time Médio",
+            f"{round(metricas['media_dias_conclusao'], 1)} dias",
+            help="Da criação à conclusão (pelo histórico de status quando disponível)"
+        )
+
+    with col2:
+        st.metric(
+            "Cycle Time Médio",
+            f"{round(metricas['media_cycle_time'], 1)} dias",
+            help="Do início do andamento à conclusão, pelo histórico de status"
+        )
+
+    with col3:
+        st.metric(
+            "Prazos Alterados",
+            metricas['prazo_alterado'],
+            delta=f"{round(metricas['deslize_medio_prazo'], 1)} dias em média" if metricas['prazo_alterado'] > 0 else None,
+            delta_color="inverse"
+        )
+
     # Gráficos
     st.markdown("### Análise Visual")
     
-    # Layout de gráficos em tabs
-    tab1, tab2, tab3 = st.tabs(["Status", "Prioridades", "Responsáveis"])
-    
-    with tab1:
-        chart_status = gerar_grafico_status(df_filtrado)
-        if chart_status:
-            st.altair_chart(chart_status, use_container_width=True)
-        else:
-            st.info("Dados insuficientes para gerar o gráfico de status")
-    
-    with tab2:
-        chart_prioridades = gerar_grafico_prioridades(df_filtrado)
-        if chart_prioridades:
-            st.altair_chart(chart_prioridades, use_container_width=True)
-        else:
-            st.info("Dados insuficientes para gerar o gráfico de prioridades")
-    
-    with tab3:
-        chart_responsaveis = gerar_grafico_responsaveis(df_filtrado)
-        if chart_responsaveis:
-            st.altair_chart(chart_responsaveis, use_container_width=True)
-        else:
-            st.info("Dados insuficientes para gerar o gráfico de responsáveis")
+    # Só o gráfico escolhido é montado, e gráficos de dados já vistos são reaproveitados
+    secao_grafico(pacote)
 
     # Seção de insights
     st.markdown("### Insights de Produtividade")
 
     tab1, tab2 = st.tabs(["Insights da Semana", "Insights do Mês"])
 
+    insights = pacote['insights']
+
     with tab1:
-        insights_semana = gerar_insights(df_filtrado, 'semana')
+        insights_semana = insights['semana']
         if insights_semana:
             st.markdown("<div class='insights-container'>", unsafe_allow_html=True)
             for insight in insights_semana:
@@ -863,7 +895,7 @@ def pagina_dashboard():
             st.info("Não há insights disponíveis para a semana atual com os filtros aplicados.")
 
     with tab2:
-        insights_mes = gerar_insights(df_filtrado, 'mes')
+        insights_mes = insights['mes']
         if insights_mes:
             st.markdown("<div class='insights-container'>", unsafe_allow_html=True)
             for insight in insights_mes:
@@ -878,12 +910,8 @@ def pagina_dashboard():
         st.warning(f"Atenção: {metricas['proximas_vencer']} tarefas com prazo para vencer nos próximos 7 dias")
 
         # Mostrar tarefas que estão próximas de vencer
-        df_proximas = df_filtrado[(df_filtrado['Dias Restantes'] >= 0) & 
-                                  (df_filtrado['Dias Restantes'] <= 7) & 
-                                  ~df_filtrado['Status'].isin(['Done', 'Concluído'])]
-
         st.dataframe(
-            df_proximas[['ID', 'Resumo', 'Responsável', 'Prazo', 'Dias Restantes']],
+            pacote['proximas'],
             hide_index=True,
             column_config={
                 'Dias Restantes': st.column_config.NumberColumn(
@@ -900,11 +928,8 @@ def pagina_dashboard():
         st.markdown("<div class='data-table'>", unsafe_allow_html=True)
         st.subheader("Tarefas Atrasadas")
 
-        # Filtrar tarefas atrasadas
-        df_atrasadas = df_filtrado[df_filtrado['Atrasada'] == True]
-
         st.dataframe(
-            df_atrasadas[['ID', 'Resumo', 'Responsável', 'Prazo', 'Dias Restantes', 'Status']],
+            pacote['atrasadas'],
             hide_index=True,
             column_config={
                 'Dias Restantes': st.column_config.NumberColumn(
@@ -916,6 +941,48 @@ def pagina_dashboard():
         )
         st.markdown("</div>", unsafe_allow_html=True)
 
+# Trocar o gráfico visível roda de novo só este trecho, com o pacote do filtro atual
+@fragmento('jira_grafico')
+def secao_grafico(pacote):
+    graficos = {
+        "Status": (gerar_grafico_status, 'status_counts', "Dados insuficientes para gerar o gráfico de status"),
+        "Prioridades": (gerar_grafico_prioridades, 'prioridade_counts', "Dados insuficientes para gerar o gráfico de prioridades"),
+        "Responsáveis": (gerar_grafico_responsaveis, 'responsavel_counts', "Dados insuficientes para gerar o gráfico de responsáveis")
+    }
+    grafico_visivel = st.radio("Gráfico", list(graficos), horizontal=True,
+                               label_visibility="collapsed", key="grafico_visivel")
+    gerar, contagem, mensagem_vazio = graficos[grafico_visivel]
+    exibir_grafico_memorizado(gerar, pacote[contagem], mensagem_vazio)
+
+@fragmento('jira_exportacao')
+def secao_exportacao():
+    exigir_dados_sessao()
+
+    # Exportação das tarefas do filtro atual
+    st.markdown("### Exportar Dados")
+    col1, col2 = st.columns([1, 3])
+
+    with col1:
+        formato = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), key="formato_exportacao")
+
+    with col2:
+        # O arquivo só é gerado quando pedido, e em disco, para não pesar em cada execução da página
+        if st.button("Gerar arquivo"):
+            df_exportacao, _ = filtrar_tarefas(
+                adicionar_colunas_temporais(st.session_state.jira_df),
+                st.session_state.filtro_responsavel,
+                st.session_state.filtro_status,
+                projeto=st.session_state.filtro_projeto
+            )
+            with st.spinner("Gerando arquivo..."):
+                with exportar_para_arquivo(df_exportacao, formato, 'Dados Jira') as arquivo:
+                    st.download_button(
+                        f"Baixar {formato} ({len(df_exportacao)} tarefas)",
+                        data=arquivo,
+                        file_name=nome_arquivo('dadosjira', formato),
+                        mime=FORMATOS_EXPORTACAO[formato][1]
+                    )
+
 # ======= FUNÇÃO PRINCIPAL =======
 
 def main():
@@ -937,7 +1004,7 @@ def main():
         # Botão para limpar configurações
         if st.session_state.get('jira_conectado', False):
             if st.button("Limpar configurações"):
-                for key in ['jira_url', 'jira_email', 'jira_token', 'jira_project', 'jira_conectado', 'jira_dados', 'jira_df', 'filtro_responsavel', 'filtro_status', 'data_inicio', 'data_fim']:
+                for key in ['jira_url', 'jira_email', 'jira_token', 'jira_project', 'jira_conectado', 'jira_dados', 'jira_df', 'jira_worklogs', 'jira_df_versao', 'jira_pacotes', 'jira_fontes', 'jira_periodo', 'jira_filtros_consulta', 'jira_filtrar_consulta', 'filtro_projeto', 'filtro_responsavel', 'filtro_status', 'data_inicio', 'data_fim']:
                     if key in st.session_state:
                         del st.session_state[key]
                 st.success("Configurações removidas com sucesso!")
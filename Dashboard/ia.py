@@ -1,14 +1,17 @@
 import sys
 import os
 import streamlit as st
-import altair as alt
 import pandas as pd
 import datetime
 
 # Try different approaches to import db_utils
 try:
-    from db_utils import (init_db, load_data, insert_project, 
-                         update_project_status, delete_project, update_project)
+    from db_utils import (init_db, carregar_projetos, insert_project, 
+                         update_project_status, delete_project, update_project,
+                         carregar_evolucao_status, carregar_status_na_data)
+    from export_utils import FORMATOS_EXPORTACAO, exportar_para_arquivo, nome_arquivo
+    from cache_utils import exibir_grafico_memorizado
+    from perf_utils import executar_uma_vez, fragmento
 except ImportError:
     possible_paths = [
         os.path.dirname(os.path.abspath(__file__)),  # Current directory
@@ -20,48 +23,128 @@ except ImportError:
         if path not in sys.path:
             sys.path.append(path)
     
-    from db_utils import (init_db, load_data, insert_project, 
-                         update_project_status, delete_project, update_project)
+    from db_utils import (init_db, carregar_projetos, insert_project, 
+                         update_project_status, delete_project, update_project,
+                         carregar_evolucao_status, carregar_status_na_data)
+    from export_utils import FORMATOS_EXPORTACAO, exportar_para_arquivo, nome_arquivo
+    from cache_utils import exibir_grafico_memorizado
+    from perf_utils import executar_uma_vez, fragmento
 
-# Initialize database
-init_db()
+# Initialize database (once per process; the page script reruns on every interaction)
+executar_uma_vez(init_db)
 
 # Status colors
 status_domain = ["Ativo", "Em Manutenção", "Arquivado", "Backlog", "Em Construção", "Período de Validação"]
 status_range = ["green", "orange", "red", "blue", "purple", "brown"]
 
+# Chart data is aggregated here, so the Vega spec carries one row per group instead of one per project
+def split_creators(criadores):
+    if pd.isna(criadores) or criadores.strip() == "":
+        return []
+    return [nome.strip() for nome in criadores.split(',') if nome.strip()]
+
+def status_counts(df):
+    return df.groupby('status').size().reset_index(name='count')
+
+def creator_status_counts(df):
+    df_creators = df[['criadores', 'status']].copy()
+    df_creators['criadores_list'] = df_creators['criadores'].apply(split_creators)
+    df_exploded = df_creators.explode('criadores_list')
+    df_exploded = df_exploded[df_exploded['criadores_list'].notna() & (df_exploded['criadores_list'] != '')]
+    return df_exploded.groupby(['criadores_list', 'status']).size().reset_index(name='Quantidade')
+
+def monthly_status_counts(df):
+    # Projects in each status at the end of each month, replayed from the status history of the filtered projects
+    return carregar_evolucao_status(df['id'].dropna().astype(int).tolist())
+
+# altair (almost 1 s to import) is only loaded when a chart spec is not memoized yet; the new project page
+# and reruns served by exibir_grafico_memorizado never import it
+def status_chart(counts):
+    if counts.empty:
+        return None
+    import altair as alt
+    return alt.Chart(counts).mark_arc(innerRadius=50).encode(
+        theta=alt.Theta(field="count", type="quantitative"),
+        color=alt.Color(field="status", type="nominal",
+                        scale=alt.Scale(domain=status_domain, range=status_range),
+                        legend=alt.Legend(title="Status")),
+        tooltip=[alt.Tooltip('status', title='Status'),
+                 alt.Tooltip('count:Q', title='Quantidade')]
+    ).properties(
+        width=350,
+        height=350,
+        title="Distribuição por Status"
+    )
+
+def creators_chart(counts):
+    if counts.empty:
+        return None
+    import altair as alt
+    return alt.Chart(counts).mark_bar().encode(
+        x=alt.X('criadores_list:N', title="Criador", sort='-y'),
+        y=alt.Y('Quantidade:Q', title="Número de Projetos"),
+        color=alt.Color('status:N', title='Status',
+                        scale=alt.Scale(domain=status_domain, range=status_range)),
+        tooltip=[alt.Tooltip('criadores_list', title='Criador'),
+                 alt.Tooltip('status', title='Status'),
+                 alt.Tooltip('Quantidade', title='Quantidade')]
+    ).properties(
+        width=350,
+        height=350,
+        title="Projetos por Criador"
+    )
+
+def evolution_chart(counts):
+    if counts.empty:
+        return None
+    import altair as alt
+    return alt.Chart(counts).mark_line(point=True).encode(
+        x=alt.X('yearmonth(mes):T', title="Mês/Ano"),
+        y=alt.Y('Quantidade:Q', title='Número de Projetos'),
+        color=alt.Color('status:N', title='Status',
+                        scale=alt.Scale(domain=status_domain, range=status_range)),
+        tooltip=[alt.Tooltip('yearmonth(mes):T', title='Mês/Ano'),
+                 alt.Tooltip('Quantidade:Q', title='Contagem')]
+    ).properties(
+        width=750,
+        height=350,
+        title="Evolução dos Projetos"
+    )
+
 def dashboard_page():
     st.header("Dashboard de Projetos")
     
-    # Load project data
-    if "df_projects" not in st.session_state:
-        st.session_state.df_projects = load_data()
-    df = st.session_state.df_projects
+    # Load project data (process-wide copy, re-read when another session, replica or write changed it)
+    df = carregar_projetos()
 
     if df.empty:
         st.info("Nenhum projeto cadastrado.")
         return
         
-    # KPIs with status
-    total_projects = len(df)
-    active_projects = df[df['status'] == 'Ativo'].shape[0]
-    maintenance_projects = df[df['status'] == 'Em Manutenção'].shape[0]
-    archived_projects = df[df['status'] == 'Arquivado'].shape[0]
-    backlog_projects = df[df['status'] == 'Backlog'].shape[0]
-    construcao_projects = df[df['status'] == 'Em Construção'].shape[0]
-    validacao_projects = df[df['status'] == 'Período de Validação'].shape[0]
-
-    kpi_cols = st.columns(7)
-    kpi_cols[0].metric("Total", total_projects)
-    kpi_cols[1].metric("Ativo", active_projects)
-    kpi_cols[2].metric("Em Manutenção", maintenance_projects)
-    kpi_cols[3].metric("Arquivado", archived_projects)
-    kpi_cols[4].metric("Backlog", backlog_projects)
-    kpi_cols[5].metric("Em Construção", construcao_projects)
-    kpi_cols[6].metric("Período de Validação", validacao_projects)
+    status_kpis(df)
 
     st.markdown("---")
 
+    filtered_projects_section(df)
+
+# KPIs with status (they depend only on the full data, so filter changes do not redraw them).
+# A past date counts each project by its last status up to that day, from the status history.
+@fragmento('projetos_indicadores')
+def status_kpis(df):
+    today = datetime.date.today()
+    status_date = st.date_input("Situação em", value=today, max_value=today, key="status_date")
+    statuses = df['status'] if status_date >= today else carregar_status_na_data(status_date)['status']
+
+    kpi_cols = st.columns(7)
+    kpi_cols[0].metric("Total", len(statuses))
+    for col, status in zip(kpi_cols[1:], status_domain):
+        col.metric(status, int((statuses == status).sum()))
+
+# Fragment dependencies: df (full data) -> filters -> df_filtered -> charts, editor and export.
+# A filter change reruns this fragment only; editing the table or picking an export format reruns
+# only the nested fragment, which keeps the df_filtered it received on the last filter run.
+@fragmento('projetos_filtros')
+def filtered_projects_section(df):
     # Filters
     with st.container():
         filter_cols = st.columns(4)
@@ -94,75 +177,34 @@ def dashboard_page():
             (pd.to_datetime(df_filtered['data']).dt.date <= date_end)
         ]
 
-    # Charts layout
+    # Charts layout (no widgets of their own: they only change with the filters; specs are memoized
+    # by the aggregated data, so unchanged charts are not rebuilt nor re-sent)
     col_left, col_right = st.columns(2)
 
     # Chart 1: Status Distribution
     with col_left:
-        pie_chart = alt.Chart(df_filtered).mark_arc(innerRadius=50).encode(
-            theta=alt.Theta(field="count", type="quantitative"),
-            color=alt.Color(field="status", type="nominal",
-                            scale=alt.Scale(domain=status_domain, range=status_range),
-                            legend=alt.Legend(title="Status")),
-            tooltip=[alt.Tooltip('status', title='Status'),
-                     alt.Tooltip('count:Q', title='Quantidade')]
-        ).transform_aggregate(
-            count='count()',
-            groupby=['status']
-        ).properties(
-            width=350,
-            height=350,
-            title="Distribuição por Status"
-        )
-        st.altair_chart(pie_chart, use_container_width=True)
+        exibir_grafico_memorizado(status_chart, status_counts(df_filtered), "Nenhum projeto no filtro atual.")
 
     # Chart 2: Projects by Creator
     with col_right:
-        df_creators = df_filtered[['id', 'criadores', 'status']].copy()
-        def split_creators(criadores):
-            if pd.isna(criadores) or criadores.strip() == "":
-                return []
-            return [nome.strip() for nome in criadores.split(',') if nome.strip()]
-        df_creators['criadores_list'] = df_creators['criadores'].apply(split_creators)
-        df_exploded = df_creators.explode('criadores_list')
-        df_exploded = df_exploded[df_exploded['criadores_list'] != '']
-
-        creator_status_counts = df_exploded.groupby(['criadores_list', 'status']).size().reset_index(name='Quantidade')
-
-        bar_chart_creators = alt.Chart(creator_status_counts).mark_bar().encode(
-            x=alt.X('criadores_list:N', title="Criador", sort='-y'),
-            y=alt.Y('Quantidade:Q', title="Número de Projetos"),
-            color=alt.Color('status:N', title='Status',
-                            scale=alt.Scale(domain=status_domain, range=status_range)),
-            tooltip=[alt.Tooltip('criadores_list', title='Criador'),
-                     alt.Tooltip('status', title='Status'),
-                     alt.Tooltip('Quantidade', title='Quantidade')]
-        ).properties(
-            width=350,
-            height=350,
-            title="Projetos por Criador"
-        )
-        st.altair_chart(bar_chart_creators, use_container_width=True)
+        exibir_grafico_memorizado(creators_chart, creator_status_counts(df_filtered), "Nenhum criador no filtro atual.")
 
     st.markdown("---")
 
     # Chart 3: Project Evolution
-    evolution_chart = alt.Chart(df_filtered).mark_line(point=True).encode(
-        x=alt.X('yearmonth(data):T', title="Mês/Ano"),
-        y=alt.Y('count()', title='Número de Projetos'),
-        color=alt.Color('status:N', title='Status',
-                        scale=alt.Scale(domain=status_domain, range=status_range)),
-        tooltip=[alt.Tooltip('yearmonth(data):T', title='Mês/Ano'),
-                 alt.Tooltip('count()', title='Contagem')]
-    ).properties(
-        width=750,
-        height=350,
-        title="Evolução dos Projetos"
-    )
-    st.altair_chart(evolution_chart, use_container_width=True)
+    exibir_grafico_memorizado(evolution_chart, monthly_status_counts(df_filtered), "Nenhum histórico de status no filtro atual.")
 
     st.markdown("---")
 
+    projects_editor(df_filtered)
+    projects_export(df_filtered)
+
+@fragmento('projetos_editor')
+def projects_editor(df_filtered):
+    # Messages from the last save (the page reruns after saving, so they are kept until this run)
+    for message in st.session_state.pop('projects_saved_messages', []):
+        st.success(message)
+
     # Editable table
     edited_df = st.data_editor(
         df_filtered,
@@ -172,6 +214,8 @@ def dashboard_page():
     )
 
     if st.button("Salvar alterações"):
+        messages = []
+
         # Detect removed rows
         original_ids = set(df_filtered['id'])
         edited_ids = set(edited_df['id'])
@@ -179,7 +223,7 @@ def dashboard_page():
 
         for project_id in deleted_ids:
             delete_project(project_id)
-            st.success(f"Projeto com ID {project_id} excluído!")
+            messages.append(f"Projeto com ID {project_id} excluído!")
 
         # Check for updates
         original_dict = df_filtered.set_index('id').to_dict('index')
@@ -193,11 +237,27 @@ def dashboard_page():
                         changes[col] = row[col]
                 if changes:
                     update_project(project_id, changes)
-                    st.success(f"Projeto '{row['nome']}' atualizado!")
+                    messages.append(f"Projeto '{row['nome']}' atualizado!")
+
+        # KPIs, filters and charts depend on the saved data, so the whole page reruns
+        st.session_state.projects_saved_messages = messages + ["Alterações salvas com sucesso!"]
+        st.rerun()
 
-        # Update session data
-        st.session_state.df_projects = load_data()
-        st.success("Alterações salvas com sucesso!")
+@fragmento('projetos_exportacao')
+def projects_export(df_filtered):
+    # Export filtered projects (file is built on demand, on disk)
+    export_cols = st.columns([1, 3])
+    with export_cols[0]:
+        export_format = st.selectbox("Formato", list(FORMATOS_EXPORTACAO), key="export_format")
+    with export_cols[1]:
+        if st.button("Gerar arquivo", key="export_projects"):
+            with exportar_para_arquivo(df_filtered, export_format, 'Projetos') as export_file:
+                st.download_button(
+                    f"Baixar {export_format} ({len(df_filtered)} projetos)",
+                    data=export_file,
+                    file_name=nome_arquivo('projetos', export_format),
+                    mime=FORMATOS_EXPORTACAO[export_format][1]
+                )
 
 def new_project_page():
     st.header("Novo Projeto")
@@ -221,7 +281,6 @@ def new_project_page():
         else:
             insert_project(nome, data_projeto, data_finalizacao, descricao, status, link_projeto, ferramentas, versao, criadores)
             st.success(f"Projeto '{nome}' adicionado com sucesso!")
-            st.session_state.df_projects = load_data()
             st.info("Agora, acesse o 'Dashboard de Projetos' para ver o novo projeto.")
 
 def main():
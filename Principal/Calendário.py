@@ -4,8 +4,12 @@ from streamlit.components.v1 import html
 import os
 import sys
 
-# Adiciona o diretório raiz ao path para importar arquivos de outros diretórios
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Adiciona o diretório raiz ao path para importar arquivos de outros diretórios (uma vez só; o script roda a cada interação)
+_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _raiz not in sys.path:
+    sys.path.append(_raiz)
+
+from perf_utils import fragmento
 
 # Importa o módulo de banco de dados
 try:
@@ -80,14 +84,22 @@ def exibir_iframe_calendario(calendario_email):
 def pagina_visualizar():
     st.header("Visualização de Calendários")
     
-    # Atualiza a lista de calendários (para garantir que estamos com os dados mais recentes)
+    # Atualiza a lista de calendários (para garantir que estamos com os dados mais recentes); só nas execuções
+    # completas da página: trocar o calendário visualizado roda apenas o trecho abaixo, sem consultar o banco
     if hasattr(st.session_state, 'db') and st.session_state.db.conn:
         st.session_state.calendarios = st.session_state.db.get_all_calendarios()
     
     if not st.session_state.calendarios:
         st.warning("Nenhum calendário cadastrado. Vá para a página de gerenciamento para adicionar calendários.")
         return
-    
+
+    visualizador_calendarios()
+
+# Trechos que rodam de novo sozinhos usam a lista st.session_state.calendarios; quem a altera (adicionar ou
+# remover) termina com st.rerun() para a página inteira, e as duas abas, refletirem a mudança
+@fragmento('calendario_visualizacao')
+def visualizador_calendarios():
+    """Seleção e exibição dos calendários"""
     # Criando uma lista de nomes para selecionar
     nomes = [cal["nome"] for cal in st.session_state.calendarios]
     
@@ -126,82 +138,92 @@ def pagina_gerenciar():
     col_left, col_right = st.columns([2, 1], gap="small")
     
     with col_left:
-        # Form para adicionar novo calendário
-        st.markdown('<div class="email-form">', unsafe_allow_html=True)
-        st.subheader("Adicionar Novo Calendário")
-        
-        novo_nome = st.text_input("Nome da pessoa ou departamento:")
-        novo_email = st.text_input("Email do calendário:")
-        
-        adicionar = st.button("Adicionar Calendário")
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        if adicionar:
-            if novo_nome and novo_email:
-                # Usar banco de dados se estiver conectado, caso contrário modo local
-                if hasattr(st.session_state, 'db') and st.session_state.db.conn:
-                    result = st.session_state.db.add_calendario(novo_nome, novo_email)
+        formulario_calendario()
+    
+    with col_right:
+        lista_calendarios()
+
+@fragmento('calendario_formulario')
+def formulario_calendario():
+    """Adição de calendário (digitar nos campos não roda o resto da página)"""
+    # Form para adicionar novo calendário
+    st.markdown('<div class="email-form">', unsafe_allow_html=True)
+    st.subheader("Adicionar Novo Calendário")
+    
+    novo_nome = st.text_input("Nome da pessoa ou departamento:")
+    novo_email = st.text_input("Email do calendário:")
+    
+    adicionar = st.button("Adicionar Calendário")
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    if adicionar:
+        if novo_nome and novo_email:
+            # Usar banco de dados se estiver conectado, caso contrário modo local
+            if hasattr(st.session_state, 'db') and st.session_state.db.conn:
+                result = st.session_state.db.add_calendario(novo_nome, novo_email)
+                
+                if result > 0:
+                    # Atualizar a lista de calendários da sessão
+                    st.session_state.calendarios = st.session_state.db.get_all_calendarios()
+                    st.success(f"Calendário de {novo_nome} adicionado com sucesso!")
+                    st.rerun()
+                elif result == -1:
+                    st.error("Este email já está cadastrado!")
+                else:
+                    st.error("Erro ao adicionar calendário. Tente novamente.")
+            else:
+                # Modo local (memória)
+                # Verificar se o email já existe
+                email_existente = any(cal["email"] == novo_email for cal in st.session_state.calendarios)
+                
+                if not email_existente:
+                    # Gerar ID localmente
+                    new_id = max([cal.get("id", 0) for cal in st.session_state.calendarios], default=0) + 1
                     
-                    if result > 0:
-                        # Atualizar a lista de calendários da sessão
+                    st.session_state.calendarios.append({
+                        "id": new_id,
+                        "nome": novo_nome,
+                        "email": novo_email
+                    })
+                    st.success(f"Calendário de {novo_nome} adicionado com sucesso!")
+                    st.rerun()
+                else:
+                    st.error("Este email já está cadastrado!")
+        else:
+            st.error("Por favor, preencha todos os campos!")
+
+@fragmento('calendario_lista')
+def lista_calendarios():
+    """Calendários cadastrados, com remoção"""
+    # Lista de calendários adicionados
+    st.markdown('<div class="email-list">', unsafe_allow_html=True)
+    st.subheader("Calendários Cadastrados")
+    
+    if not st.session_state.calendarios:
+        st.info("Nenhum calendário cadastrado ainda.")
+    else:
+        for i, cal in enumerate(st.session_state.calendarios):
+            st.markdown(f'<div class="email-item">', unsafe_allow_html=True)
+            col_a, col_b = st.columns([3, 1])
+            col_a.write(f"**{cal['nome']}**  \n{cal['email']}")
+            if col_b.button("Remover", key=f"remove_{i}"):
+                # Usar banco de dados se estiver conectado
+                if hasattr(st.session_state, 'db') and st.session_state.db.conn:
+                    # Remover do banco de dados
+                    if st.session_state.db.remove_calendario(cal["id"]):
+                        # Atualizar a lista de calendários
                         st.session_state.calendarios = st.session_state.db.get_all_calendarios()
-                        st.success(f"Calendário de {novo_nome} adicionado com sucesso!")
-                        st.rerun()
-                    elif result == -1:
-                        st.error("Este email já está cadastrado!")
+                        st.success(f"Calendário de {cal['nome']} removido com sucesso!")
                     else:
-                        st.error("Erro ao adicionar calendário. Tente novamente.")
+                        st.error("Erro ao remover calendário.")
                 else:
                     # Modo local (memória)
-                    # Verificar se o email já existe
-                    email_existente = any(cal["email"] == novo_email for cal in st.session_state.calendarios)
-                    
-                    if not email_existente:
-                        # Gerar ID localmente
-                        new_id = max([cal.get("id", 0) for cal in st.session_state.calendarios], default=0) + 1
-                        
-                        st.session_state.calendarios.append({
-                            "id": new_id,
-                            "nome": novo_nome,
-                            "email": novo_email
-                        })
-                        st.success(f"Calendário de {novo_nome} adicionado com sucesso!")
-                        st.rerun()
-                    else:
-                        st.error("Este email já está cadastrado!")
-            else:
-                st.error("Por favor, preencha todos os campos!")
+                    st.session_state.calendarios.pop(i)
+                
+                st.rerun()
+            st.markdown('</div>', unsafe_allow_html=True)
     
-    with col_right:
-        # Lista de calendários adicionados
-        st.markdown('<div class="email-list">', unsafe_allow_html=True)
-        st.subheader("Calendários Cadastrados")
-        
-        if not st.session_state.calendarios:
-            st.info("Nenhum calendário cadastrado ainda.")
-        else:
-            for i, cal in enumerate(st.session_state.calendarios):
-                st.markdown(f'<div class="email-item">', unsafe_allow_html=True)
-                col_a, col_b = st.columns([3, 1])
-                col_a.write(f"**{cal['nome']}**  \n{cal['email']}")
-                if col_b.button("Remover", key=f"remove_{i}"):
-                    # Usar banco de dados se estiver conectado
-                    if hasattr(st.session_state, 'db') and st.session_state.db.conn:
-                        # Remover do banco de dados
-                        if st.session_state.db.remove_calendario(cal["id"]):
-                            # Atualizar a lista de calendários
-                            st.session_state.calendarios = st.session_state.db.get_all_calendarios()
-                            st.success(f"Calendário de {cal['nome']} removido com sucesso!")
-                        else:
-                            st.error("Erro ao remover calendário.")
-                    else:
-                        # Modo local (memória)
-                        st.session_state.calendarios.pop(i)
-                    
-                    st.rerun()
-                st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
 
 # ======= INTERFACE STREAMLIT PRINCIPAL =======
 
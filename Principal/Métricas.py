@@ -0,0 +1,123 @@
+import streamlit as st
+import pandas as pd
+import os
+import sys
+
+# Adiciona o diretório raiz ao path para importar arquivos de outros diretórios (uma vez só; o script roda a cada interação)
+_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _raiz not in sys.path:
+    sys.path.append(_raiz)
+
+from metricas_utils import amostras, texto_prometheus
+from perf_utils import PERFIL_ATIVO, resumo_perfil
+from servidor_utils import SERVIDOR_AUXILIAR_ENDERECO, SERVIDOR_AUXILIAR_PORTA
+from sessao_utils import resumo_sessoes, INTERVALO_LIMPEZA
+
+# ======= FUNÇÕES DE UTILIDADE =======
+
+def tabela_metricas():
+    """Amostras atuais como DataFrame (uma linha por métrica e combinação de rótulos)"""
+    linhas = [{'metrica': nome, **rotulos, 'valor': valor} for nome, rotulos, valor in amostras()]
+    return pd.DataFrame(linhas, columns=sorted({coluna for linha in linhas for coluna in linha}) or ['metrica', 'valor'])
+
+def resumo_latencias(df, metrica, rotulo):
+    """Execuções, tempo total e médio por rótulo de um histograma"""
+    contagens = df[df['metrica'] == f"{metrica}_count"].set_index(rotulo)['valor']
+    somas = df[df['metrica'] == f"{metrica}_sum"].set_index(rotulo)['valor']
+    if contagens.empty:
+        return pd.DataFrame()
+    resumo = pd.DataFrame({'Execuções': contagens, 'Tempo total (s)': somas})
+    resumo['Média (ms)'] = resumo['Tempo total (s)'] / resumo['Execuções'] * 1000
+    return resumo.sort_values('Tempo total (s)', ascending=False).round(2)
+
+def resumo_caches(df):
+    """Acertos, falhas, taxa de acerto, entradas e bytes de cada cache"""
+    consultas = df[df['metrica'] == 'cache_consultas_total']
+    if consultas.empty:
+        return pd.DataFrame()
+    resumo = consultas.pivot_table(index='cache', columns='resultado', values='valor', aggfunc='sum', fill_value=0)
+    resumo = resumo.reindex(columns=['acerto', 'falha'], fill_value=0).astype(int)
+    resumo['Taxa de acerto (%)'] = resumo['acerto'] / (resumo['acerto'] + resumo['falha']) * 100
+    for metrica, coluna in (('cache_entradas', 'Entradas'), ('cache_bytes', 'Bytes')):
+        tamanhos = df[df['metrica'] == metrica]
+        if not tamanhos.empty:
+            resumo[coluna] = tamanhos.set_index('cache')['valor']
+    return resumo.rename(columns={'acerto': 'Acertos', 'falha': 'Falhas'}).round(1)
+
+# ======= INTERFACE STREAMLIT PRINCIPAL =======
+
+def main():
+    st.title("📈 Métricas do Servidor")
+
+    if st.session_state.get('cargo') != "Administrador":
+        st.error("Página disponível apenas para administradores.")
+        return
+
+    if SERVIDOR_AUXILIAR_PORTA:
+        st.caption(f"Formato Prometheus em http://{SERVIDOR_AUXILIAR_ENDERECO}:{SERVIDOR_AUXILIAR_PORTA}/metrics "
+                   "(valores do processo desde o último reinício)")
+
+    if st.button("Atualizar"):
+        st.rerun()
+
+    df = tabela_metricas()
+    if df.empty:
+        st.info("Nenhuma métrica registrada ainda.")
+        return
+
+    st.markdown("### Execuções de página")
+    paginas = resumo_latencias(df, 'pagina_execucao_seconds', 'pagina') if 'pagina' in df else pd.DataFrame()
+    if paginas.empty:
+        st.info("Nenhuma execução de página registrada.")
+    else:
+        st.dataframe(paginas, use_container_width=True)
+
+    fragmentos = resumo_latencias(df, 'fragmento_execucao_seconds', 'fragmento') if 'fragmento' in df else pd.DataFrame()
+    if not fragmentos.empty:
+        st.markdown("### Execuções de trechos de página")
+        st.dataframe(fragmentos, use_container_width=True)
+
+    st.markdown("### Caches")
+    caches = resumo_caches(df) if 'cache' in df else pd.DataFrame()
+    if caches.empty:
+        st.info("Nenhuma consulta a cache registrada.")
+    else:
+        st.dataframe(caches, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("### Jira")
+        if 'host' in df:
+            requisicoes = df[df['metrica'] == 'jira_requisicoes_total']
+            st.dataframe(requisicoes.pivot_table(index='host', columns='status', values='valor',
+                                                 aggfunc='sum', fill_value=0),
+                         use_container_width=True)
+            st.dataframe(resumo_latencias(df, 'jira_requisicao_seconds', 'host'), use_container_width=True)
+        else:
+            st.info("Nenhuma requisição ao Jira registrada.")
+
+    with col2:
+        st.markdown("### Banco de dados")
+        if 'tipo' in df:
+            st.dataframe(resumo_latencias(df, 'db_consulta_seconds', 'tipo'), use_container_width=True)
+        conexoes = df.loc[df['metrica'] == 'db_conexoes_total', 'valor'].sum()
+        st.metric("Conexões abertas", int(conexoes))
+
+    st.markdown("### Memória das sessões")
+    st.caption(f"Medida a cada {INTERVALO_LIMPEZA} s, na limpeza das sessões paradas.")
+    sessoes = pd.DataFrame(resumo_sessoes())
+    if sessoes.empty:
+        st.info("Nenhuma sessão registrada.")
+    else:
+        sessoes['MB'] = (sessoes.pop('bytes') / 1024 / 1024).round(2)
+        st.dataframe(sessoes, use_container_width=True, hide_index=True)
+
+    if PERFIL_ATIVO:
+        st.markdown("### Perfil das páginas")
+        st.dataframe(pd.DataFrame(resumo_perfil()), use_container_width=True)
+
+    with st.expander("Texto Prometheus"):
+        st.code(texto_prometheus(), language="text")
+
+if __name__ == "__main__":
+    main()
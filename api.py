@@ -0,0 +1,282 @@
+# api.py
+import datetime
+import gzip
+import hashlib
+import hmac
+import io
+import ipaddress
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cache_utils import impressao_digital
+from db_utils import init_db, carregar_projetos
+from jira_utils import listar_snapshots, montar_tarefas, combinar_projetos, calcular_pacote_metricas
+from metricas_utils import incrementar
+from perf_utils import executar_uma_vez
+from servidor_utils import registrar_rota, SERVIDOR_AUXILIAR_ENDERECO
+
+# API somente leitura sobre os mesmos dados das páginas, servida pelo servidor auxiliar.
+# Com API_TOKEN definido, as requisições precisam de "Authorization: Bearer <token>". Sem ele a API só
+# responde com o servidor auxiliar restrito à própria máquina (ela não passa pelo login do app).
+# As rotas do Jira pedem também as credenciais do Jira (X-Jira-Email e X-Jira-Token) e só mostram os
+# snapshots buscados com elas, como as páginas.
+API_TOKEN = os.getenv("API_TOKEN", "")
+POR_PAGINA_PADRAO = 100
+MAX_POR_PAGINA = 1000
+TAMANHO_MINIMO_GZIP = 1024  # Respostas menores vão sem compressão
+MAX_TAREFAS_MEMORIZADAS = 8  # Combinações de datasets do Jira montadas (com histórico e worklogs) guardadas
+
+TIPOS_CONTEUDO = {
+    'json': 'application/json; charset=utf-8',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+
+class ErroApi(Exception):
+    """Erro com status HTTP, devolvido ao cliente como {"erro": mensagem}"""
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+        self.mensagem = mensagem
+
+# ======= FUNÇÕES DE UTILIDADE =======
+
+def parametro(parametros, nome, padrao=None):
+    """Primeiro valor de um parâmetro da query string"""
+    valores = parametros.get(nome)
+    return valores[0] if valores else padrao
+
+def parametro_inteiro(parametros, nome, padrao, minimo, maximo):
+    valor = parametro(parametros, nome)
+    if valor is None:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ErroApi(400, f"Parâmetro '{nome}' deve ser um número inteiro")
+    if not minimo <= valor <= maximo:
+        raise ErroApi(400, f"Parâmetro '{nome}' deve estar entre {minimo} e {maximo}")
+    return valor
+
+def _json_padrao(valor):
+    """Conversão para JSON dos tipos do pandas/numpy que aparecem nos pacotes de métricas"""
+    if isinstance(valor, pd.DataFrame):
+        return json.loads(valor.to_json(orient='records', date_format='iso', force_ascii=False))
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (datetime.date, datetime.datetime, pd.Timestamp)):
+        return valor.isoformat()
+    return str(valor)
+
+def serializar_tabela(df, formato):
+    """DataFrame em JSON (lista de registros) ou Arrow IPC stream"""
+    if formato == 'arrow':
+        import pyarrow as pa
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        buffer = io.BytesIO()
+        with pa.ipc.new_stream(buffer, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        return buffer.getvalue()
+    return df.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+
+def _endereco_local(endereco):
+    """Se o servidor auxiliar só aceita conexões da própria máquina"""
+    if endereco == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(endereco).is_loopback
+    except ValueError:
+        return False
+
+API_ABERTA = not API_TOKEN and _endereco_local(SERVIDOR_AUXILIAR_ENDERECO)
+
+def _autorizado(cabecalhos):
+    if not API_TOKEN:
+        return API_ABERTA
+    autorizacao = cabecalhos.get('Authorization', '')
+    return autorizacao.startswith('Bearer ') and hmac.compare_digest(autorizacao[7:].encode(), API_TOKEN.encode())
+
+def _etag_corresponde(cabecalhos, etag):
+    """Se algum ETag do If-None-Match é o atual (comparação fraca, como pede o RFC 9110)"""
+    enviados = cabecalhos.get('If-None-Match')
+    if not enviados:
+        return False
+    if enviados.strip() == '*':
+        return True
+    return any(valor.strip().removeprefix('W/') == etag.removeprefix('W/') for valor in enviados.split(','))
+
+def _comprimir(cabecalhos_requisicao, cabecalhos, corpo):
+    cabecalhos['Vary'] = 'Accept-Encoding, Authorization, X-Jira-Email, X-Jira-Token'
+    aceitas = [codificacao.split(';')[0].strip() for codificacao in cabecalhos_requisicao.get('Accept-Encoding', '').split(',')]
+    if len(corpo) >= TAMANHO_MINIMO_GZIP and 'gzip' in aceitas:
+        cabecalhos['Content-Encoding'] = 'gzip'
+        return gzip.compress(corpo, compresslevel=6)
+    return corpo
+
+def _resposta_erro(status, mensagem, cabecalhos=None):
+    corpo = json.dumps({'erro': mensagem}, ensure_ascii=False).encode('utf-8')
+    return status, {'Content-Type': TIPOS_CONTEUDO['json'], **(cabecalhos or {})}, corpo
+
+def registrar_endpoint(caminho, funcao, tabela=True):
+    """Registra um endpoint da API; funcao(parametros, cabecalhos) devolve (versão dos dados, função que produz os dados)"""
+    # A versão (junto com os parâmetros) forma o ETag: um If-None-Match atual recebe 304 sem os dados
+    # serem montados nem serializados. Endpoints de tabela produzem DataFrames (paginados, JSON ou Arrow);
+    # os demais produzem objetos, só em JSON.
+    def tratar(parametros, cabecalhos):
+        status, cabecalhos_resposta, corpo = _tratar(funcao, tabela, parametros, cabecalhos)
+        incrementar('api_requisicoes_total', rota=caminho, status=status)
+        return status, cabecalhos_resposta, corpo
+
+    registrar_rota(caminho, tratar)
+
+def _tratar(funcao, tabela, parametros, cabecalhos):
+    if not _autorizado(cabecalhos):
+        mensagem = "Token de acesso inválido" if API_TOKEN else "API desativada: defina API_TOKEN para acessá-la pela rede"
+        return _resposta_erro(401, mensagem, {'WWW-Authenticate': 'Bearer'})
+
+    try:
+        formato = parametro(parametros, 'formato', 'json')
+        if formato not in TIPOS_CONTEUDO or (formato == 'arrow' and not tabela):
+            raise ErroApi(400, "Formato inválido (use json" + (" ou arrow)" if tabela else ")"))
+        if tabela:
+            pagina = parametro_inteiro(parametros, 'pagina', 1, 1, 10 ** 9)
+            por_pagina = parametro_inteiro(parametros, 'por_pagina', POR_PAGINA_PADRAO, 1, MAX_POR_PAGINA)
+
+        versao, produzir = funcao(parametros, cabecalhos)
+        consulta = sorted((nome, valores) for nome, valores in parametros.items())
+        # ETag fraco: o mesmo conteúdo vai com ou sem gzip, então o corpo em bytes muda com o Content-Encoding
+        etag = 'W/"' + hashlib.sha1(f"{versao}|{consulta}".encode()).hexdigest() + '"'
+        cabecalhos_resposta = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if _etag_corresponde(cabecalhos, etag):
+            return 304, cabecalhos_resposta, b''
+
+        dados = produzir()
+        if tabela:
+            cabecalhos_resposta['X-Total-Count'] = str(len(dados))
+            inicio = (pagina - 1) * por_pagina
+            corpo = serializar_tabela(dados.iloc[inicio:inicio + por_pagina], formato)
+        else:
+            corpo = json.dumps(dados, default=_json_padrao, ensure_ascii=False).encode('utf-8')
+    except ErroApi as e:
+        return _resposta_erro(e.status, e.mensagem)
+
+    cabecalhos_resposta['Content-Type'] = TIPOS_CONTEUDO[formato]
+    corpo = _comprimir(cabecalhos, cabecalhos_resposta, corpo)
+    return 200, cabecalhos_resposta, corpo
+
+# ======= PROJETOS E CALENDÁRIOS =======
+
+def api_projetos(parametros, cabecalhos):
+    executar_uma_vez(init_db)
+    df = carregar_projetos()
+    return impressao_digital(df), lambda: df
+
+def api_calendarios(parametros, cabecalhos):
+    # Import tardio: o módulo do calendário depende do psycopg2 e do PostgreSQL
+    from database.calendariodatabase import Database
+
+    db = Database()
+    if not db.connect():
+        raise ErroApi(503, "Banco de dados dos calendários indisponível")
+    try:
+        df = pd.DataFrame(db.get_all_calendarios(), columns=['id', 'nome', 'email'])
+    finally:
+        db.close()
+    return impressao_digital(df), lambda: df
+
+# ======= JIRA =======
+
+# Identificadores e datas dos snapshots -> (tarefas, worklogs) já montados (LRU)
+_tarefas_montadas = OrderedDict()
+_tarefas_lock = threading.Lock()
+
+def snapshots_do_usuario(cabecalhos):
+    """Snapshots buscados com as credenciais do Jira enviadas nos cabeçalhos"""
+    email, token = cabecalhos.get('X-Jira-Email'), cabecalhos.get('X-Jira-Token')
+    if not email or not token:
+        raise ErroApi(401, "Informe as credenciais do Jira nos cabeçalhos X-Jira-Email e X-Jira-Token")
+    return listar_snapshots(email, token)
+
+def datasets_solicitados(parametros, cabecalhos):
+    """Datasets pedidos em ?dataset= (repetido ou separado por vírgula), com a versão de cada um"""
+    identificadores = [identificador for valor in parametros.get('dataset', [])
+                       for identificador in valor.split(',') if identificador]
+    if not identificadores:
+        raise ErroApi(400, "Informe o parâmetro 'dataset' (veja /api/jira/datasets)")
+
+    publicados = snapshots_do_usuario(cabecalhos)
+    desconhecidos = [identificador for identificador in identificadores if identificador not in publicados]
+    if desconhecidos:
+        raise ErroApi(404, f"Dataset não encontrado: {', '.join(desconhecidos)}")
+
+    identificadores = sorted(set(identificadores))
+    datasets = [publicados[identificador] for identificador in identificadores]
+    versao = tuple((identificador, dataset['snapshot']['atualizado_em'].isoformat())
+                   for identificador, dataset in zip(identificadores, datasets))
+    return datasets, versao
+
+def tarefas_montadas(datasets, versao):
+    """Tarefas e worklogs dos datasets, montados uma vez por versão dos snapshots"""
+    with _tarefas_lock:
+        if versao in _tarefas_montadas:
+            _tarefas_montadas.move_to_end(versao)
+            return _tarefas_montadas[versao]
+
+    resultado = montar_tarefas([(dataset['site'], dataset['snapshot']) for dataset in datasets])
+    with _tarefas_lock:
+        _tarefas_montadas[versao] = resultado
+        while len(_tarefas_montadas) > MAX_TAREFAS_MEMORIZADAS:
+            _tarefas_montadas.popitem(last=False)
+    return resultado
+
+def api_jira_datasets(parametros, cabecalhos):
+    publicados = snapshots_do_usuario(cabecalhos)
+    linhas = [{
+        'dataset': identificador,
+        'site': dataset['site'],
+        'projeto': dataset['projeto'],
+        'data_inicio': dataset['data_inicio'],
+        'data_fim': dataset['data_fim'],
+        'filtros': json.dumps(dataset['filtros'], ensure_ascii=False),
+        'tarefas': len(dataset['snapshot']['df']),
+        'atualizado_em': dataset['snapshot']['atualizado_em']
+    } for identificador, dataset in sorted(publicados.items())]
+
+    versao = [(linha['dataset'], linha['atualizado_em'].isoformat()) for linha in linhas]
+    colunas = ['dataset', 'site', 'projeto', 'data_inicio', 'data_fim', 'filtros', 'tarefas', 'atualizado_em']
+    return versao, lambda: pd.DataFrame(linhas, columns=colunas)
+
+def api_jira_tarefas(parametros, cabecalhos):
+    datasets, versao = datasets_solicitados(parametros, cabecalhos)
+    # Com ?completo=0 vão só as colunas do snapshot, sem buscar histórico e worklogs no banco
+    if parametro(parametros, 'completo', '1') == '0':
+        return versao, lambda: combinar_projetos([dataset['snapshot']['df'] for dataset in datasets
+                                                  if not dataset['snapshot']['df'].empty])
+    return versao, lambda: tarefas_montadas(datasets, versao)[0]
+
+def api_jira_metricas(parametros, cabecalhos):
+    datasets, versao = datasets_solicitados(parametros, cabecalhos)
+    filtro = {nome: parametro(parametros, nome, "Todos") for nome in ('responsavel', 'status', 'projeto')}
+    # Dias Restantes e Atrasada dependem do dia atual
+    hoje = datetime.datetime.now().date()
+
+    def produzir():
+        df, worklogs = tarefas_montadas(datasets, versao)
+        if df.empty:
+            raise ErroApi(404, "Nenhuma tarefa nos datasets informados")
+        return calcular_pacote_metricas(df, filtro['responsavel'], filtro['status'], hoje, worklogs, filtro['projeto'])
+
+    return (versao, hoje.isoformat()), produzir
+
+if not API_TOKEN and not API_ABERTA:
+    print(f"API de dados desativada: o servidor auxiliar atende em {SERVIDOR_AUXILIAR_ENDERECO} e API_TOKEN não foi definido")
+
+registrar_endpoint('/api/projetos', api_projetos)
+registrar_endpoint('/api/calendarios', api_calendarios)
+registrar_endpoint('/api/jira/datasets', api_jira_datasets)
+registrar_endpoint('/api/jira/tarefas', api_jira_tarefas)
+registrar_endpoint('/api/jira/metricas', api_jira_metricas, tabela=False)
@@ -0,0 +1,124 @@
+# aquecimento_utils.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from db_utils import init_db, carregar_projetos
+from jira_utils import init_jira_db, obter_snapshot, MAX_CONEXOES_JIRA
+from metricas_utils import registrar_coletor
+from perf_utils import executar_uma_vez
+from servidor_utils import registrar_rota
+
+# Aquecimento ao subir o processo: esquema do banco, caches de projetos e calendários e snapshots do Jira
+# ficam prontos antes da primeira sessão. Projetos do Jira a aquecer, em JSON:
+# JIRA_AQUECIMENTO='[{"url": "https://empresa.atlassian.net", "email": "...", "token": "...", "projetos": ["ABC"]}]'
+JIRA_AQUECIMENTO = os.getenv("JIRA_AQUECIMENTO", "")
+TEMPO_MAXIMO_AQUECIMENTO = int(os.getenv("AQUECIMENTO_TEMPO_MAXIMO", "120"))  # Segundos esperando antes de abrir o app
+
+# Etapa -> {'status': 'ok' | 'erro', 'segundos': s, 'detalhe': texto}
+_etapas = {}
+_pronto = threading.Event()
+_aquecimento = None
+
+# ======= ETAPAS =======
+
+def etapa_esquema():
+    executar_uma_vez(init_db)
+    executar_uma_vez(init_jira_db)
+
+def etapa_projetos():
+    return f"{len(carregar_projetos())} projetos"
+
+def etapa_calendarios():
+    # Import tardio: o módulo do calendário depende do psycopg2 e do PostgreSQL
+    from database.calendariodatabase import Database
+
+    db = Database()
+    if not db.connect():
+        raise RuntimeError("banco de dados dos calendários indisponível")
+    try:
+        return f"{len(db.get_all_calendarios())} calendários"
+    finally:
+        db.close()
+
+def fontes_aquecimento():
+    """[(url, email, token, projeto)] configurados em JIRA_AQUECIMENTO"""
+    if not JIRA_AQUECIMENTO:
+        return []
+    fontes = []
+    for site in json.loads(JIRA_AQUECIMENTO):
+        # Os valores precisam ser os mesmos digitados na página, que fazem parte da chave do snapshot
+        fontes.extend((site['url'], site['email'], site['token'], projeto) for projeto in site['projetos'])
+    return fontes
+
+def etapa_jira():
+    fontes = fontes_aquecimento()
+    if not fontes:
+        return "nenhum projeto em JIRA_AQUECIMENTO"
+
+    # Mesmo período padrão da página (sem datas nem filtros), então a primeira sessão reaproveita o snapshot:
+    # o que estiver em disco é restaurado e o resto é buscado no Jira
+    with ThreadPoolExecutor(max_workers=MAX_CONEXOES_JIRA) as executor:
+        resultados = list(executor.map(lambda fonte: obter_snapshot(*fonte), fontes))
+
+    falhas = [f"{fonte[3]} ({resultado})" for fonte, (sucesso, resultado) in zip(fontes, resultados) if not sucesso]
+    if falhas:
+        raise RuntimeError(f"{len(falhas)} de {len(fontes)} projetos sem snapshot: {', '.join(falhas)}")
+    tarefas = sum(len(snapshot['df']) for _, snapshot in resultados)
+    return f"{len(fontes)} projetos, {tarefas} tarefas"
+
+# Em ordem: o esquema precisa existir antes das leituras
+ETAPAS = [
+    ('esquema', etapa_esquema),
+    ('projetos', etapa_projetos),
+    ('calendarios', etapa_calendarios),
+    ('jira', etapa_jira),
+]
+
+# ======= EXECUÇÃO =======
+
+def aquecer():
+    """Executa as etapas em sequência; a falha de uma etapa é registrada e não impede as seguintes"""
+    inicio_total = time.perf_counter()
+    for etapa, funcao in ETAPAS:
+        inicio = time.perf_counter()
+        try:
+            detalhe, status = funcao(), 'ok'
+        except Exception as e:
+            detalhe, status = str(e), 'erro'
+        segundos = time.perf_counter() - inicio
+        _etapas[etapa] = {'status': status, 'segundos': round(segundos, 3), 'detalhe': detalhe}
+        print(f"[aquecimento] {etapa}: {status} em {segundos * 1000:.0f} ms" + (f" ({detalhe})" if detalhe else ""))
+
+    print(f"[aquecimento] concluído em {(time.perf_counter() - inicio_total) * 1000:.0f} ms")
+    _pronto.set()
+
+def iniciar_aquecimento():
+    """Inicia o aquecimento numa thread de fundo; chamar uma vez por processo"""
+    global _aquecimento
+    if _aquecimento is None:
+        _aquecimento = threading.Thread(target=aquecer, name="aquecimento", daemon=True)
+        _aquecimento.start()
+    return _aquecimento
+
+def aguardar_aquecimento(tempo_maximo=TEMPO_MAXIMO_AQUECIMENTO):
+    """Espera o aquecimento terminar (até tempo_maximo segundos); devolve se terminou"""
+    return _pronto.wait(tempo_maximo)
+
+# ======= PRONTIDÃO =======
+
+def _pronto_rota(parametros, cabecalhos):
+    corpo = json.dumps({'pronto': _pronto.is_set(), 'etapas': dict(_etapas)}, ensure_ascii=False).encode('utf-8')
+    return (200 if _pronto.is_set() else 503), {'Content-Type': 'application/json; charset=utf-8'}, corpo
+
+registrar_rota('/ready', _pronto_rota)
+
+def _medidas_aquecimento():
+    medidas = [('aquecimento_pronto', {}, int(_pronto.is_set()))]
+    medidas.extend(('aquecimento_etapa_seconds', {'etapa': etapa, 'status': info['status']}, info['segundos'])
+                   for etapa, info in list(_etapas.items()))
+    return medidas
+
+registrar_coletor(_medidas_aquecimento)
@@ -0,0 +1,113 @@
+# benchmarks/bench_cache.py
+# Mede os backends do cache compartilhado (SQLite em arquivo e Redis falso via RESP): gravação e leitura de
+# DataFrames, versões de invalidação e quantas "réplicas" concorrentes acabam refazendo a mesma atualização.
+#
+# Uso: python benchmarks/bench_cache.py --tamanhos 1000 100000 --replicas 8 --json resultados.json
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jira_utils
+from cache_compartilhado_utils import BackendSQLite, BackendRedis, serializar
+from fake_jira import gerar_dados
+from fake_redis import ServidorRedisFalso
+
+def medir(funcao, repeticoes):
+    """Melhor tempo de 'repeticoes' execuções"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+def medir_frames(nome, criar_backend, df, repeticoes):
+    backend = criar_backend()
+    backend.gravar('bench:frame', df)
+    recuperado = backend.obter('bench:frame')
+    assert recuperado.equals(df) and (recuperado.dtypes == df.dtypes).all(), "DataFrame alterado no backend"
+    return {
+        'backend': nome,
+        'tarefas': len(df),
+        'bytes': len(serializar(df)),
+        'gravar_s': round(medir(lambda: backend.gravar('bench:frame', df), repeticoes), 4),
+        'obter_s': round(medir(lambda: backend.obter('bench:frame'), repeticoes), 4),
+        'versao_ms': round(medir(lambda: backend.versao('bench'), repeticoes) * 1000, 3),
+    }
+
+def simular_replicas(criar_backend, replicas, duracao_busca):
+    """Réplicas pedindo a mesma atualização ao mesmo tempo: só quem obtém a trava primeiro deve buscar"""
+    criar_backend().remover('bench:snapshot')
+    buscas = []
+    barreira = threading.Barrier(replicas)
+
+    def replica(indice):
+        backend = criar_backend()  # Cada réplica com as próprias conexões
+        barreira.wait()
+        with backend.trava('bench:snapshot', expira=30, espera=30):
+            if backend.obter('bench:snapshot') is None:
+                buscas.append(indice)
+                time.sleep(duracao_busca)  # A busca no Jira
+                backend.gravar('bench:snapshot', {'atualizado_em': time.time()})
+
+    threads = [threading.Thread(target=replica, args=(indice,)) for indice in range(replicas)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(buscas), time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do cache compartilhado')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='quantidades de tarefas dos DataFrames gravados')
+    parser.add_argument('--replicas', type=int, default=8, help='réplicas concorrentes na simulação de atualização')
+    parser.add_argument('--latencia', type=float, default=0.0, help='latência por comando do Redis falso')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--json', help='arquivo para gravar os resultados')
+    args = parser.parse_args()
+
+    servidor = ServidorRedisFalso(latencia=args.latencia).iniciar()
+    diretorio = tempfile.mkdtemp(prefix='bench_cache_')
+    backends = {
+        'sqlite': lambda: BackendSQLite(os.path.join(diretorio, 'cache.db')),
+        'redis': lambda: BackendRedis(servidor.url),
+    }
+
+    frames = []
+    for tamanho in args.tamanhos:
+        df = jira_utils.processar_dados_jira(gerar_dados(tamanho))
+        for nome, criar_backend in backends.items():
+            frames.append(medir_frames(nome, criar_backend, df, args.repeticoes))
+
+    replicas = []
+    for nome, criar_backend in backends.items():
+        buscas, segundos = simular_replicas(criar_backend, args.replicas, 0.5)
+        replicas.append({'backend': nome, 'replicas': args.replicas, 'buscas': buscas, 'segundos': round(segundos, 3)})
+
+    servidor.shutdown()
+
+    print(f"{'backend':<10}{'tarefas':>9}{'MB':>9}{'gravar s':>11}{'obter s':>10}{'versão ms':>11}")
+    for r in frames:
+        print(f"{r['backend']:<10}{r['tarefas']:>9}{r['bytes'] / 1024 / 1024:>9.2f}{r['gravar_s']:>11.4f}"
+              f"{r['obter_s']:>10.4f}{r['versao_ms']:>11.3f}")
+    print()
+    print(f"{'backend':<10}{'réplicas':>10}{'buscas':>8}{'segundos':>10}")
+    for r in replicas:
+        print(f"{r['backend']:<10}{r['replicas']:>10}{r['buscas']:>8}{r['segundos']:>10.3f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'frames': frames, 'replicas': replicas}, arquivo, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
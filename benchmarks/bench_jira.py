@@ -0,0 +1,94 @@
+# benchmarks/bench_jira.py
+# Mede o caminho do dashboard do Jira (busca, processamento, métricas e insights) contra o Jira falso,
+# registrando tempo, número de requisições e pico de memória de cada etapa.
+#
+# Uso: python benchmarks/bench_jira.py --tamanhos 1000 10000 100000 --latencia 0.05 --taxa-429 0.02 --json resultados.json
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import jira_utils
+from fake_jira import ServidorJiraFalso, gerar_dados
+
+def medir(etapa, tarefas, funcao, *args, servidor=None, repeticoes=3):
+    """Executa a etapa 'repeticoes' vezes (melhor tempo) e mais uma sob tracemalloc (pico de memória)"""
+    tempos = []
+    requisicoes = respostas_429 = 0
+    for _ in range(repeticoes):
+        if servidor:
+            servidor.zerar_contadores()
+        inicio = time.perf_counter()
+        resultado = funcao(*args)
+        tempos.append(time.perf_counter() - inicio)
+        if servidor:
+            requisicoes, respostas_429 = servidor.requisicoes, servidor.respostas_429
+
+    tracemalloc.start()
+    funcao(*args)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return resultado, {
+        'etapa': etapa,
+        'tarefas': tarefas,
+        'segundos': round(min(tempos), 4),
+        'requisicoes': requisicoes,
+        'respostas_429': respostas_429,
+        'pico_mb': round(pico / 1024 / 1024, 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do caminho do Jira')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='quantidades de tarefas para processamento, métricas e insights')
+    parser.add_argument('--latencia', type=float, default=0.0, help='latência por requisição do Jira falso')
+    parser.add_argument('--taxa-429', type=float, default=0.0, help='fração de respostas 429 do Jira falso')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--json', help='arquivo para gravar os resultados')
+    args = parser.parse_args()
+
+    servidor = ServidorJiraFalso(tarefas=max(args.tamanhos), latencia=args.latencia,
+                                 taxa_429=args.taxa_429).iniciar()
+    resultados = []
+
+    # Busca paginada (buscar_dados_jira traz no máximo 500 tarefas por projeto)
+    dados, medicao = medir('buscar_dados_jira', None, jira_utils.buscar_dados_jira,
+                           servidor.url, 'bench@example.com', 'token', 'BENCH',
+                           servidor=servidor, repeticoes=args.repeticoes)
+    medicao['tarefas'] = len(dados[1]['issues']) if dados[0] else 0
+    resultados.append(medicao)
+
+    for tamanho in args.tamanhos:
+        dados_brutos = gerar_dados(tamanho)
+
+        df, medicao = medir('processar_dados_jira', tamanho, jira_utils.processar_dados_jira,
+                            dados_brutos, repeticoes=args.repeticoes)
+        resultados.append(medicao)
+
+        df = jira_utils.adicionar_colunas_temporais(df)
+        _, medicao = medir('calcular_metricas', tamanho, jira_utils.calcular_metricas, df, repeticoes=args.repeticoes)
+        resultados.append(medicao)
+
+        _, medicao = medir('gerar_insights', tamanho, jira_utils.gerar_insights, df, 'semana', repeticoes=args.repeticoes)
+        resultados.append(medicao)
+
+    servidor.shutdown()
+
+    print(f"{'etapa':<22}{'tarefas':>9}{'segundos':>11}{'requisições':>13}{'429':>6}{'pico MB':>10}")
+    for r in resultados:
+        print(f"{r['etapa']:<22}{r['tarefas']:>9}{r['segundos']:>11.4f}{r['requisicoes']:>13}"
+              f"{r['respostas_429']:>6}{r['pico_mb']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({'parametros': vars(args), 'resultados': resultados}, arquivo, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+# benchmarks/bench_sessoes.py
+# Teste de carga do app: sobe o Streamlit (iniciar.py) num diretório temporário e simula N sessões de
+# navegador simultâneas pelo websocket, cada uma fazendo login, filtrando e salvando projetos (ia.py),
+# filtrando o dashboard do Jira contra o Jira falso e adicionando/removendo calendários. Mede a latência
+# de cada execução (percentis por etapa), os bytes recebidos e a CPU e a memória do processo do servidor.
+# Cada quantidade de sessões roda num servidor novo, para os níveis serem comparáveis entre si.
+#
+# Uso: python benchmarks/bench_sessoes.py --sessoes 1 5 10 20 --rodadas 3 --json carga.json --comparar anterior.json
+#
+# O DATABASE_URL do ambiente é repassado ao app; sem ele, os projetos ficam num SQLite temporário (e os
+# calendários, sem PostgreSQL, no modo local de cada sessão).
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import streamlit
+from cliente_streamlit import SessaoStreamlit, ErroSessao
+from fake_jira import ServidorJiraFalso
+
+USUARIO = ('admin@grupochegou.com', 'admgc2025')  # Administrador: vê todas as páginas
+TEMPO_SUBIDA = 60  # Segundos esperando o servidor responder no /_stcore/health
+PERCENTIS = (50, 90, 95, 99)
+
+# ======= SERVIDOR DO APP =======
+
+def porta_livre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def semear_projetos(diretorio, quantidade):
+    """Projetos iniciais no banco do app (só se estiver vazio, para não mexer num banco com dados)"""
+    codigo = (
+        "import datetime, random, sys\n"
+        f"sys.path.insert(0, {RAIZ!r})\n"
+        "from db_utils import init_db, carregar_projetos, insert_project\n"
+        "init_db()\n"
+        "if carregar_projetos().empty:\n"
+        "    rnd = random.Random(42)\n"
+        "    status = ['Ativo', 'Em Manutenção', 'Arquivado', 'Backlog', 'Em Construção', 'Período de Validação']\n"
+        f"    for i in range({quantidade}):\n"
+        "        criado = datetime.date.today() - datetime.timedelta(days=rnd.randint(0, 720))\n"
+        "        insert_project(f'Projeto {i + 1}', criado, None, f'Descrição {i + 1}', rnd.choice(status),\n"
+        "                       'https://example.com', 'Python', 'v1', rnd.sample(['Murillo', 'Vinicius', 'Matheus'], 2))\n"
+    )
+    # Em outro processo: o db_utils usa o projetos.db do diretório atual
+    subprocess.run([sys.executable, '-c', codigo], cwd=diretorio, check=True)
+
+class ServidorApp:
+    """Processo 'streamlit run iniciar.py' com amostragem de CPU e memória pelo /proc"""
+
+    def __init__(self, diretorio, porta):
+        self.diretorio = diretorio
+        self.porta = porta
+        self.url = f'http://127.0.0.1:{porta}'
+        self.processo = None
+        self.amostras = []  # (instante, segundos de CPU, bytes residentes)
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        ambiente = dict(os.environ, SERVIDOR_AUXILIAR_PORTA='0', PYTHONUNBUFFERED='1')
+        comando = [sys.executable, '-m', 'streamlit', 'run', os.path.join(RAIZ, 'iniciar.py'),
+                   '--server.port', str(self.porta), '--server.headless', 'true',
+                   '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+        self._log = open(os.path.join(self.diretorio, 'servidor.log'), 'w')
+        self.processo = subprocess.Popen(comando, cwd=self.diretorio, env=ambiente,
+                                         stdout=self._log, stderr=subprocess.STDOUT)
+        limite = time.monotonic() + TEMPO_SUBIDA
+        while time.monotonic() < limite:
+            if self.processo.poll() is not None:
+                raise RuntimeError(f"Servidor encerrou ao subir (veja {self._log.name})")
+            try:
+                with urllib.request.urlopen(self.url + '/_stcore/health', timeout=1) as resposta:
+                    if resposta.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            raise RuntimeError(f"Servidor não respondeu em {TEMPO_SUBIDA} s")
+        threading.Thread(target=self._amostrar, name='amostras', daemon=True).start()
+        return self
+
+    def medida(self):
+        """(segundos de CPU, bytes residentes) do processo, ou (None, None) sem /proc"""
+        try:
+            with open(f'/proc/{self.processo.pid}/stat') as arquivo:
+                campos = arquivo.read().rsplit(')', 1)[1].split()
+            cpu = (int(campos[11]) + int(campos[12])) / os.sysconf('SC_CLK_TCK')
+            with open(f'/proc/{self.processo.pid}/status') as arquivo:
+                rss = next(int(linha.split()[1]) * 1024 for linha in arquivo if linha.startswith('VmRSS:'))
+            return cpu, rss
+        except (OSError, StopIteration, IndexError):
+            return None, None
+
+    def _amostrar(self):
+        while not self._parar.wait(0.5):
+            cpu, rss = self.medida()
+            if cpu is not None:
+                self.amostras.append((time.monotonic(), cpu, rss))
+
+    def parar(self):
+        self._parar.set()
+        if self.processo is not None and self.processo.poll() is None:
+            self.processo.terminate()
+            try:
+                self.processo.wait(10)
+            except subprocess.TimeoutExpired:
+                self.processo.kill()
+        self._log.close()
+
+# ======= CENÁRIOS =======
+
+class Medicoes:
+    """Latências, bytes e erros por etapa, compartilhados pelas sessões de um nível"""
+
+    def __init__(self):
+        self.etapas = {}
+        self.falhas = []
+
+    def registrar(self, etapa, sessao, resultado):
+        segundos, recebidos, status = resultado
+        info = self.etapas.setdefault(etapa, {'segundos': [], 'bytes': [], 'erros': 0, 'mensagens': []})
+        info['segundos'].append(segundos)
+        info['bytes'].append(recebidos)
+        erros = sessao.mensagens('exception', 'error')
+        if status != 'ok' or erros:
+            info['erros'] += 1
+            if len(info['mensagens']) < 3:
+                info['mensagens'].extend(erros[:1] or [status])
+
+async def pausar(rnd, pausa):
+    """Tempo de leitura do usuário entre uma interação e outra"""
+    if pausa:
+        await asyncio.sleep(rnd.uniform(0, pausa))
+
+async def cenario_login(sessao, medicoes, rnd, contexto):
+    medicoes.registrar('login: abrir', sessao, await sessao.conectar())
+    await pausar(rnd, contexto['pausa'])
+    sessao.preencher(USUARIO[0], rotulo='Email')
+    sessao.preencher(USUARIO[1], rotulo='Senha')
+    medicoes.registrar('login: entrar', sessao, await sessao.clicar(rotulo='Entrar'))
+    if not sessao.paginas:
+        raise ErroSessao("Login não abriu a navegação")
+
+async def cenario_projetos(sessao, medicoes, rnd, contexto):
+    medicoes.registrar('projetos: abrir', sessao, await sessao.navegar('ia'))
+    await pausar(rnd, contexto['pausa'])
+    status = rnd.choice(sessao.opcoes(rotulo='Status')[1:])
+    medicoes.registrar('projetos: filtrar status', sessao, await sessao.alterar(status, rotulo='Status'))
+    await pausar(rnd, contexto['pausa'])
+    medicoes.registrar('projetos: filtrar nome', sessao, await sessao.alterar(str(rnd.randint(1, 9)), rotulo='Nome'))
+    await pausar(rnd, contexto['pausa'])
+    await sessao.alterar('', rotulo='Nome')
+    medicoes.registrar('projetos: limpar filtros', sessao, await sessao.alterar('Todos', rotulo='Status'))
+    await pausar(rnd, contexto['pausa'])
+
+    # Edita a descrição da primeira linha da tabela e salva
+    edicao = {'edited_rows': {'0': {'descricao': f"Editado pela sessão {contexto['sessao']} em {time.time():.0f}"}},
+              'added_rows': [], 'deleted_rows': []}
+    medicoes.registrar('projetos: editar tabela', sessao,
+                       await sessao.alterar(edicao, chave='editable_table_dashboard'))
+    medicoes.registrar('projetos: salvar', sessao, await sessao.clicar(rotulo='Salvar alterações'))
+
+async def cenario_jira(sessao, medicoes, rnd, contexto):
+    await sessao.navegar('Dash_Jira')
+    if 'jira_conectado' not in contexto:
+        # Primeira rodada da sessão: conecta ao Jira falso (o snapshot é do processo; só a primeira sessão busca)
+        sessao.preencher(contexto['jira_url'], rotulo='URL do Jira (ex: https://seu-dominio.atlassian.net)')
+        sessao.preencher('bench@example.com', rotulo='Email')
+        sessao.preencher('token', rotulo='Token API')
+        sessao.preencher('BENCH', rotulo='Chaves dos Projetos, separadas por vírgula (ex: PROJ, OPS)')
+        medicoes.registrar('jira: conectar e carregar', sessao, await sessao.clicar(rotulo='Testar Conexão e Salvar'))
+        contexto['jira_conectado'] = True
+    medicoes.registrar('jira: abrir dashboard', sessao, await sessao.executar())
+    await pausar(rnd, contexto['pausa'])
+
+    for chave, etapa in (('novo_filtro_responsavel', 'jira: filtrar responsável'), ('novo_filtro_status', 'jira: filtrar status')):
+        valor = rnd.choice(sessao.opcoes(chave=chave))
+        medicoes.registrar(etapa, sessao, await sessao.alterar(valor, chave=chave))
+        await pausar(rnd, contexto['pausa'])
+
+    grafico = rnd.choice(sessao.opcoes(chave='grafico_visivel'))
+    medicoes.registrar('jira: trocar gráfico', sessao, await sessao.alterar(grafico, chave='grafico_visivel'))
+    await pausar(rnd, contexto['pausa'])
+
+    # Poucos períodos diferentes: as sessões reaproveitam os snapshots umas das outras
+    sessao.preencher(date.today() - timedelta(days=rnd.choice([30, 60, 90])), chave='input_data_inicio')
+    medicoes.registrar('jira: atualizar período', sessao,
+                       await sessao.clicar(rotulo='Atualizar dados com filtro de data'))
+
+async def cenario_calendario(sessao, medicoes, rnd, contexto):
+    medicoes.registrar('calendário: abrir', sessao, await sessao.navegar('Calendário'))
+    await pausar(rnd, contexto['pausa'])
+    identificador = f"{contexto['sessao']}-{rnd.randint(0, 10 ** 9)}"
+    await sessao.alterar(f"Carga {identificador}", rotulo='Nome da pessoa ou departamento:')
+    medicoes.registrar('calendário: digitar', sessao,
+                       await sessao.alterar(f"carga-{identificador}@example.com", rotulo='Email do calendário:'))
+    medicoes.registrar('calendário: adicionar', sessao, await sessao.clicar(rotulo='Adicionar Calendário'))
+    await pausar(rnd, contexto['pausa'])
+
+    # O adicionado é o último da lista
+    indices = [int(m.group(1)) for widget_id in sessao.widgets for m in [re.search(r'-remove_(\d+)$', widget_id)] if m]
+    if indices:
+        medicoes.registrar('calendário: remover', sessao, await sessao.clicar(chave=f'remove_{max(indices)}'))
+
+CENARIOS = {
+    'projetos': cenario_projetos,
+    'jira': cenario_jira,
+    'calendario': cenario_calendario,
+}
+
+async def simular_sessao(indice, url, medicoes, args, jira_url):
+    rnd = random.Random(args.semente * 1000 + indice)
+    # Entrada escalonada, como usuários chegando aos poucos
+    await asyncio.sleep(indice * args.intervalo_entrada)
+    sessao = SessaoStreamlit(url, tempo_maximo=args.tempo_maximo)
+    contexto = {'sessao': indice, 'pausa': args.pausa, 'jira_url': jira_url}
+    try:
+        await cenario_login(sessao, medicoes, rnd, contexto)
+        for _ in range(args.rodadas):
+            for nome in args.cenarios:
+                await CENARIOS[nome](sessao, medicoes, rnd, contexto)
+    except (ErroSessao, OSError) as e:
+        medicoes.falhas.append(f"sessão {indice}: {e}")
+    finally:
+        sessao.fechar()
+
+# ======= RELATÓRIO =======
+
+def percentil(valores, p):
+    """Percentil pelo posto mais próximo"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))]
+
+def resumir_etapas(medicoes):
+    resumo = []
+    for etapa, info in medicoes.etapas.items():
+        linha = {'etapa': etapa, 'execucoes': len(info['segundos']), 'erros': info['erros']}
+        for p in PERCENTIS:
+            linha[f'p{p}_ms'] = round(percentil(info['segundos'], p) * 1000, 1)
+        linha['max_ms'] = round(max(info['segundos']) * 1000, 1)
+        linha['kb_medio'] = round(sum(info['bytes']) / len(info['bytes']) / 1024, 1)
+        if info['mensagens']:
+            linha['mensagens'] = info['mensagens']
+        resumo.append(linha)
+    return resumo
+
+def executar_nivel(sessoes, args, jira):
+    diretorio = tempfile.mkdtemp(prefix='bench_sessoes_')
+    try:
+        semear_projetos(diretorio, args.projetos)
+        servidor = ServidorApp(diretorio, porta_livre()).iniciar()
+        try:
+            medicoes = Medicoes()
+            cpu_inicio, rss_inicio = servidor.medida()
+            inicio = time.perf_counter()
+
+            async def todas():
+                await asyncio.gather(*(simular_sessao(i, servidor.url, medicoes, args, jira.url) for i in range(sessoes)))
+            asyncio.run(todas())
+
+            segundos = time.perf_counter() - inicio
+            cpu_fim, rss_fim = servidor.medida()
+            execucoes = sum(len(info['segundos']) for info in medicoes.etapas.values())
+            todas_latencias = [s for info in medicoes.etapas.values() for s in info['segundos']]
+            nivel = {
+                'sessoes': sessoes,
+                'segundos': round(segundos, 2),
+                'execucoes': execucoes,
+                'execucoes_por_segundo': round(execucoes / segundos, 2),
+                'p50_ms': round(percentil(todas_latencias, 50) * 1000, 1) if todas_latencias else None,
+                'p95_ms': round(percentil(todas_latencias, 95) * 1000, 1) if todas_latencias else None,
+                'erros': sum(info['erros'] for info in medicoes.etapas.values()),
+                'falhas': medicoes.falhas,
+                'etapas': resumir_etapas(medicoes),
+            }
+            if cpu_inicio is not None and cpu_fim is not None:
+                nivel['cpu_segundos'] = round(cpu_fim - cpu_inicio, 2)
+                nivel['cpu_medio_pct'] = round((cpu_fim - cpu_inicio) / segundos * 100, 1)
+                nivel['rss_inicial_mb'] = round(rss_inicio / 1024 / 1024, 1)
+                nivel['rss_final_mb'] = round(rss_fim / 1024 / 1024, 1)
+                nivel['rss_pico_mb'] = round(max([rss for _, _, rss in servidor.amostras] + [rss_fim]) / 1024 / 1024, 1)
+            return nivel
+        finally:
+            servidor.parar()
+    finally:
+        if args.manter_diretorio:
+            print(f"Diretório do nível com {sessoes} sessões: {diretorio}")
+        else:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+def imprimir_nivel(nivel):
+    recursos = ''
+    if 'cpu_medio_pct' in nivel:
+        recursos = (f", CPU {nivel['cpu_segundos']} s ({nivel['cpu_medio_pct']}% de um núcleo), "
+                    f"RSS {nivel['rss_inicial_mb']} -> {nivel['rss_final_mb']} MB (pico {nivel['rss_pico_mb']} MB)")
+    print(f"\n== {nivel['sessoes']} sessões: {nivel['execucoes']} execuções em {nivel['segundos']} s "
+          f"({nivel['execucoes_por_segundo']}/s), p50 {nivel['p50_ms']} ms, p95 {nivel['p95_ms']} ms, "
+          f"{nivel['erros']} com erro{recursos}")
+    print(f"{'etapa':<30}{'n':>5}{'p50 ms':>9}{'p90 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}{'KB':>8}{'erros':>7}")
+    for linha in nivel['etapas']:
+        print(f"{linha['etapa']:<30}{linha['execucoes']:>5}{linha['p50_ms']:>9.1f}{linha['p90_ms']:>9.1f}"
+              f"{linha['p95_ms']:>9.1f}{linha['p99_ms']:>9.1f}{linha['max_ms']:>9.1f}{linha['kb_medio']:>8.1f}{linha['erros']:>7}")
+        for mensagem in linha.get('mensagens', []):
+            print(f"    {mensagem[:150]}")
+    for falha in nivel['falhas']:
+        print(f"  falha: {falha}")
+
+def comparar(anterior, atual):
+    """p50/p95 de cada etapa e recursos contra um relatório anterior, por quantidade de sessões"""
+    niveis_anteriores = {nivel['sessoes']: nivel for nivel in anterior['niveis']}
+    for nivel in atual['niveis']:
+        antes = niveis_anteriores.get(nivel['sessoes'])
+        if antes is None:
+            continue
+        print(f"\n== Comparação com {anterior['config'].get('commit') or 'o relatório anterior'}: {nivel['sessoes']} sessões")
+        etapas_antes = {linha['etapa']: linha for linha in antes['etapas']}
+        print(f"{'etapa':<30}{'p50 antes':>11}{'p50 agora':>11}{'Δ%':>8}{'p95 antes':>11}{'p95 agora':>11}{'Δ%':>8}")
+        linhas = [('(todas)', antes, nivel)] + [(linha['etapa'], etapas_antes[linha['etapa']], linha)
+                                                for linha in nivel['etapas'] if linha['etapa'] in etapas_antes]
+        for etapa, linha_antes, linha in linhas:
+            variacoes = []
+            for chave in ('p50_ms', 'p95_ms'):
+                a, b = linha_antes.get(chave), linha.get(chave)
+                variacoes.append((a, b, (b - a) / a * 100 if a and b is not None else 0.0))
+            print(f"{etapa:<30}" + "".join(f"{a:>11.1f}{b:>11.1f}{v:>+8.1f}" for a, b, v in variacoes))
+        for chave, rotulo in (('cpu_segundos', 'CPU (s)'), ('rss_pico_mb', 'RSS pico (MB)'),
+                              ('execucoes_por_segundo', 'execuções/s')):
+            if chave in antes and chave in nivel:
+                print(f"{rotulo:<30}{antes[chave]:>11}{nivel[chave]:>11}")
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga com sessões simultâneas do app')
+    parser.add_argument('--sessoes', type=int, nargs='+', default=[1, 5, 10], help='quantidades de sessões simultâneas')
+    parser.add_argument('--rodadas', type=int, default=2, help='repetições dos cenários por sessão')
+    parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument('--pausa', type=float, default=0.5, help='segundos máximos de leitura entre interações')
+    parser.add_argument('--intervalo-entrada', type=float, default=0.2, help='segundos entre a chegada de cada sessão')
+    parser.add_argument('--tarefas', type=int, default=2000, help='tarefas do projeto no Jira falso')
+    parser.add_argument('--latencia-jira', type=float, default=0.02, help='latência por requisição do Jira falso')
+    parser.add_argument('--projetos', type=int, default=200, help='projetos criados no banco vazio')
+    parser.add_argument('--tempo-maximo', type=float, default=120, help='segundos esperando cada execução')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help='arquivo para gravar o relatório')
+    parser.add_argument('--comparar', help='relatório anterior (--json) para comparar')
+    parser.add_argument('--manter-diretorio', action='store_true', help='mantém banco, snapshots e log do servidor')
+    args = parser.parse_args()
+
+    jira = ServidorJiraFalso(tarefas=args.tarefas, latencia=args.latencia_jira).iniciar()
+    relatorio = {
+        'config': {
+            'commit': commit_atual(),
+            'streamlit': streamlit.__version__,
+            'python': sys.version.split()[0],
+            'cpus': os.cpu_count(),
+            **{chave: valor for chave, valor in vars(args).items() if chave not in ('json', 'comparar', 'manter_diretorio')}
+        },
+        'niveis': []
+    }
+    for sessoes in args.sessoes:
+        nivel = executar_nivel(sessoes, args, jira)
+        relatorio['niveis'].append(nivel)
+        imprimir_nivel(nivel)
+    jira.shutdown()
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparar(json.load(arquivo), relatorio)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+# benchmarks/cliente_streamlit.py
+# Cliente mínimo do websocket do Streamlit (/_stcore/stream) que faz o papel do navegador: mantém os
+# widgets da tela e os valores deles, envia as execuções (da página inteira ou só do trecho/fragmento do
+# widget, como o navegador faz) e mede o tempo até o script_finished e os bytes recebidos.
+import asyncio
+import json
+import time
+from datetime import date
+
+from tornado.httpclient import HTTPRequest
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+# Status do script_finished que encerram uma execução (o FINISHED_EARLY_FOR_RERUN é seguido de outra)
+FINALIZADOS = {
+    ForwardMsg.FINISHED_SUCCESSFULLY: 'ok',
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY: 'ok',
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR: 'erro_compilacao',
+}
+
+class ErroSessao(Exception):
+    pass
+
+class SessaoStreamlit:
+    """Uma aba do navegador conectada ao app"""
+
+    def __init__(self, url, tempo_maximo=120):
+        self.url = url.rstrip('/').replace('http://', 'ws://').replace('https://', 'wss://') + '/_stcore/stream'
+        self.tempo_maximo = tempo_maximo
+        self.conexao = None
+        self.paginas = {}  # url_pathname -> page_script_hash (da navegação)
+        self.pagina = ''
+        self.widgets = {}  # id -> {'tipo', 'rotulo', 'fragmento', 'posicao', 'elemento'}
+        self.estados = {}  # id -> WidgetState com o valor atual
+        self.textos = []  # (exception, error, warning, info ou success; texto) da última execução
+        self._mensagens = {}  # hash -> ForwardMsg já recebida (o servidor reenvia só a referência)
+
+    async def conectar(self):
+        requisicao = HTTPRequest(self.url, headers={'Sec-WebSocket-Protocol': 'streamlit'})
+        self.conexao = await websocket_connect(requisicao, max_message_size=512 * 1024 * 1024)
+        return await self.executar()
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+
+    # ======= WIDGETS =======
+
+    def widget(self, rotulo=None, chave=None):
+        """Id do widget visível com o rótulo (ou cuja chave termina com 'chave'); com rótulos repetidos, o primeiro da tela"""
+        encontrados = [(info['posicao'], widget_id) for widget_id, info in self.widgets.items()
+                       if (rotulo is not None and info['rotulo'] == rotulo)
+                       or (chave is not None and widget_id.endswith('-' + chave))]
+        if encontrados:
+            return min(encontrados)[1]
+        raise ErroSessao(f"Widget não encontrado: {rotulo or chave} (página '{self.pagina}')")
+
+    def opcoes(self, rotulo=None, chave=None):
+        return list(self.widgets[self.widget(rotulo, chave)]['elemento'].options)
+
+    def preencher(self, valor, rotulo=None, chave=None):
+        """Muda o valor de um widget como o navegador faria; devolve o id"""
+        widget_id = self.widget(rotulo, chave)
+        info = self.widgets[widget_id]
+        estado = WidgetState(id=widget_id)
+        if info['tipo'] in ('text_input', 'text_area'):
+            estado.string_value = valor
+        elif info['tipo'] in ('selectbox', 'radio', 'multiselect'):
+            opcoes = list(info['elemento'].options)
+            valores = valor if info['tipo'] == 'multiselect' else [valor]
+            if any(item not in opcoes for item in valores):
+                raise ErroSessao(f"Opção inexistente em '{info['rotulo']}': {valor}")
+            if info['tipo'] == 'multiselect':
+                estado.int_array_value.data.extend(opcoes.index(item) for item in valores)
+            else:
+                estado.int_value = opcoes.index(valor)
+        elif info['tipo'] in ('checkbox', 'toggle'):
+            estado.bool_value = valor
+        elif info['tipo'] == 'date_input':
+            datas = valor if isinstance(valor, (list, tuple)) else [valor]
+            estado.string_array_value.data.extend(data.strftime('%Y/%m/%d') for data in datas)
+        elif info['tipo'] == 'arrow_data_frame':
+            # Edições do st.data_editor: {"edited_rows": {linha: {coluna: valor}}, "added_rows": [], "deleted_rows": []}
+            estado.string_value = json.dumps(valor, default=lambda v: v.isoformat() if isinstance(v, date) else str(v))
+        else:
+            raise ErroSessao(f"Tipo de widget não suportado: {info['tipo']}")
+        self.estados[widget_id] = estado
+        return widget_id
+
+    async def clicar(self, rotulo=None, chave=None):
+        """Clica num botão e espera a execução"""
+        widget_id = self.widget(rotulo, chave)
+        return await self.executar(gatilho=widget_id, fragmento=self.widgets[widget_id]['fragmento'])
+
+    async def alterar(self, valor, rotulo=None, chave=None):
+        """Muda o valor de um widget fora de formulário, o que dispara uma execução"""
+        widget_id = self.preencher(valor, rotulo, chave)
+        return await self.executar(fragmento=self.widgets[widget_id]['fragmento'])
+
+    async def navegar(self, caminho):
+        if caminho not in self.paginas:
+            raise ErroSessao(f"Página indisponível: {caminho} (páginas: {', '.join(self.paginas) or 'nenhuma'})")
+        self.pagina = caminho
+        self.estados = {}
+        return await self.executar()
+
+    # ======= EXECUÇÕES =======
+
+    async def executar(self, gatilho=None, fragmento=''):
+        """Envia uma execução e espera o fim; devolve (segundos, bytes recebidos, status)"""
+        mensagem = BackMsg()
+        estado_cliente = mensagem.rerun_script
+        estado_cliente.query_string = ''
+        estado_cliente.page_script_hash = self.paginas.get(self.pagina, '')
+        estado_cliente.fragment_id = fragmento or ''
+        for widget_id, estado in self.estados.items():
+            if widget_id in self.widgets:
+                estado_cliente.widget_states.widgets.append(estado)
+        if gatilho is not None:
+            estado_cliente.widget_states.widgets.append(WidgetState(id=gatilho, trigger_value=True))
+
+        inicio = time.perf_counter()
+        await self.conexao.write_message(mensagem.SerializeToString(), binary=True)
+        recebidos = 0
+        self.textos = []
+        while True:
+            restante = self.tempo_maximo - (time.perf_counter() - inicio)
+            if restante <= 0:
+                raise ErroSessao(f"Execução sem resposta em {self.tempo_maximo} s (página '{self.pagina}')")
+            dados = await self._ler(restante)
+            recebidos += len(dados)
+            status = self._tratar(dados)
+            if status is not None:
+                return time.perf_counter() - inicio, recebidos, status
+
+    async def _ler(self, tempo_maximo):
+        try:
+            dados = await asyncio.wait_for(self.conexao.read_message(), tempo_maximo)
+        except asyncio.TimeoutError:
+            raise ErroSessao(f"Execução sem resposta em {self.tempo_maximo} s (página '{self.pagina}')")
+        if dados is None:
+            raise ErroSessao("Conexão encerrada pelo servidor")
+        return dados
+
+    def _tratar(self, dados):
+        """Atualiza a tela com uma mensagem; devolve o status quando a execução termina"""
+        mensagem = ForwardMsg()
+        mensagem.ParseFromString(dados)
+        if mensagem.WhichOneof('type') == 'ref_hash':
+            original = self._mensagens.get(mensagem.ref_hash)
+            if original is None:
+                raise ErroSessao("Referência a uma mensagem que esta sessão não recebeu")
+            metadados = mensagem.metadata
+            mensagem = ForwardMsg()
+            mensagem.CopyFrom(original)
+            mensagem.metadata.CopyFrom(metadados)
+        elif mensagem.hash:
+            self._mensagens[mensagem.hash] = mensagem
+
+        tipo = mensagem.WhichOneof('type')
+        if tipo == 'new_session':
+            fragmentos = set(mensagem.new_session.fragment_ids_this_run)
+            # Execução completa redesenha tudo; a de um trecho só os widgets dele
+            self.widgets = {widget_id: info for widget_id, info in self.widgets.items()
+                            if fragmentos and info['fragmento'] not in fragmentos}
+        elif tipo == 'navigation':
+            self.paginas = {pagina.url_pathname: pagina.page_script_hash for pagina in mensagem.navigation.app_pages}
+            for pagina in mensagem.navigation.app_pages:
+                if pagina.page_script_hash == mensagem.navigation.page_script_hash:
+                    self.pagina = pagina.url_pathname
+        elif tipo == 'delta' and mensagem.delta.WhichOneof('type') == 'new_element':
+            self._registrar_elemento(mensagem.delta.new_element, mensagem.delta.fragment_id,
+                                    tuple(mensagem.metadata.delta_path))
+        elif tipo == 'script_finished' and mensagem.script_finished in FINALIZADOS:
+            return FINALIZADOS[mensagem.script_finished]
+        return None
+
+    def _registrar_elemento(self, elemento, fragmento, posicao):
+        tipo = elemento.WhichOneof('type')
+        conteudo = getattr(elemento, tipo)
+        if tipo == 'exception':
+            self.textos.append(('exception', conteudo.message))
+            return
+        if tipo == 'alert':
+            self.textos.append((conteudo.Format.Name(conteudo.format).lower(), conteudo.body))
+            return
+        widget_id = getattr(conteudo, 'id', '') if hasattr(conteudo, 'id') else ''
+        if not widget_id or not widget_id.startswith('$$ID'):
+            return
+        if tipo == 'checkbox' and conteudo.type == conteudo.StyleType.TOGGLE:
+            tipo = 'toggle'
+        self.widgets[widget_id] = {'tipo': tipo, 'rotulo': getattr(conteudo, 'label', ''),
+                                   'fragmento': fragmento, 'posicao': posicao, 'elemento': conteudo}
+
+    def mensagens(self, *tipos):
+        """Textos de exceções e alertas (st.error, st.success...) da última execução"""
+        return [texto for tipo, texto in self.textos if tipo in tipos]
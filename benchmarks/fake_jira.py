@@ -0,0 +1,170 @@
+# benchmarks/fake_jira.py
+# Servidor HTTP local que imita a API do Jira Cloud (/rest/api/3/search e /myself) com tarefas
+# sintéticas e reprodutíveis, para medir o caminho do Jira sem acessar um site real. Histórico e worklogs
+# (/changelog/bulkfetch, /worklog/updated, /worklog/list...) respondem vazios, como num site sem alterações.
+#
+# Uso: python benchmarks/fake_jira.py --tarefas 100000 --porta 8089 --latencia 0.05 --taxa-429 0.02
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+STATUS = ['To Do', 'In Progress', 'Review', 'Done', 'Em andamento', 'Concluído']
+PRIORIDADES = ['Highest', 'High', 'Medium', 'Low', 'Lowest']
+RESPONSAVEIS = [f'Pessoa {i}' for i in range(1, 41)]
+MAX_POR_PAGINA = 100  # Mesmo limite de página do Jira Cloud
+
+def gerar_issue(indice, semente=42, projeto='BENCH', hoje=None):
+    """Gera a tarefa de número 'indice' (sempre a mesma para a mesma semente, com datas relativas a 'hoje')"""
+    rnd = random.Random(semente * 1_000_003 + indice)
+    hoje = hoje or datetime.combine(datetime.now().date(), datetime.min.time())
+
+    criada = hoje - timedelta(days=rnd.randint(0, 365), minutes=rnd.randint(0, 1439))
+    atualizada = criada + timedelta(days=rnd.randint(0, 60), minutes=rnd.randint(0, 1439))
+    prazo = criada + timedelta(days=rnd.randint(1, 90)) if rnd.random() < 0.7 else None
+    estimado = rnd.choice([0, 1800, 3600, 7200, 14400, 28800]) if rnd.random() < 0.6 else None
+    gasto = rnd.randint(0, 40) * 900 if rnd.random() < 0.5 else None
+
+    return {
+        'id': str(10000 + indice),
+        'key': f'{projeto}-{indice + 1}',
+        'fields': {
+            'summary': f'Tarefa sintética {indice + 1}',
+            'status': {'name': rnd.choice(STATUS)},
+            'assignee': {'displayName': rnd.choice(RESPONSAVEIS)} if rnd.random() < 0.9 else None,
+            'created': criada.strftime('%Y-%m-%dT%H:%M:%S.000-0300'),
+            'updated': atualizada.strftime('%Y-%m-%dT%H:%M:%S.000-0300'),
+            'duedate': prazo.strftime('%Y-%m-%d') if prazo else None,
+            'priority': {'name': rnd.choice(PRIORIDADES)},
+            'timetracking': {
+                chave: valor for chave, valor in
+                (('originalEstimateSeconds', estimado), ('timeSpentSeconds', gasto)) if valor is not None
+            }
+        }
+    }
+
+def gerar_dados(total, semente=42):
+    """Resposta bruta com 'total' tarefas, no formato devolvido por buscar_dados_jira"""
+    return {'issues': [gerar_issue(i, semente) for i in range(total)], 'total': total}
+
+class ServidorJiraFalso(ThreadingHTTPServer):
+    """Jira falso com total de tarefas, latência e respostas 429 configuráveis"""
+    daemon_threads = True
+
+    def __init__(self, porta=0, tarefas=1000, semente=42, latencia=0.0, taxa_429=0.0):
+        super().__init__(('127.0.0.1', porta), _TratadorJira)
+        self.tarefas = tarefas
+        self.semente = semente
+        self.latencia = latencia
+        self.taxa_429 = taxa_429
+        self.requisicoes = 0
+        self.respostas_429 = 0
+        self._rnd = random.Random(semente)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def iniciar(self):
+        """Atende em uma thread de fundo e retorna o próprio servidor"""
+        threading.Thread(target=self.serve_forever, name='fake-jira', daemon=True).start()
+        return self
+
+    def zerar_contadores(self):
+        with self._lock:
+            self.requisicoes = 0
+            self.respostas_429 = 0
+
+    def _registrar(self):
+        """Conta a requisição e decide se ela recebe um 429"""
+        with self._lock:
+            self.requisicoes += 1
+            limitar = self._rnd.random() < self.taxa_429
+            if limitar:
+                self.respostas_429 += 1
+        return limitar
+
+class _TratadorJira(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo, cabecalhos=None):
+        dados = json.dumps(corpo).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(dados)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _limitar(self):
+        """Latência e 429 configurados; devolve se a requisição já foi respondida"""
+        servidor = self.server
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        if servidor._registrar():
+            self._responder(429, {'errorMessages': ['Rate limit exceeded']}, {'Retry-After': '1'})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._limitar():
+            return
+        servidor = self.server
+        partes = urlsplit(self.path)
+        parametros = parse_qs(partes.query)
+
+        if partes.path == '/rest/api/3/myself':
+            self._responder(200, {'accountId': 'bench-0001', 'displayName': 'Usuário de Benchmark',
+                                  'emailAddress': 'bench@example.com'})
+        elif partes.path == '/rest/api/3/search':
+            inicio = int(parametros.get('startAt', ['0'])[0])
+            por_pagina = min(int(parametros.get('maxResults', ['50'])[0]), MAX_POR_PAGINA)
+            fim = min(inicio + por_pagina, servidor.tarefas)
+            self._responder(200, {
+                'startAt': inicio,
+                'maxResults': por_pagina,
+                'total': servidor.tarefas,
+                'issues': [gerar_issue(i, servidor.semente) for i in range(inicio, fim)]
+            })
+        elif partes.path in ('/rest/api/3/worklog/updated', '/rest/api/3/worklog/deleted'):
+            self._responder(200, {'values': [], 'until': int(time.time() * 1000), 'lastPage': True})
+        elif partes.path.startswith('/rest/api/3/issue/') and partes.path.endswith('/changelog'):
+            self._responder(200, {'values': [], 'isLast': True})
+        else:
+            self._responder(404, {'errorMessages': [f'Recurso não encontrado: {partes.path}']})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self._limitar():
+            return
+        caminho = urlsplit(self.path).path
+
+        if caminho == '/rest/api/3/changelog/bulkfetch':
+            self._responder(200, {'issueChangeLogs': []})
+        elif caminho == '/rest/api/3/worklog/list':
+            self._responder(200, [])
+        else:
+            self._responder(404, {'errorMessages': [f'Recurso não encontrado: {caminho}']})
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor Jira falso para benchmarks')
+    parser.add_argument('--porta', type=int, default=8089)
+    parser.add_argument('--tarefas', type=int, default=1000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por requisição')
+    parser.add_argument('--taxa-429', type=float, default=0.0, help='fração das requisições respondidas com 429')
+    args = parser.parse_args()
+
+    servidor = ServidorJiraFalso(args.porta, args.tarefas, args.semente, args.latencia, args.taxa_429)
+    print(f'Jira falso em {servidor.url} com {args.tarefas} tarefas')
+    servidor.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+# benchmarks/fake_redis.py
+# Servidor TCP local que fala o protocolo do Redis (RESP) com os comandos usados pelo cache compartilhado
+# (GET, SET com PX/EX/NX, DEL, INCR, EVAL do script de destravar, AUTH, SELECT, PING), guardando tudo em memória.
+# Serve para testar o BackendRedis e medir o cache compartilhado sem um Redis de verdade.
+#
+# Uso: python benchmarks/fake_redis.py --porta 6380 --latencia 0.001
+import argparse
+import os
+import socketserver
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_compartilhado_utils import SCRIPT_DESTRAVAR
+
+class ServidorRedisFalso(socketserver.ThreadingTCPServer):
+    """Redis falso em memória com latência configurável por comando"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, porta=0, latencia=0.0, senha=None):
+        super().__init__(('127.0.0.1', porta), _TratadorRedis)
+        self.latencia = latencia
+        self.senha = senha
+        self.comandos = 0
+        self._dados = {}  # chave -> (valor, expira em time.monotonic() ou None)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'redis://127.0.0.1:{self.server_address[1]}/0'
+
+    def iniciar(self):
+        """Atende em uma thread de fundo e retorna o próprio servidor"""
+        threading.Thread(target=self.serve_forever, name='fake-redis', daemon=True).start()
+        return self
+
+    def _valor(self, chave):
+        valor, expira = self._dados.get(chave, (None, None))
+        if expira is not None and expira <= time.monotonic():
+            del self._dados[chave]
+            return None
+        return valor
+
+    def executar(self, argumentos):
+        """Resposta do comando (str para respostas simples, bytes, int, None ou Exception)"""
+        comando = argumentos[0].upper()
+        with self._lock:
+            self.comandos += 1
+            if comando in (b'PING', b'SELECT'):
+                return 'PONG' if comando == b'PING' else 'OK'
+            if comando == b'AUTH':
+                return 'OK' if self.senha is None or argumentos[-1].decode() == self.senha else ValueError('WRONGPASS')
+            if comando == b'GET':
+                return self._valor(argumentos[1])
+            if comando == b'SET':
+                chave, valor, opcoes = argumentos[1], argumentos[2], [a.upper() for a in argumentos[3:]]
+                if b'NX' in opcoes and self._valor(chave) is not None:
+                    return None
+                expira = None
+                for unidade, fator in ((b'PX', 0.001), (b'EX', 1.0)):
+                    if unidade in opcoes:
+                        expira = time.monotonic() + int(argumentos[3 + opcoes.index(unidade) + 1]) * fator
+                self._dados[chave] = (valor, expira)
+                return 'OK'
+            if comando == b'DEL':
+                return sum(self._dados.pop(chave, None) is not None for chave in argumentos[1:])
+            if comando == b'INCR':
+                valor = int(self._valor(argumentos[1]) or 0) + 1
+                self._dados[argumentos[1]] = (str(valor).encode(), None)
+                return valor
+            if comando == b'EVAL' and argumentos[1].decode() == SCRIPT_DESTRAVAR:
+                chave, dono = argumentos[3], argumentos[4]
+                if self._valor(chave) == dono:
+                    del self._dados[chave]
+                    return 1
+                return 0
+        return ValueError(f"ERR unknown command '{comando.decode()}'")
+
+class _TratadorRedis(socketserver.StreamRequestHandler):
+    def _ler_comando(self):
+        linha = self.rfile.readline()
+        if not linha:
+            return None
+        argumentos = []
+        for _ in range(int(linha[1:-2])):
+            tamanho = int(self.rfile.readline()[1:-2])
+            argumentos.append(self.rfile.read(tamanho + 2)[:-2])
+        return argumentos
+
+    def handle(self):
+        while True:
+            argumentos = self._ler_comando()
+            if argumentos is None:
+                return
+            if self.server.latencia:
+                time.sleep(self.server.latencia)
+            resposta = self.server.executar(argumentos)
+            if isinstance(resposta, Exception):
+                dados = b'-' + str(resposta).encode() + b'\r\n'
+            elif resposta is None:
+                dados = b'$-1\r\n'
+            elif isinstance(resposta, int):
+                dados = b':%d\r\n' % resposta
+            elif isinstance(resposta, str):
+                dados = b'+' + resposta.encode() + b'\r\n'
+            else:
+                dados = b'$%d\r\n%s\r\n' % (len(resposta), resposta)
+            self.wfile.write(dados)
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor Redis falso para testes do cache compartilhado')
+    parser.add_argument('--porta', type=int, default=6380)
+    parser.add_argument('--latencia', type=float, default=0.0, help='segundos por comando')
+    parser.add_argument('--senha', help='senha exigida no AUTH')
+    args = parser.parse_args()
+
+    servidor = ServidorRedisFalso(args.porta, args.latencia, args.senha)
+    print(f'Redis falso em {servidor.url}')
+    servidor.serve_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+# cache_compartilhado_utils.py
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlsplit, unquote
+
+from metricas_utils import incrementar, cronometrar
+
+# Cache compartilhado entre réplicas do app (valores serializados, versões para invalidação e travas para
+# que só uma réplica atualize cada dado). Sem CACHE_COMPARTILHADO_URL cada processo usa só os próprios caches.
+#   sqlite:///caminho/cache.db  -> arquivo SQLite (réplicas na mesma máquina ou volume)
+#   redis://:senha@host:6379/0  -> servidor Redis (ou compatível com o protocolo RESP)
+CACHE_COMPARTILHADO_URL = os.getenv("CACHE_COMPARTILHADO_URL", "")
+PREFIXO_CHAVES = "dashchegou:"
+# Sem versão compartilhada (sem backend ou com ele fora do ar), as cópias do processo valem só por esse
+# tempo: outras réplicas e alterações feitas direto no banco aparecem depois de no máximo esse intervalo
+TEMPO_COPIA_LOCAL = int(os.getenv("CACHE_COPIA_LOCAL_SEGUNDOS", "60"))
+TEMPO_CONEXAO_REDIS = 5  # Segundos para conectar e para cada resposta
+
+# ======= SERIALIZAÇÃO =======
+
+# Os valores são do próprio app (DataFrames, snapshots, listas); o backend deve ser tão privado quanto o banco
+def serializar(valor):
+    """Bytes de um valor (DataFrames inclusos, com tipos e categorias) para guardar no backend"""
+    return pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+
+def desserializar(dados):
+    return pickle.loads(dados)
+
+# ======= BACKENDS =======
+
+class BackendCache:
+    """Operações comuns; cada backend implementa _obter, _gravar, _remover, _incrementar, _travar e _destravar"""
+    # Falhas do backend viram falta no cache (ou trava não obtida): o app segue com os dados do próprio processo
+
+    def _falha(self, operacao, erro):
+        incrementar('cache_compartilhado_erros_total', operacao=operacao)
+        print(f"Erro no cache compartilhado ({operacao}): {str(erro)}")
+
+    def obter(self, chave):
+        """Valor guardado em 'chave', ou None se não existir, tiver expirado ou o backend falhar"""
+        try:
+            with cronometrar('cache_compartilhado_seconds', operacao='obter'):
+                dados = self._obter(PREFIXO_CHAVES + chave)
+        except Exception as e:
+            self._falha('obter', e)
+            return None
+        incrementar('cache_consultas_total', cache='compartilhado', resultado='acerto' if dados is not None else 'falha')
+        return desserializar(dados) if dados is not None else None
+
+    def gravar(self, chave, valor, expira=None):
+        """Guarda o valor, opcionalmente por 'expira' segundos"""
+        try:
+            with cronometrar('cache_compartilhado_seconds', operacao='gravar'):
+                self._gravar(PREFIXO_CHAVES + chave, serializar(valor), expira)
+        except Exception as e:
+            self._falha('gravar', e)
+
+    def remover(self, chave):
+        try:
+            self._remover(PREFIXO_CHAVES + chave)
+        except Exception as e:
+            self._falha('remover', e)
+
+    def versao(self, nome):
+        """Versão atual de um conjunto de dados (0 se nunca foi invalidado; None se o backend falhar)"""
+        try:
+            dados = self._obter(PREFIXO_CHAVES + 'versao:' + nome)
+        except Exception as e:
+            self._falha('versao', e)
+            return None
+        return int(dados) if dados is not None else 0
+
+    def invalidar(self, nome):
+        """Incrementa a versão do conjunto; as réplicas com a versão anterior recarregam na próxima leitura"""
+        try:
+            return self._incrementar(PREFIXO_CHAVES + 'versao:' + nome)
+        except Exception as e:
+            self._falha('invalidar', e)
+            return None
+
+    @contextmanager
+    def trava(self, nome, expira=120, espera=60):
+        """Trava entre réplicas (expira sozinha se o dono cair); devolve True se foi obtida em até 'espera'
+        segundos, False se outra réplica continuou com ela e None se o backend falhou (não há como coordenar)"""
+        chave = PREFIXO_CHAVES + 'trava:' + nome
+        dono = uuid.uuid4().hex
+        limite = time.monotonic() + espera
+        obtida = False
+        try:
+            obtida = self._travar(chave, dono, expira)
+            while not obtida and time.monotonic() < limite:
+                time.sleep(0.2)
+                obtida = self._travar(chave, dono, expira)
+            incrementar('cache_compartilhado_travas_total', resultado='obtida' if obtida else 'espera_esgotada')
+        except Exception as e:
+            self._falha('travar', e)
+            obtida = None
+        try:
+            yield obtida
+        finally:
+            if obtida:
+                try:
+                    self._destravar(chave, dono)
+                except Exception as e:
+                    self._falha('destravar', e)
+
+class BackendSQLite(BackendCache):
+    """Backend em arquivo SQLite (WAL), compartilhado por processos que enxergam o mesmo arquivo"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        with self._conexao() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL)")
+
+    @contextmanager
+    def _conexao(self):
+        # Uma conexão por operação: o sqlite3 não compartilha conexões entre threads
+        conn = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _obter(self, chave):
+        with self._conexao() as conn:
+            linha = conn.execute("SELECT valor FROM cache WHERE chave = ? AND (expira IS NULL OR expira > ?)",
+                                 (chave, time.time())).fetchone()
+        return bytes(linha[0]) if linha else None
+
+    def _gravar(self, chave, dados, expira):
+        with self._conexao() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)",
+                         (chave, dados, time.time() + expira if expira else None))
+
+    def _remover(self, chave):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def _incrementar(self, chave):
+        with self._conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            linha = conn.execute("SELECT valor FROM cache WHERE chave = ?", (chave,)).fetchone()
+            versao = int(linha[0]) + 1 if linha else 1
+            conn.execute("INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, NULL)",
+                         (chave, str(versao).encode()))
+            conn.execute("COMMIT")
+        return versao
+
+    def _travar(self, chave, dono, expira):
+        with self._conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache WHERE chave = ? AND expira <= ?", (chave, time.time()))
+            cursor = conn.execute("INSERT OR IGNORE INTO cache (chave, valor, expira) VALUES (?, ?, ?)",
+                                  (chave, dono.encode(), time.time() + expira))
+            conn.execute("COMMIT")
+        return cursor.rowcount == 1
+
+    def _destravar(self, chave, dono):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache WHERE chave = ? AND valor = ?", (chave, dono.encode()))
+
+class ErroRedis(Exception):
+    pass
+
+# Comandos que podem ser reenviados depois de uma falha na resposta: o INCR incrementaria duas vezes e o
+# SET NX repetido veria a trava que ele mesmo já obteve (o script de destravar pode rodar duas vezes)
+COMANDOS_REPETIVEIS = {'GET', 'SET', 'DEL', 'EVAL'}
+
+def _repetivel(argumentos):
+    nome = str(argumentos[0]).upper()
+    return nome in COMANDOS_REPETIVEIS and not (nome == 'SET' and 'NX' in argumentos)
+
+# Remove a trava só se ela ainda for do dono (pode ter expirado e sido obtida por outra réplica)
+SCRIPT_DESTRAVAR = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+class BackendRedis(BackendCache):
+    """Backend Redis com um cliente mínimo do protocolo RESP (uma conexão por thread)"""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self.endereco = (partes.hostname or 'localhost', partes.port or 6379)
+        self.senha = unquote(partes.password) if partes.password else None
+        self.banco = int(partes.path.lstrip('/') or 0)
+        self._local = threading.local()
+
+    def _conectar(self):
+        conexao = socket.create_connection(self.endereco, timeout=TEMPO_CONEXAO_REDIS)
+        self._local.conexao = conexao
+        self._local.leitor = conexao.makefile('rb')
+        if self.senha:
+            self._enviar('AUTH', self.senha)
+        if self.banco:
+            self._enviar('SELECT', self.banco)
+
+    def _fechar(self):
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is not None:
+            conexao.close()
+        self._local.conexao = None
+
+    def _escrever(self, *argumentos):
+        partes = [b'*%d\r\n' % len(argumentos)]
+        for argumento in argumentos:
+            dados = argumento if isinstance(argumento, bytes) else str(argumento).encode()
+            partes.append(b'$%d\r\n%s\r\n' % (len(dados), dados))
+        self._local.conexao.sendall(b''.join(partes))
+
+    def _enviar(self, *argumentos):
+        self._escrever(*argumentos)
+        return self._ler_resposta()
+
+    def _ler_resposta(self):
+        linha = self._local.leitor.readline()
+        if not linha:
+            raise ConnectionError("Conexão com o Redis encerrada")
+        tipo, conteudo = linha[:1], linha[1:-2]
+        if tipo == b'+':
+            return conteudo
+        if tipo == b'-':
+            raise ErroRedis(conteudo.decode(errors='replace'))
+        if tipo == b':':
+            return int(conteudo)
+        if tipo == b'$':
+            tamanho = int(conteudo)
+            return None if tamanho == -1 else self._local.leitor.read(tamanho + 2)[:-2]
+        if tipo == b'*':
+            quantidade = int(conteudo)
+            return None if quantidade == -1 else [self._ler_resposta() for _ in range(quantidade)]
+        raise ErroRedis(f"Resposta inválida do Redis: {linha!r}")
+
+    def comando(self, *argumentos):
+        """Executa um comando, reconectando uma vez se a conexão da thread tiver caído"""
+        # Se a falha veio depois do envio o Redis pode ter executado o comando: só os repetíveis são reenviados
+        for tentativa in range(2):
+            enviado = False
+            try:
+                if getattr(self._local, 'conexao', None) is None:
+                    self._conectar()
+                self._escrever(*argumentos)
+                enviado = True
+                return self._ler_resposta()
+            except (ConnectionError, socket.timeout, OSError):
+                self._fechar()
+                if tentativa == 1 or (enviado and not _repetivel(argumentos)):
+                    raise
+
+    def _obter(self, chave):
+        return self.comando('GET', chave)
+
+    def _gravar(self, chave, dados, expira):
+        if expira:
+            self.comando('SET', chave, dados, 'PX', int(expira * 1000))
+        else:
+            self.comando('SET', chave, dados)
+
+    def _remover(self, chave):
+        self.comando('DEL', chave)
+
+    def _incrementar(self, chave):
+        return self.comando('INCR', chave)
+
+    def _travar(self, chave, dono, expira):
+        return self.comando('SET', chave, dono, 'NX', 'PX', int(expira * 1000)) is not None
+
+    def _destravar(self, chave, dono):
+        self.comando('EVAL', SCRIPT_DESTRAVAR, 1, chave, dono)
+
+def criar_backend(url):
+    """Backend descrito pela URL (sqlite:///caminho ou redis://host:porta/banco)"""
+    esquema = urlsplit(url).scheme
+    if esquema == 'sqlite':
+        return BackendSQLite(url[len('sqlite:///'):] or 'cache_compartilhado.db')
+    if esquema in ('redis', 'tcp'):
+        return BackendRedis(url)
+    raise ValueError(f"Backend de cache compartilhado desconhecido: {url}")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def obter_backend():
+    """Backend configurado em CACHE_COMPARTILHADO_URL, ou None (caches só do processo)"""
+    global _backend
+    if not CACHE_COMPARTILHADO_URL:
+        return None
+    with _backend_lock:
+        if _backend is None:
+            _backend = criar_backend(CACHE_COMPARTILHADO_URL)
+        return _backend
+
+def versao_compartilhada(nome):
+    """Versão do conjunto no backend; None sem backend configurado ou se ele falhar"""
+    backend = obter_backend()
+    return backend.versao(nome) if backend is not None else None
+
+def copia_local_valida(copia, versao):
+    """Se a cópia (versão, lida_em, dados) do processo ainda vale para a versão compartilhada atual"""
+    if copia is None:
+        return False
+    if versao is not None:
+        return versao == copia[0]
+    return time.monotonic() - copia[1] < TEMPO_COPIA_LOCAL
+
+def invalidar_compartilhado(nome):
+    """Avisa as outras réplicas que o conjunto mudou (nada a fazer sem backend)"""
+    backend = obter_backend()
+    if backend is not None:
+        backend.invalidar(nome)
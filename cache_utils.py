@@ -0,0 +1,101 @@
+# cache_utils.py
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+
+from metricas_utils import registrar_cache, registrar_coletor
+
+MAX_GRAFICOS_MEMORIZADOS = 64  # Especificações guardadas por processo (LRU)
+
+# (arquivo, função, impressão digital dos dados) -> especificação Vega-Lite (ou None se não houver gráfico).
+# Os dados agregados são os mesmos para qualquer sessão, então o cache é do processo.
+_especificacoes = OrderedDict()
+_especificacoes_lock = threading.Lock()
+
+def impressao_digital(df):
+    """Hash do conteúdo de um DataFrame (colunas, tipos e valores)"""
+    h = hashlib.sha1()
+    h.update(repr([(str(coluna), str(tipo)) for coluna, tipo in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _especificacao(grafico):
+    # Mesmo ajuste do st.altair_chart: sem o tema padrão do Altair, que fixa largura e altura
+    with alt.themes.enable("none") if alt.themes.active == "default" else nullcontext():
+        return grafico.to_dict()
+
+def especificacao_memorizada(gerar, dados):
+    """Retorna a especificação de gerar(dados), montando o gráfico só para dados ainda não vistos"""
+    chave = (gerar.__code__.co_filename, gerar.__qualname__, impressao_digital(dados))
+    with _especificacoes_lock:
+        if chave in _especificacoes:
+            _especificacoes.move_to_end(chave)
+            registrar_cache('graficos', True)
+            return _especificacoes[chave]
+    registrar_cache('graficos', False)
+
+    grafico = gerar(dados)
+    especificacao = _especificacao(grafico) if grafico is not None else None
+
+    with _especificacoes_lock:
+        _especificacoes[chave] = especificacao
+        while len(_especificacoes) > MAX_GRAFICOS_MEMORIZADOS:
+            _especificacoes.popitem(last=False)
+
+    return especificacao
+
+def exibir_grafico_memorizado(gerar, dados, mensagem_vazio):
+    """Mostra o gráfico de gerar(dados) a partir da especificação memorizada, ou a mensagem se não houver gráfico"""
+    especificacao = especificacao_memorizada(gerar, dados)
+    if especificacao is None:
+        st.info(mensagem_vazio)
+    else:
+        st.vega_lite_chart(spec=especificacao, use_container_width=True)
+
+# ======= CACHES DO ST.CACHE_DATA MEDIDOS =======
+
+_execucao = threading.local()
+
+def cache_data_medido(nome, **opcoes):
+    """st.cache_data que registra acertos e falhas nas métricas com o nome informado"""
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            # Só roda quando o resultado não está no cache
+            _execucao.executou = True
+            return funcao(*args, **kwargs)
+
+        em_cache = st.cache_data(**opcoes)(executar)
+
+        @functools.wraps(funcao)
+        def consultar(*args, **kwargs):
+            _execucao.executou = False
+            resultado = em_cache(*args, **kwargs)
+            registrar_cache(nome, not _execucao.executou)
+            return resultado
+
+        consultar.clear = em_cache.clear
+        return consultar
+    return decorador
+
+def _medidas_caches():
+    with _especificacoes_lock:
+        medidas = [('cache_entradas', {'cache': 'graficos'}, len(_especificacoes))]
+
+    # Tamanho dos caches do st.cache_data (só existe com o servidor do Streamlit rodando)
+    from streamlit import runtime
+    if runtime.exists():
+        tamanhos = {}
+        for estatistica in runtime.get_instance().stats_mgr.get_stats():
+            if estatistica.category_name == 'st_cache_data':
+                tamanhos[estatistica.cache_name] = tamanhos.get(estatistica.cache_name, 0) + estatistica.byte_length
+        medidas.extend(('cache_bytes', {'cache': nome}, tamanho) for nome, tamanho in tamanhos.items())
+    return medidas
+
+registrar_coletor(_medidas_caches)
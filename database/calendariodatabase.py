@@ -1,7 +1,11 @@
 import os
+import threading
+import time
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from cache_compartilhado_utils import versao_compartilhada, invalidar_compartilhado, copia_local_valida
+
 # Obter variáveis de ambiente para o PostgreSQL (Railway)
 DB_URL = os.getenv("DATABASE_URL", "")
 
@@ -15,6 +19,18 @@ CREATE TABLE IF NOT EXISTS calendarios (
 );
 """
 
+# (versão, lida em, última lista de calendários lida do banco), compartilhada por todas as conexões do processo;
+# add_calendario e remove_calendario a descartam e avisam as outras réplicas pela versão do cache compartilhado
+# (sem ele, a lista é relida depois de TEMPO_COPIA_LOCAL)
+_calendarios = None
+_calendarios_lock = threading.Lock()
+
+def descartar_calendarios():
+    global _calendarios
+    with _calendarios_lock:
+        _calendarios = None
+    invalidar_compartilhado('calendarios')
+
 class Database:
     def __init__(self):
         self.conn = None
@@ -54,17 +70,22 @@ class Database:
     
     def get_all_calendarios(self):
         """Retorna todos os calendários cadastrados"""
+        global _calendarios
         try:
-            if not self.conn:
-                self.connect()
-                
-            cursor = self.conn.cursor(cursor_factory=RealDictCursor)
-            cursor.execute("SELECT id, nome, email FROM calendarios ORDER BY nome")
-            calendarios = cursor.fetchall()
-            cursor.close()
-            
-            # Converter para lista de dicionários
-            result = [dict(cal) for cal in calendarios]
+            versao = versao_compartilhada('calendarios')
+            with _calendarios_lock:
+                if not copia_local_valida(_calendarios, versao):
+                    if not self.conn:
+                        self.connect()
+
+                    cursor = self.conn.cursor(cursor_factory=RealDictCursor)
+                    cursor.execute("SELECT id, nome, email FROM calendarios ORDER BY nome")
+                    calendarios = cursor.fetchall()
+                    cursor.close()
+                    _calendarios = (versao, time.monotonic(), [dict(cal) for cal in calendarios])
+
+            # Converter para lista de dicionários (cópias: a lista do processo não pode ser alterada)
+            result = [dict(cal) for cal in _calendarios[2]]
             return result
         except Exception as e:
             print(f"Erro ao obter calendários: {e}")
@@ -84,6 +105,7 @@ class Database:
             id_calendario = cursor.fetchone()[0]
             self.conn.commit()
             cursor.close()
+            descartar_calendarios()
             
             return id_calendario
         except psycopg2.errors.UniqueViolation:
@@ -105,6 +127,7 @@ class Database:
             cursor.execute("DELETE FROM calendarios WHERE id = %s", (id_calendario,))
             self.conn.commit()
             cursor.close()
+            descartar_calendarios()
             
             return True
         except Exception as e:
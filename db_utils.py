@@ -1,10 +1,29 @@
 # db_utils.py
 import os
 import datetime
+import threading
+import time
+from collections import OrderedDict
 import pandas as pd
 
+from metricas_utils import incrementar, cronometrar, registrar_cache
+from cache_compartilhado_utils import versao_compartilhada, invalidar_compartilhado, copia_local_valida
+
+# (versão, lido em, último load_data()) do processo, compartilhado entre as sessões. As funções de escrita
+# abaixo o descartam; com cache compartilhado, a versão avisa as outras réplicas que os projetos mudaram,
+# e sem ele a cópia é relida depois de TEMPO_COPIA_LOCAL.
+_projetos = None
+_projetos_lock = threading.Lock()
+
+# ids dos projetos -> (versão, lida em, contagens mensais de evolucao_status()) e data -> (versão, lido em,
+# status_na_data()), descartados junto com os projetos
+_evolucoes = OrderedDict()
+_status_por_data = OrderedDict()
+MAX_CONSULTAS_MEMORIZADAS = 32
+
 def get_connection():
     DATABASE_URL = os.getenv("DATABASE_URL")
+    incrementar('db_conexoes_total')
     if DATABASE_URL:
         import psycopg2
         return psycopg2.connect(DATABASE_URL)
@@ -17,14 +36,34 @@ def execute_query(cursor, query, params=None):
         params = ()
     if os.getenv("DATABASE_URL"):
         query = query.replace("?", "%s")
-    cursor.execute(query, params)
+    incrementar('db_consultas_total', tipo='execute')
+    with cronometrar('db_consulta_seconds', tipo='execute'):
+        cursor.execute(query, params)
 
-def init_db():
-    conn = get_connection()
-    c = conn.cursor()
-    query = '''
-        CREATE TABLE IF NOT EXISTS projetos (
-            id SERIAL PRIMARY KEY,
+def execute_many(cursor, query, params_list):
+    if os.getenv("DATABASE_URL"):
+        query = query.replace("?", "%s")
+    incrementar('db_consultas_total', tipo='executemany')
+    with cronometrar('db_consulta_seconds', tipo='executemany'):
+        cursor.executemany(query, params_list)
+
+def read_query(query, conn, params=None):
+    """pd.read_sql_query com os marcadores do banco em uso"""
+    if os.getenv("DATABASE_URL"):
+        query = query.replace("?", "%s")
+    incrementar('db_consultas_total', tipo='leitura')
+    with cronometrar('db_consulta_seconds', tipo='leitura'):
+        return pd.read_sql_query(query, conn, params=params)
+
+COLUNAS_PROJETOS = "nome, data_projeto, data_finalizacao, descricao, status, link_projeto, ferramentas, versao, criadores"
+
+def _criar_tabela_projetos(c, nome="projetos"):
+    # SERIAL só gera ids no PostgreSQL; no SQLite é o INTEGER PRIMARY KEY, com AUTOINCREMENT para que o id
+    # de um projeto excluído não seja reaproveitado (o histórico de status continua com ele)
+    tipo_id = "SERIAL PRIMARY KEY" if os.getenv("DATABASE_URL") else "INTEGER PRIMARY KEY AUTOINCREMENT"
+    query = f'''
+        CREATE TABLE IF NOT EXISTS {nome} (
+            id {tipo_id},
             nome TEXT NOT NULL,
             data_projeto TEXT NOT NULL,
             data_finalizacao TEXT,
@@ -37,6 +76,51 @@ def init_db():
         )
     '''
     execute_query(c, query)
+
+def _corrigir_ids_sqlite(c):
+    """Recria a tabela de projetos do SQLite criada com 'id SERIAL', em que os ids ficavam NULL"""
+    execute_query(c, "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'projetos'")
+    linha = c.fetchone()
+    if not linha or 'SERIAL' not in linha[0].upper():
+        return
+    _criar_tabela_projetos(c, "projetos_novo")
+    execute_query(c, f"INSERT INTO projetos_novo (id, {COLUNAS_PROJETOS}) SELECT COALESCE(id, rowid), {COLUNAS_PROJETOS} FROM projetos")
+    execute_query(c, "DROP TABLE projetos")
+    execute_query(c, "ALTER TABLE projetos_novo RENAME TO projetos")
+
+def init_db():
+    conn = get_connection()
+    c = conn.cursor()
+    if not os.getenv("DATABASE_URL"):
+        _corrigir_ids_sqlite(c)
+    _criar_tabela_projetos(c)
+
+    # Histórico de status só recebe inserções: a criação, cada mudança de status e a exclusão (removido = 1)
+    # de cada projeto, gravadas na mesma transação da alteração. As consultas pegam o último registro de
+    # cada projeto até uma data ou comparam cada registro com o anterior (funções de janela).
+    tipo_id = "SERIAL" if os.getenv("DATABASE_URL") else "INTEGER"
+    query = f'''
+        CREATE TABLE IF NOT EXISTS historico_status (
+            id {tipo_id} PRIMARY KEY,
+            projeto_id INTEGER NOT NULL,
+            status TEXT,
+            removido INTEGER NOT NULL DEFAULT 0,
+            alterado_em TEXT NOT NULL
+        )
+    '''
+    execute_query(c, query)
+    execute_query(c, '''
+        CREATE INDEX IF NOT EXISTS idx_historico_status_projeto_alterado
+        ON historico_status (projeto_id, alterado_em)
+    ''')
+
+    # Projetos sem histórico (anteriores à tabela) começam com o status atual na data do projeto
+    execute_query(c, '''
+        INSERT INTO historico_status (projeto_id, status, removido, alterado_em)
+        SELECT p.id, p.status, 0, p.data_projeto
+        FROM projetos p
+        WHERE NOT EXISTS (SELECT 1 FROM historico_status h WHERE h.projeto_id = p.id)
+    ''')
     conn.commit()
     conn.close()
 
@@ -56,7 +140,7 @@ def load_data():
             criadores
         FROM projetos
     '''
-    df = pd.read_sql_query(query, conn)
+    df = read_query(query, conn)
     conn.close()
     
     if not df.empty:
@@ -67,6 +151,159 @@ def load_data():
         
     return df
 
+def carregar_projetos():
+    """Projetos do load_data(), lidos do banco só quando a cópia do processo foi descartada ou ficou velha"""
+    global _projetos
+    versao = versao_compartilhada('projetos')
+    with _projetos_lock:
+        atual = copia_local_valida(_projetos, versao)
+        registrar_cache('projetos', atual)
+        if not atual:
+            _projetos = (versao, time.monotonic(), load_data())
+        return _projetos[2]
+
+def descartar_projetos():
+    global _projetos
+    with _projetos_lock:
+        _projetos = None
+        _evolucoes.clear()
+        _status_por_data.clear()
+    invalidar_compartilhado('projetos')
+
+# ======= HISTÓRICO DE STATUS =======
+
+def _agora():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def _registrar_mudanca_status(c, project_id, new_status):
+    """Acrescenta o novo status ao histórico se ele mudou; chamar antes do UPDATE, na mesma transação"""
+    query = '''
+        INSERT INTO historico_status (projeto_id, status, removido, alterado_em)
+        SELECT id, ?, 0, ? FROM projetos WHERE id = ? AND (status IS NULL OR status <> ?)
+    '''
+    execute_query(c, query, (new_status, _agora(), project_id, new_status))
+
+def status_na_data(data):
+    """Status de cada projeto existente ao fim do dia 'data' (DataFrame com projeto_id e status)"""
+    # ROW_NUMBER pega o último registro de cada projeto até a data, pelo índice (projeto_id, alterado_em)
+    query = '''
+        SELECT projeto_id, status
+        FROM (
+            SELECT projeto_id, status, removido,
+                   ROW_NUMBER() OVER (PARTITION BY projeto_id ORDER BY alterado_em DESC, id DESC) AS ordem
+            FROM historico_status
+            WHERE alterado_em < ?
+        ) ultimos
+        WHERE ordem = 1 AND removido = 0
+    '''
+    conn = get_connection()
+    df = read_query(query, conn, params=((data + datetime.timedelta(days=1)).isoformat(),))
+    conn.close()
+    return df
+
+def carregar_status_na_data(data):
+    """status_na_data() memorizado no processo até a próxima escrita nos projetos"""
+    return _memorizar(_status_por_data, data, 'status_na_data', status_na_data, data)
+
+def transicoes_por_mes(projeto_ids=None):
+    """Mudanças de status por mês (mes, status_anterior, status, quantidade); status None é entrada ou saída"""
+    conn = get_connection()
+    filtro = _filtro_projetos(conn, projeto_ids)
+    query = f'''
+        WITH transicoes AS (
+            SELECT SUBSTR(alterado_em, 1, 7) AS mes,
+                   CASE WHEN removido = 0 THEN status END AS status,
+                   LAG(CASE WHEN removido = 0 THEN status END) OVER (
+                       PARTITION BY projeto_id ORDER BY alterado_em, id) AS status_anterior
+            FROM historico_status
+            {filtro}
+        )
+        SELECT mes, status_anterior, status, COUNT(*) AS quantidade
+        FROM transicoes
+        GROUP BY mes, status_anterior, status
+        ORDER BY mes
+    '''
+    df = read_query(query, conn)
+    conn.close()
+    return df
+
+def evolucao_status(projeto_ids=None):
+    """Projetos em cada status no fim de cada mês (mes, status, Quantidade), do primeiro registro até o mês atual"""
+    # Cada registro soma 1 ao seu status e tira 1 do status anterior do projeto (LAG); a soma acumulada
+    # por status ao longo dos meses (SUM OVER) é a quantidade de projetos nele ao fim de cada mês
+    conn = get_connection()
+    filtro = _filtro_projetos(conn, projeto_ids)
+    query = f'''
+        WITH transicoes AS (
+            SELECT SUBSTR(alterado_em, 1, 7) AS mes,
+                   CASE WHEN removido = 0 THEN status END AS status,
+                   LAG(CASE WHEN removido = 0 THEN status END) OVER (
+                       PARTITION BY projeto_id ORDER BY alterado_em, id) AS status_anterior
+            FROM historico_status
+            {filtro}
+        ),
+        variacoes AS (
+            SELECT mes, status, 1 AS variacao FROM transicoes WHERE status IS NOT NULL
+            UNION ALL
+            SELECT mes, status_anterior, -1 FROM transicoes WHERE status_anterior IS NOT NULL
+        ),
+        por_mes AS (
+            SELECT mes, status, SUM(variacao) AS variacao FROM variacoes GROUP BY mes, status
+        )
+        SELECT mes, status, SUM(variacao) OVER (PARTITION BY status ORDER BY mes) AS quantidade
+        FROM por_mes
+        ORDER BY mes, status
+    '''
+    df = read_query(query, conn)
+    conn.close()
+    if df.empty:
+        return pd.DataFrame(columns=['mes', 'status', 'Quantidade'])
+
+    # Meses sem mudança de um status repetem a quantidade do mês anterior
+    tabela = df.pivot(index='mes', columns='status', values='quantidade')
+    tabela.index = pd.PeriodIndex(tabela.index, freq='M')
+    meses = pd.period_range(tabela.index.min(), max(tabela.index.max(), pd.Period(datetime.date.today(), 'M')), freq='M')
+    tabela = tabela.reindex(meses).ffill().fillna(0).astype(int)
+    tabela.index = tabela.index.to_timestamp()
+    evolucao = tabela.rename_axis('mes').reset_index().melt(id_vars='mes', var_name='status', value_name='Quantidade')
+    evolucao = evolucao[evolucao['Quantidade'] > 0]
+    return evolucao.sort_values(['mes', 'status']).reset_index(drop=True)
+
+def carregar_evolucao_status(projeto_ids=None):
+    """evolucao_status() memorizado no processo até a próxima escrita nos projetos"""
+    chave = tuple(sorted(projeto_ids)) if projeto_ids is not None else None
+    return _memorizar(_evolucoes, chave, 'evolucao_status', evolucao_status, projeto_ids)
+
+def _memorizar(memoria, chave, nome, consulta, *argumentos):
+    """Resultado de consulta(*argumentos) guardado em 'memoria' enquanto a versão dos projetos não mudar"""
+    versao = versao_compartilhada('projetos')
+    with _projetos_lock:
+        atual = copia_local_valida(memoria.get(chave), versao)
+        registrar_cache(nome, atual)
+        if atual:
+            memoria.move_to_end(chave)
+            return memoria[chave][2]
+    resultado = consulta(*argumentos)
+    with _projetos_lock:
+        memoria[chave] = (versao, time.monotonic(), resultado)
+        memoria.move_to_end(chave)
+        while len(memoria) > MAX_CONSULTAS_MEMORIZADAS:
+            memoria.popitem(last=False)
+    return resultado
+
+def _filtro_projetos(conn, projeto_ids):
+    """Cláusula WHERE para limitar o histórico a alguns projetos (None = todos)"""
+    if projeto_ids is None:
+        return ""
+    # Os ids vão para uma tabela temporária da conexão: um IN com um marcador por projeto passaria do
+    # limite de variáveis do SQLite com muitos projetos
+    c = conn.cursor()
+    execute_query(c, "CREATE TEMP TABLE IF NOT EXISTS filtro_projetos (projeto_id INTEGER PRIMARY KEY)")
+    execute_query(c, "DELETE FROM filtro_projetos")
+    execute_many(c, "INSERT INTO filtro_projetos (projeto_id) VALUES (?)",
+                 [(projeto_id,) for projeto_id in {int(projeto_id) for projeto_id in projeto_ids}])
+    return "WHERE projeto_id IN (SELECT projeto_id FROM filtro_projetos)"
+
 def insert_project(nome, data_projeto, data_finalizacao, descricao, status, link_projeto, ferramentas, versao, criadores):
     data_projeto_str = data_projeto.isoformat() if data_projeto else None
     data_finalizacao_str = data_finalizacao.isoformat() if data_finalizacao else None
@@ -92,25 +329,42 @@ def insert_project(nome, data_projeto, data_finalizacao, descricao, status, link
         )
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
     '''
+    if os.getenv("DATABASE_URL"):
+        query += " RETURNING id"
     execute_query(c, query, (nome, data_projeto_str, data_finalizacao_str, descricao, status, link_projeto, ferramentas, versao, criadores_str))
+    project_id = c.fetchone()[0] if os.getenv("DATABASE_URL") else c.lastrowid
+
+    # Status inicial, na data do projeto, na mesma transação
+    execute_query(c, "INSERT INTO historico_status (projeto_id, status, removido, alterado_em) VALUES (?, ?, 0, ?)",
+                  (project_id, status, data_projeto_str or _agora()))
     conn.commit()
     conn.close()
+    descartar_projetos()
 
 def update_project_status(project_id, new_status):
     conn = get_connection()
     c = conn.cursor()
+    _registrar_mudanca_status(c, project_id, new_status)
     query = 'UPDATE projetos SET status = ? WHERE id = ?'
     execute_query(c, query, (new_status, project_id))
     conn.commit()
     conn.close()
+    descartar_projetos()
 
 def delete_project(project_id):
     conn = get_connection()
     c = conn.cursor()
+    # O histórico fica; a exclusão entra nele como o último registro do projeto
+    query = '''
+        INSERT INTO historico_status (projeto_id, status, removido, alterado_em)
+        SELECT id, status, 1, ? FROM projetos WHERE id = ?
+    '''
+    execute_query(c, query, (_agora(), project_id))
     query = 'DELETE FROM projetos WHERE id = ?'
     execute_query(c, query, (project_id,))
     conn.commit()
     conn.close()
+    descartar_projetos()
 
 def update_project(project_id, changes):
     if "data" in changes:
@@ -128,7 +382,10 @@ def update_project(project_id, changes):
     
     conn = get_connection()
     c = conn.cursor()
+    if "status" in changes:
+        _registrar_mudanca_status(c, project_id, changes["status"])
     query = f"UPDATE projetos SET {set_clause} WHERE id = ?"
     execute_query(c, query, tuple(values))
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+    descartar_projetos()
@@ -0,0 +1,117 @@
+# export_utils.py
+import io
+import tempfile
+from datetime import datetime
+
+LINHAS_POR_LOTE = 10000  # Linhas convertidas de cada vez; só um lote fica em memória
+TAMANHO_BLOCO = 1024 * 1024  # Bytes lidos por vez de arquivos temporários
+
+# Formato -> (extensão, MIME)
+FORMATOS_EXPORTACAO = {
+    'CSV': ('csv', 'text/csv'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'Arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+class _Coletor(io.RawIOBase):
+    """Destino de escrita que acumula os bytes até serem repassados pelo gerador"""
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def esvaziar(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+def _lotes(df):
+    for inicio in range(0, len(df), LINHAS_POR_LOTE):
+        yield df.iloc[inicio:inicio + LINHAS_POR_LOTE]
+
+def _gerar_csv(df):
+    for numero, lote in enumerate(_lotes(df)):
+        yield lote.to_csv(index=False, header=(numero == 0)).encode('utf-8')
+
+def _gerar_arrow(df, formato):
+    # Importados só na primeira exportação, para não pesar no carregamento das páginas
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    coletor = _Coletor()
+    esquema = pa.Schema.from_pandas(df, preserve_index=False)
+    if formato == 'Parquet':
+        escritor = pq.ParquetWriter(coletor, esquema)
+    else:
+        escritor = pa.ipc.new_file(coletor, esquema)
+
+    for lote in _lotes(df):
+        escritor.write_table(pa.Table.from_pandas(lote, schema=esquema, preserve_index=False))
+        yield coletor.esvaziar()
+
+    escritor.close()
+    yield coletor.esvaziar()
+
+def _gerar_excel(df, nome_planilha):
+    import xlsxwriter
+
+    # O xlsx é um zip que só fica pronto no fim; constant_memory grava cada linha direto em disco
+    with tempfile.TemporaryFile() as arquivo:
+        workbook = xlsxwriter.Workbook(arquivo, {
+            'constant_memory': True,
+            'default_date_format': 'dd/mm/yyyy',
+            'strings_to_urls': False
+        })
+        worksheet = workbook.add_worksheet(nome_planilha)
+        cabecalho = workbook.add_format({'bold': True})
+
+        worksheet.write_row(0, 0, [str(coluna) for coluna in df.columns], cabecalho)
+        linha = 1
+        for lote in _lotes(df):
+            valores = lote.astype(object).where(lote.notna(), None)
+            for registro in valores.itertuples(index=False, name=None):
+                worksheet.write_row(linha, 0, registro)
+                linha += 1
+        workbook.close()
+
+        arquivo.seek(0)
+        while bloco := arquivo.read(TAMANHO_BLOCO):
+            yield bloco
+
+def gerar_exportacao(df, formato='CSV', nome_planilha='Dados'):
+    """Gera o arquivo exportado em blocos de bytes, convertendo o DataFrame lote a lote"""
+    if formato == 'CSV':
+        return _gerar_csv(df)
+    if formato == 'Excel':
+        return _gerar_excel(df, nome_planilha)
+    if formato in ('Parquet', 'Arrow'):
+        return _gerar_arrow(df, formato)
+    raise ValueError(f"Formato de exportação desconhecido: {formato}")
+
+def exportar_para_arquivo(df, formato='CSV', nome_planilha='Dados'):
+    """Grava a exportação num arquivo temporário, pronto para o st.download_button"""
+    # O st.download_button aceita arquivos brutos (RawIOBase), mas não o objeto com buffer do TemporaryFile
+    arquivo = tempfile.TemporaryFile(buffering=0)
+    escritor = io.BufferedWriter(arquivo, buffer_size=TAMANHO_BLOCO)
+    for bloco in gerar_exportacao(df, formato, nome_planilha):
+        escritor.write(bloco)
+    escritor.detach()  # Descarrega o buffer sem fechar o arquivo
+    arquivo.seek(0)
+    return arquivo
+
+def nome_arquivo(prefixo, formato):
+    """Nome do arquivo exportado com a data do dia"""
+    extensao = FORMATOS_EXPORTACAO[formato][0]
+    return f'{prefixo}{datetime.now().strftime("%Y%m%d")}.{extensao}'
@@ -3,6 +3,12 @@ from streamlit.runtime.scriptrunner import RerunException, RerunData
 import os
 import sys
 
+from perf_utils import medir_execucao, executar_uma_vez
+from servidor_utils import iniciar_servidor_auxiliar
+from aquecimento_utils import iniciar_aquecimento
+import api  # Registra as rotas /api no servidor auxiliar
+from sessao_utils import registrar_acesso, iniciar_limpeza_sessoes
+
 # Função interna para forçar rerun (substitui st.experimental_rerun())
 def force_rerun():
     raise RerunException(RerunData(None))
@@ -73,6 +79,13 @@ def main():
         initial_sidebar_state="expanded"
     )
     
+    # Servidor auxiliar (métricas em /metrics, API de dados em /api e prontidão em /ready), aquecimento dos caches
+    # e limpeza de memória das sessões, um por processo (com servidor.py já foram iniciados antes do Streamlit)
+    executar_uma_vez(iniciar_servidor_auxiliar)
+    executar_uma_vez(iniciar_aquecimento)
+    executar_uma_vez(iniciar_limpeza_sessoes)
+    registrar_acesso()
+
     # Inicializa variáveis de sessão
     if "logged_in" not in st.session_state:
         st.session_state["logged_in"] = False
@@ -81,7 +94,8 @@ def main():
 
     # Se NÃO estiver logado, exibe apenas a página de login
     if not st.session_state["logged_in"]:
-        login_page()
+        with medir_execucao("Login"):
+            login_page()
     else:
         # Define páginas de acordo com o cargo
         if st.session_state["cargo"] == "Administrador":
@@ -93,6 +107,9 @@ def main():
                 "Dashboard": [
                     st.Page("Dashboard/Dash Jira.py", title="Dashboard Jira", icon="📊"),
                     st.Page("Dashboard/ia.py", title="Projetos IA", icon="🤖")
+                ],
+                "Administração": [
+                    st.Page("Principal/Métricas.py", title="Métricas", icon="📈")
                 ]
             }
         else:
@@ -111,8 +128,9 @@ def main():
         pg = st.navigation(pages, position="sidebar", expanded=False)
         # Exibe botão de logout
         show_logout_button()
-        # Executa a página selecionada
-        pg.run()
+        # Executa a página selecionada (com PERFIL_PAGINAS=1, o tempo de cada execução vai para o log)
+        with medir_execucao(pg.title):
+            pg.run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,1385 @@
+# jira_utils.py
+import os
+import time
+import hashlib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+
+from db_utils import get_connection, execute_query, execute_many, read_query
+from cache_compartilhado_utils import obter_backend
+from metricas_utils import incrementar, observar, registrar_cache, registrar_coletor
+from perf_utils import executar_uma_vez
+
+STATUS_CONCLUIDOS = ['Done', 'Concluído']
+STATUS_ANDAMENTO = ['In Progress', 'Em andamento']
+
+# Campos cujo histórico é guardado localmente
+CAMPOS_HISTORICO = ['status', 'duedate']
+
+# Filtros que podem ir direto no JQL (faceta -> campo JQL)
+CAMPOS_FILTRO_JQL = {'responsaveis': 'assignee', 'status': 'status', 'tipos': 'issuetype', 'labels': 'labels'}
+
+MAX_TAREFAS_BUSCA = 500  # Tarefas mais recentes trazidas por busca de projeto
+MAX_ISSUES_BULKFETCH = 1000  # Limite de tarefas por chamada do /changelog/bulkfetch
+MAX_CONEXOES_JIRA = 4  # Requisições simultâneas ao Jira
+TAMANHO_LOTE_CONSULTA = 500  # Chaves por cláusula IN nas consultas locais
+MAX_IDS_WORKLOG_LIST = 1000  # Limite de ids por chamada do /worklog/list
+DIAS_INICIAIS_WORKLOG = 365  # Janela da primeira sincronização de worklogs de um site
+
+# Atualização em segundo plano dos dados do Jira
+INTERVALO_ATUALIZACAO = int(os.getenv("JIRA_INTERVALO_ATUALIZACAO", "300"))  # Segundos entre atualizações de um projeto
+INTERVALO_VERIFICACAO = 15  # Segundos entre verificações do agendador
+TEMPO_INATIVIDADE = 3600  # Projetos sem acesso há mais tempo deixam de ser atualizados
+TEMPO_DESCARTE = 86400  # Snapshots sem acesso há mais tempo são descartados
+DIRETORIO_SNAPSHOTS = os.getenv("JIRA_SNAPSHOT_DIR", "snapshots_jira")  # Cópia em disco para reinícios do servidor
+TEMPO_TRAVA_ATUALIZACAO = 120  # Segundos que uma réplica espera outra terminar de atualizar o mesmo projeto
+
+# Limite de requisições por site Jira, compartilhado por todas as sessões do processo
+REQUISICOES_POR_SEGUNDO = float(os.getenv("JIRA_REQUISICOES_POR_SEGUNDO", "10"))
+RAJADA_REQUISICOES = int(os.getenv("JIRA_RAJADA_REQUISICOES", "20"))
+MAX_TENTATIVAS_429 = 3  # Novas tentativas após respostas 429 (Too Many Requests)
+ESPERA_PADRAO_429 = 5  # Segundos de pausa quando a resposta 429 não traz Retry-After
+ESPERA_MAXIMA_429 = 60
+
+# ======= LIMITE DE TAXA E REQUISIÇÕES COMPARTILHADAS =======
+
+class LimitadorTaxa:
+    """Token bucket: até 'rajada' requisições de uma vez e, em média, 'taxa' por segundo"""
+
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.rajada = rajada
+        self._fichas = rajada
+        self._atualizado = time.monotonic()
+        self._pausa_ate = 0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        """Bloqueia até haver uma ficha disponível (e não houver pausa em andamento) e a consome"""
+        while True:
+            with self._lock:
+                agora = time.monotonic()
+                self._fichas = min(self.rajada, self._fichas + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+
+                espera = self._pausa_ate - agora
+                if espera <= 0:
+                    if self._fichas >= 1:
+                        self._fichas -= 1
+                        return
+                    espera = (1 - self._fichas) / self.taxa
+            time.sleep(espera)
+
+    def pausar(self, segundos):
+        """Suspende todas as requisições ao host pelo tempo pedido pelo Jira"""
+        with self._lock:
+            self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+def _limitador(url):
+    host = urlsplit(url).netloc
+    with _limitadores_lock:
+        if host not in _limitadores:
+            _limitadores[host] = LimitadorTaxa(REQUISICOES_POR_SEGUNDO, RAJADA_REQUISICOES)
+        return _limitadores[host]
+
+def _segundos_retry_after(response):
+    try:
+        segundos = float(response.headers.get('Retry-After', ESPERA_PADRAO_429))
+    except ValueError:
+        segundos = ESPERA_PADRAO_429
+    return min(max(segundos, 0), ESPERA_MAXIMA_429)
+
+def requisitar_jira(metodo, url, **kwargs):
+    """Faz uma requisição ao Jira respeitando o limite do host e o Retry-After das respostas 429"""
+    limitador = _limitador(url)
+    host = urlsplit(url).netloc
+    for tentativa in range(MAX_TENTATIVAS_429 + 1):
+        limitador.aguardar()
+        inicio = time.perf_counter()
+        try:
+            response = requests.request(metodo, url, **kwargs)
+        except requests.RequestException:
+            incrementar('jira_requisicoes_total', host=host, status='erro')
+            raise
+        observar('jira_requisicao_seconds', time.perf_counter() - inicio, host=host)
+        incrementar('jira_requisicoes_total', host=host, status=response.status_code)
+        if response.status_code != 429 or tentativa == MAX_TENTATIVAS_429:
+            return response
+        limitador.pausar(_segundos_retry_after(response))
+
+# Operações idênticas em andamento (mesma chave) compartilham uma única execução e seu resultado
+_em_andamento = {}
+_em_andamento_lock = threading.Lock()
+
+def executar_unico(chave, funcao, *args):
+    """Executa funcao(*args) uma vez por chave; chamadas simultâneas com a mesma chave esperam e recebem o mesmo resultado"""
+    with _em_andamento_lock:
+        futuro = _em_andamento.get(chave)
+        dono = futuro is None
+        if dono:
+            futuro = Future()
+            _em_andamento[chave] = futuro
+
+    if not dono:
+        return futuro.result()
+
+    try:
+        resultado = funcao(*args)
+        futuro.set_result(resultado)
+        return resultado
+    except BaseException as e:
+        futuro.set_exception(e)
+        raise
+    finally:
+        with _em_andamento_lock:
+            _em_andamento.pop(chave, None)
+
+def valor_jql(valor):
+    """Valor entre aspas para uso no JQL"""
+    return '"' + str(valor).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def buscar_dados_jira(url, email, token, project_key, data_inicio=None, data_fim=None, filtros=()):
+    """Busca dados de tarefas do Jira com um JQL específico e datas personalizadas"""
+    try:
+        auth = (email, token)
+
+        # Configurar JQL com datas personalizadas ou usar padrão
+        if data_inicio and data_fim:
+            data_inicio_str = data_inicio.strftime("%Y-%m-%d")
+            data_fim_str = data_fim.strftime("%Y-%m-%d")
+            condicoes = f'project = "{project_key}" AND created >= "{data_inicio_str}" AND created <= "{data_fim_str}"'
+        elif data_inicio:
+            condicoes = f'project = "{project_key}" AND created >= "{data_inicio.strftime("%Y-%m-%d")}"'
+        else:
+            # Padrão: últimos 30 dias
+            data_inicio_padrao = (datetime.datetime.now() - datetime.timedelta(days=30)).strftime("%Y-%m-%d")
+            condicoes = f'project = "{project_key}" AND created >= "{data_inicio_padrao}"'
+
+        # Filtros opcionais: pares (campo JQL, valor já formatado), aplicados pelo próprio Jira
+        for campo, valor in filtros:
+            condicoes += f' AND {campo} = {valor}'
+        jql = f'{condicoes} ORDER BY created DESC'
+
+        # Implementação de paginação para buscar até 500 tarefas
+        start_at = 0
+        max_per_page = 100  # API Jira geralmente limita a 100 itens por página
+        max_results = MAX_TAREFAS_BUSCA  # Limitar a 500 tarefas no total
+        
+        all_issues = []
+        total_fetched = 0
+        
+        while total_fetched < max_results:
+            # Parâmetros para a consulta
+            params = {
+                'jql': jql,
+                'maxResults': max_per_page,
+                'startAt': start_at,
+                'fields': 'summary,status,assignee,duedate,created,updated,priority,timetracking'
+            }
+
+            response = requisitar_jira(
+                'GET',
+                f"{url}/rest/api/3/search",
+                params=params,
+                auth=auth
+            )
+
+            if response.status_code != 200:
+                return False, f"Erro: {response.status_code} - {response.text}"
+            
+            data = response.json()
+            issues = data.get('issues', [])
+            
+            # Se não há mais resultados, sair do loop
+            if not issues:
+                break
+                
+            all_issues.extend(issues)
+            total_fetched += len(issues)
+            
+            # Se já buscamos todos os resultados disponíveis, sair do loop
+            total_issues = data.get('total', 0)
+            if start_at + len(issues) >= total_issues or len(issues) < max_per_page:
+                break
+                
+            # Avançar para a próxima página
+            start_at += len(issues)
+        
+        # Montar a resposta final no mesmo formato esperado pelo código existente
+        final_response = {
+            'issues': all_issues,
+            'total': total_fetched
+        }
+        
+        return True, final_response
+    except Exception as e:
+        return False, f"Erro ao buscar dados do Jira: {str(e)}"
+
+def _campo_aninhado(serie, chave, padrao):
+    """Extrai uma chave de uma coluna de dicionários, preenchendo ausências com o valor padrão"""
+    valores = pd.Series(
+        [valor.get(chave) if isinstance(valor, dict) else None for valor in serie],
+        index=serie.index,
+        dtype=object
+    )
+    if padrao is None:
+        return valores
+    return valores.fillna(padrao)
+
+def _segundos_para_horas(segundos):
+    """Converte segundos em horas arredondadas a uma casa, igual ao round() do Python"""
+    segundos = pd.to_numeric(segundos, errors='coerce').fillna(0)
+    if not segundos.any():
+        return pd.Series(0, index=segundos.index)
+
+    horas = segundos / 3600
+    arredondadas = horas.round(1)
+
+    # Empates exatos (x.x5 h) dependem da representação binária no round() do Python;
+    # só esses poucos valores são arredondados individualmente
+    empates = (segundos % 360) == 180
+    if empates.any():
+        arredondadas[empates] = [round(h, 1) for h in horas[empates]]
+
+    return arredondadas.where(segundos != 0, 0)
+
+def processar_dados_jira(dados_raw):
+    """Processa os dados brutos do Jira e retorna um DataFrame"""
+    if not dados_raw or 'issues' not in dados_raw:
+        return pd.DataFrame()
+
+    issues = dados_raw['issues']
+    if not issues:
+        return pd.DataFrame()
+
+    # Tabela com um registro por tarefa e apenas os campos usados pelo dashboard
+    campos = pd.DataFrame.from_records(
+        [issue.get('fields', {}) for issue in issues],
+        columns=['summary', 'status', 'assignee', 'created', 'updated', 'duedate', 'priority', 'timetracking']
+    )
+    ids = pd.Series([issue.get('key', 'N/A') for issue in issues], dtype=object)
+
+    status = _campo_aninhado(campos['status'], 'name', 'Sem status')
+
+    # Datas (apenas a parte da data, sem horário)
+    criada = pd.to_datetime(campos['created'].astype('string').str[:10], format="%Y-%m-%d")
+    atualizada = pd.to_datetime(campos['updated'].astype('string').str[:10], format="%Y-%m-%d")
+    prazo = pd.to_datetime(campos['duedate'], format="%Y-%m-%d")
+
+    # Colunas com poucos valores distintos viram categorias e as horas usam float32;
+    # Dias Restantes e Atrasada dependem do dia atual e são calculadas na exibição
+    return pd.DataFrame({
+        'ID': ids,
+        'Resumo': campos['summary'].fillna('Sem título'),
+        'Status': status.astype('category'),
+        'Responsável': _campo_aninhado(campos['assignee'], 'displayName', 'Não atribuído').astype('category'),
+        'Criada': criada,
+        'Atualizada': atualizada,
+        'Prazo': prazo,
+        'Prioridade': _campo_aninhado(campos['priority'], 'name', 'Normal').astype('category'),
+        'Tempo Estimado (h)': _segundos_para_horas(_campo_aninhado(campos['timetracking'], 'originalEstimateSeconds', None)).astype('float32'),
+        'Tempo Gasto (h)': _segundos_para_horas(_campo_aninhado(campos['timetracking'], 'timeSpentSeconds', None)).astype('float32')
+    })
+
+def buscar_facetas(url, email, token, project_key):
+    """Lista responsáveis, status, tipos de tarefa e labels disponíveis no projeto, sem baixar tarefas"""
+    try:
+        auth = (email, token)
+
+        response = requisitar_jira('GET', f"{url}/rest/api/3/user/assignable/search",
+                                   params={'project': project_key, 'maxResults': 1000}, auth=auth)
+        if response.status_code != 200:
+            return False, f"Erro: {response.status_code} - {response.text}"
+        responsaveis = {usuario['displayName']: usuario['accountId'] for usuario in response.json()}
+
+        # Status de cada tipo de tarefa do projeto
+        response = requisitar_jira('GET', f"{url}/rest/api/3/project/{project_key}/statuses", auth=auth)
+        if response.status_code != 200:
+            return False, f"Erro: {response.status_code} - {response.text}"
+        tipos = response.json()
+        status = {item['name'] for tipo in tipos for item in tipo.get('statuses', [])}
+
+        # Labels são do site inteiro, em páginas
+        labels = []
+        start_at = 0
+        while True:
+            response = requisitar_jira('GET', f"{url}/rest/api/3/label",
+                                       params={'startAt': start_at, 'maxResults': 1000}, auth=auth)
+            if response.status_code != 200:
+                return False, f"Erro: {response.status_code} - {response.text}"
+            data = response.json()
+            labels.extend(data.get('values', []))
+            if data.get('isLast', True) or not data.get('values'):
+                break
+            start_at += len(data['values'])
+
+        return True, {
+            'responsaveis': responsaveis,
+            'status': sorted(status),
+            'tipos': sorted({tipo['name'] for tipo in tipos}),
+            'labels': sorted(labels)
+        }
+    except Exception as e:
+        return False, f"Erro ao buscar opções de filtro do Jira: {str(e)}"
+
+def init_jira_db():
+    conn = get_connection()
+    c = conn.cursor()
+    execute_query(c, '''
+        CREATE TABLE IF NOT EXISTS jira_transicoes (
+            site TEXT NOT NULL,
+            issue_key TEXT NOT NULL,
+            historico_id TEXT NOT NULL,
+            campo TEXT NOT NULL,
+            valor_de TEXT,
+            valor_para TEXT,
+            alterado_em TEXT NOT NULL,
+            PRIMARY KEY (site, issue_key, historico_id, campo)
+        )
+    ''')
+    execute_query(c, '''
+        CREATE TABLE IF NOT EXISTS jira_changelog_sync (
+            site TEXT NOT NULL,
+            issue_key TEXT NOT NULL,
+            atualizada TEXT NOT NULL,
+            PRIMARY KEY (site, issue_key)
+        )
+    ''')
+    execute_query(c, '''
+        CREATE TABLE IF NOT EXISTS jira_worklogs (
+            site TEXT NOT NULL,
+            id TEXT NOT NULL,
+            issue_id TEXT NOT NULL,
+            autor TEXT,
+            iniciado_em TEXT NOT NULL,
+            segundos INTEGER NOT NULL,
+            PRIMARY KEY (site, id)
+        )
+    ''')
+    execute_query(c, '''
+        CREATE INDEX IF NOT EXISTS idx_jira_worklogs_autor_iniciado
+        ON jira_worklogs (autor, iniciado_em)
+    ''')
+    execute_query(c, '''
+        CREATE TABLE IF NOT EXISTS jira_sync_estado (
+            chave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+def _em_lotes(itens, tamanho):
+    return [itens[i:i + tamanho] for i in range(0, len(itens), tamanho)]
+
+def _extrair_transicoes(issue_key, historicos):
+    """Converte os históricos do Jira em linhas (issue, histórico, campo, de, para, data)"""
+    linhas = []
+    for historico in historicos:
+        for item in historico.get('items', []):
+            campo = item.get('fieldId') or item.get('field')
+            if campo not in CAMPOS_HISTORICO:
+                continue
+            # Para status os nomes estão em *String; para prazo, a data ISO está em from/to
+            if campo == 'status':
+                de, para = item.get('fromString'), item.get('toString')
+            else:
+                de, para = item.get('from'), item.get('to')
+            linhas.append((issue_key, str(historico.get('id')), campo, de, para, historico.get('created')))
+    return linhas
+
+def _buscar_changelog_bulk(url, auth, issues):
+    """Busca o histórico de um lote de tarefas pelo endpoint /changelog/bulkfetch"""
+    chaves_por_id = {str(issue['id']): issue['key'] for issue in issues}
+    linhas = []
+    next_page_token = None
+
+    while True:
+        corpo = {
+            'issueIdsOrKeys': list(chaves_por_id),
+            'fieldIds': CAMPOS_HISTORICO,
+            'maxResults': MAX_ISSUES_BULKFETCH
+        }
+        if next_page_token:
+            corpo['nextPageToken'] = next_page_token
+
+        response = requisitar_jira('POST', f"{url}/rest/api/3/changelog/bulkfetch", json=corpo, auth=auth)
+        if response.status_code != 200:
+            return None if response.status_code in (404, 405) else response
+
+        data = response.json()
+        for changelog in data.get('issueChangeLogs', []):
+            issue_key = chaves_por_id.get(str(changelog.get('issueId')))
+            if issue_key:
+                linhas.extend(_extrair_transicoes(issue_key, changelog.get('changeHistories', [])))
+
+        next_page_token = data.get('nextPageToken')
+        if not next_page_token:
+            return linhas
+
+def _buscar_changelog_issue(url, auth, issue):
+    """Busca o histórico de uma tarefa pelo endpoint /issue/{key}/changelog (Jira sem bulkfetch)"""
+    linhas = []
+    start_at = 0
+
+    while True:
+        response = requisitar_jira(
+            'GET',
+            f"{url}/rest/api/3/issue/{issue['key']}/changelog",
+            params={'startAt': start_at, 'maxResults': 100},
+            auth=auth
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro: {response.status_code} - {response.text}")
+
+        data = response.json()
+        historicos = data.get('values', [])
+        linhas.extend(_extrair_transicoes(issue['key'], historicos))
+
+        start_at += len(historicos)
+        if data.get('isLast', True) or not historicos:
+            return linhas
+
+def _carregar_sincronizadas(url, chaves):
+    """Retorna a data de atualização já sincronizada de cada tarefa do site"""
+    conn = get_connection()
+    c = conn.cursor()
+    sincronizadas = {}
+    for lote in _em_lotes(chaves, TAMANHO_LOTE_CONSULTA):
+        marcadores = ", ".join(["?"] * len(lote))
+        execute_query(c, f"SELECT issue_key, atualizada FROM jira_changelog_sync WHERE site = ? AND issue_key IN ({marcadores})",
+                      (url,) + tuple(lote))
+        sincronizadas.update(dict(c.fetchall()))
+    conn.close()
+    return sincronizadas
+
+def _normalizar_datas(valores):
+    """Converte datas do Jira (texto ISO com fuso ou epoch em ms) para UTC"""
+    valores = pd.Series(valores, dtype=object)
+    numericas = pd.to_numeric(valores, errors='coerce')
+    datas = pd.to_datetime(valores.where(numericas.isna()), utc=True, format='ISO8601')
+    return datas.fillna(pd.to_datetime(numericas, unit='ms', utc=True))
+
+def _salvar_transicoes(url, linhas, issues):
+    """Grava as transições novas do site e marca as tarefas como sincronizadas em uma única transação"""
+    if linhas:
+        datas = _normalizar_datas([linha[5] for linha in linhas]).dt.strftime('%Y-%m-%dT%H:%M:%S')
+        linhas = [(url,) + linha[:5] + (data,) for linha, data in zip(linhas, datas)]
+
+    conn = get_connection()
+    c = conn.cursor()
+    execute_many(c, '''
+        INSERT INTO jira_transicoes (site, issue_key, historico_id, campo, valor_de, valor_para, alterado_em)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT DO NOTHING
+    ''', linhas)
+    execute_many(c, '''
+        INSERT INTO jira_changelog_sync (site, issue_key, atualizada)
+        VALUES (?, ?, ?)
+        ON CONFLICT (site, issue_key) DO UPDATE SET atualizada = excluded.atualizada
+    ''', [(url, issue['key'], issue['fields']['updated']) for issue in issues])
+    conn.commit()
+    conn.close()
+
+def sincronizar_changelogs(url, email, token, issues):
+    """Atualiza o cache local de transições de status e prazo das tarefas alteradas desde a última sincronização"""
+    try:
+        auth = (email, token)
+        executar_uma_vez(init_jira_db)
+
+        # Apenas tarefas cujo 'updated' mudou desde a última sincronização
+        sincronizadas = _carregar_sincronizadas(url, [issue['key'] for issue in issues])
+        pendentes = [
+            issue for issue in issues
+            if sincronizadas.get(issue['key']) != issue.get('fields', {}).get('updated')
+        ]
+        if not pendentes:
+            return True, 0
+
+        lotes = _em_lotes(pendentes, MAX_ISSUES_BULKFETCH)
+        with ThreadPoolExecutor(max_workers=MAX_CONEXOES_JIRA) as executor:
+            resultados = list(executor.map(lambda lote: _buscar_changelog_bulk(url, auth, lote), lotes))
+
+            linhas = []
+            for lote, resultado in zip(lotes, resultados):
+                if resultado is None:
+                    # Jira sem o endpoint em lote: uma chamada por tarefa, ainda em paralelo
+                    for linhas_issue in executor.map(lambda issue: _buscar_changelog_issue(url, auth, issue), lote):
+                        linhas.extend(linhas_issue)
+                elif isinstance(resultado, list):
+                    linhas.extend(resultado)
+                else:
+                    return False, f"Erro: {resultado.status_code} - {resultado.text}"
+
+        _salvar_transicoes(url, linhas, pendentes)
+        return True, len(pendentes)
+    except Exception as e:
+        return False, f"Erro ao sincronizar histórico do Jira: {str(e)}"
+
+def carregar_transicoes(url, chaves):
+    """Carrega as transições guardadas das tarefas informadas do site"""
+    conn = get_connection()
+    frames = []
+    for lote in _em_lotes(list(chaves), TAMANHO_LOTE_CONSULTA):
+        marcadores = ", ".join(["?"] * len(lote))
+        query = f'''
+            SELECT issue_key, campo, valor_de, valor_para, alterado_em
+            FROM jira_transicoes
+            WHERE site = ? AND issue_key IN ({marcadores})
+        '''
+        frames.append(read_query(query, conn, params=(url,) + tuple(lote)))
+    conn.close()
+
+    if not frames:
+        return pd.DataFrame(columns=['issue_key', 'campo', 'valor_de', 'valor_para', 'alterado_em'])
+
+    transicoes = pd.concat(frames, ignore_index=True)
+    transicoes['alterado_em'] = pd.to_datetime(transicoes['alterado_em'])
+    return transicoes
+
+def calcular_metricas_historico(transicoes):
+    """Calcula por tarefa as datas de início/conclusão e as mudanças de prazo a partir das transições"""
+    status = transicoes[transicoes['campo'] == 'status']
+    concluida_em = status[status['valor_para'].isin(STATUS_CONCLUIDOS)].groupby('issue_key')['alterado_em'].max()
+    iniciada_em = status[status['valor_para'].isin(STATUS_ANDAMENTO)].groupby('issue_key')['alterado_em'].min()
+
+    # Mudanças de um prazo já definido (definir o primeiro prazo não conta como mudança)
+    prazos = transicoes[(transicoes['campo'] == 'duedate') & transicoes['valor_de'].notna()]
+    deslize = (pd.to_datetime(prazos['valor_para'], errors='coerce') -
+               pd.to_datetime(prazos['valor_de'], errors='coerce')).dt.days
+    mudancas = prazos.assign(deslize=deslize).groupby('issue_key').agg(
+        mudancas=('deslize', 'size'),
+        deslize=('deslize', 'sum'),
+        ultima=('alterado_em', 'max')
+    )
+
+    return pd.DataFrame({
+        'Iniciada em': iniciada_em,
+        'Concluída em': concluida_em,
+        'Mudanças de Prazo': mudancas['mudancas'],
+        'Deslize Prazo (dias)': mudancas['deslize'],
+        'Última Mudança de Prazo': mudancas['ultima']
+    })
+
+def _ler_estado_sync(chave):
+    conn = get_connection()
+    c = conn.cursor()
+    execute_query(c, "SELECT valor FROM jira_sync_estado WHERE chave = ?", (chave,))
+    linha = c.fetchone()
+    conn.close()
+    return linha[0] if linha else None
+
+def _ids_worklog_alterados(url, auth, recurso, since):
+    """Percorre /worklog/updated ou /worklog/deleted e retorna (ids, until)"""
+    ids = []
+    until = since
+    while True:
+        response = requisitar_jira('GET', f"{url}/rest/api/3/worklog/{recurso}", params={'since': since}, auth=auth)
+        if response.status_code != 200:
+            raise RuntimeError(f"Erro: {response.status_code} - {response.text}")
+
+        data = response.json()
+        ids.extend(valor['worklogId'] for valor in data.get('values', []))
+        until = data.get('until', until)
+
+        if data.get('lastPage', True):
+            return ids, until
+        since = until
+
+def _buscar_worklogs(url, auth, ids):
+    """Busca os detalhes de até 1000 worklogs pelo endpoint /worklog/list"""
+    response = requisitar_jira('POST', f"{url}/rest/api/3/worklog/list", json={'ids': ids}, auth=auth)
+    if response.status_code != 200:
+        raise RuntimeError(f"Erro: {response.status_code} - {response.text}")
+    return response.json()
+
+def sincronizar_worklogs(url, email, token):
+    """Sincroniza de forma incremental os worklogs do site, buscando só os alterados ou removidos desde a última vez"""
+    try:
+        auth = (email, token)
+        executar_uma_vez(init_jira_db)
+
+        chave_estado = f"worklog_since:{url}"
+        since = _ler_estado_sync(chave_estado)
+        if since is None:
+            inicio = datetime.datetime.now() - datetime.timedelta(days=DIAS_INICIAIS_WORKLOG)
+            since = int(inicio.timestamp() * 1000)
+        else:
+            since = int(since)
+
+        ids_alterados, until = _ids_worklog_alterados(url, auth, 'updated', since)
+        ids_removidos, _ = _ids_worklog_alterados(url, auth, 'deleted', since)
+
+        lotes = _em_lotes(ids_alterados, MAX_IDS_WORKLOG_LIST)
+        with ThreadPoolExecutor(max_workers=MAX_CONEXOES_JIRA) as executor:
+            worklogs = [worklog for lote in executor.map(lambda lote: _buscar_worklogs(url, auth, lote), lotes)
+                        for worklog in lote]
+
+        iniciados = _normalizar_datas([worklog.get('started') for worklog in worklogs]).dt.strftime('%Y-%m-%dT%H:%M:%S')
+        linhas = [
+            (url, str(worklog['id']), str(worklog['issueId']),
+             (worklog.get('author') or {}).get('displayName'),
+             iniciado, worklog.get('timeSpentSeconds') or 0)
+            for worklog, iniciado in zip(worklogs, iniciados)
+        ]
+
+        # Gravação e avanço do marcador na mesma transação
+        conn = get_connection()
+        c = conn.cursor()
+        execute_many(c, '''
+            INSERT INTO jira_worklogs (site, id, issue_id, autor, iniciado_em, segundos)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (site, id) DO UPDATE SET
+                issue_id = excluded.issue_id,
+                autor = excluded.autor,
+                iniciado_em = excluded.iniciado_em,
+                segundos = excluded.segundos
+        ''', linhas)
+        execute_many(c, "DELETE FROM jira_worklogs WHERE site = ? AND id = ?",
+                     [(url, str(worklog_id)) for worklog_id in ids_removidos])
+        execute_query(c, '''
+            INSERT INTO jira_sync_estado (chave, valor)
+            VALUES (?, ?)
+            ON CONFLICT (chave) DO UPDATE SET valor = excluded.valor
+        ''', (chave_estado, str(until)))
+        conn.commit()
+        conn.close()
+
+        return True, len(linhas)
+    except Exception as e:
+        return False, f"Erro ao sincronizar worklogs do Jira: {str(e)}"
+
+def carregar_worklogs(url, chaves_por_id, desde):
+    """Carrega os worklogs iniciados a partir de 'desde' nas tarefas informadas (Series id -> chave da tarefa)"""
+    conn = get_connection()
+    query = '''
+        SELECT issue_id, autor, iniciado_em, segundos
+        FROM jira_worklogs
+        WHERE site = ? AND iniciado_em >= ?
+    '''
+    worklogs = read_query(query, conn, params=(url, desde.strftime('%Y-%m-%dT%H:%M:%S')))
+    conn.close()
+
+    worklogs = worklogs[worklogs['issue_id'].isin(chaves_por_id.index)]
+
+    return pd.DataFrame({
+        'ID': worklogs['issue_id'].map(chaves_por_id).astype('category'),
+        'Autor': worklogs['autor'].fillna('Desconhecido').astype('category'),
+        'Iniciado': pd.to_datetime(worklogs['iniciado_em']),
+        'Horas': (worklogs['segundos'] / 3600).astype('float32')
+    }).reset_index(drop=True)
+
+# ======= MÉTRICAS DAS TAREFAS =======
+
+def adicionar_historico(df, historico):
+    """Acrescenta ao DataFrame o lead time, cycle time e mudanças de prazo vindos do histórico"""
+    if df.empty:
+        return df
+
+    historico = historico.reindex(df['ID'])
+    concluida_em = historico['Concluída em'].to_numpy()
+    iniciada_em = historico['Iniciada em'].to_numpy()
+    um_dia = pd.Timedelta(days=1)
+
+    return df.assign(**{
+        'Lead Time (dias)': ((concluida_em - df['Criada']) / um_dia).astype('float32'),
+        'Cycle Time (dias)': pd.Series((concluida_em - iniciada_em) / um_dia, index=df.index).astype('float32'),
+        'Mudanças de Prazo': historico['Mudanças de Prazo'].fillna(0).astype('int16').to_numpy(),
+        'Deslize Prazo (dias)': historico['Deslize Prazo (dias)'].fillna(0).astype('float32').to_numpy(),
+        'Última Mudança de Prazo': historico['Última Mudança de Prazo'].to_numpy()
+    })
+
+def adicionar_colunas_temporais(df, hoje=None):
+    """Calcula as colunas relativas ao dia atual (Dias Restantes e Atrasada)"""
+    if df.empty:
+        return df
+
+    hoje = pd.Timestamp(hoje or datetime.datetime.now().date())
+    dias_restantes = (df['Prazo'] - hoje).dt.days.astype('float32')
+    is_atrasada = (dias_restantes < 0) & ~df['Status'].isin(['Done', 'Concluído'])
+
+    # Cópia rasa: as colunas originais continuam compartilhadas com o DataFrame em cache
+    resultado = df.copy(deep=False)
+    posicao = resultado.columns.get_loc('Prazo') + 1
+    resultado.insert(posicao, 'Dias Restantes', dias_restantes)
+    resultado.insert(posicao + 1, 'Atrasada', is_atrasada)
+    return resultado
+
+def _mascaras_tarefas(df):
+    """Calcula uma única vez as máscaras de status e prazo usadas pelas métricas e alertas"""
+    concluida = df['Status'].isin(['Done', 'Concluído'])
+    return {
+        'concluida': concluida,
+        'andamento': df['Status'].isin(['In Progress', 'Em andamento']),
+        'atrasada': df['Atrasada'] == True,
+        'proxima': (df['Dias Restantes'] >= 0) & (df['Dias Restantes'] <= 7) & ~concluida
+    }
+
+def calcular_metricas(df, mascaras=None):
+    """Calcula métricas a partir do DataFrame de tarefas"""
+    if df.empty:
+        return {
+            'total_tarefas': 0,
+            'concluidas': 0,
+            'andamento': 0,
+            'atrasadas': 0,
+            'percentual_prazo': 0,
+            'media_dias_conclusao': 0,
+            'media_cycle_time': 0,
+            'prazo_alterado': 0,
+            'deslize_medio_prazo': 0,
+            'proximas_vencer': 0,
+            'tempo_total_gasto': 0,
+            'tempo_medio_tarefa': 0
+        }
+
+    if mascaras is None:
+        mascaras = _mascaras_tarefas(df)
+
+    # Identificar tarefas por status
+    concluidas = int(mascaras['concluida'].sum())
+    andamento = int(mascaras['andamento'].sum())
+    atrasadas = int(mascaras['atrasada'].sum())
+
+    # Calcular percentual de tarefas entregues no prazo
+    if concluidas > 0:
+        tarefas_prazo = int((mascaras['concluida'] & ~mascaras['atrasada']).sum())
+        percentual_prazo = (tarefas_prazo / concluidas) * 100
+    else:
+        percentual_prazo = 0
+
+    # Calcular média de dias para conclusão: pelo histórico quando disponível,
+    # senão aproximada por Atualizada - Criada
+    media_dias = 0
+    media_cycle_time = 0
+    if 'Lead Time (dias)' in df.columns and df.loc[mascaras['concluida'], 'Lead Time (dias)'].notna().any():
+        media_dias = df.loc[mascaras['concluida'], 'Lead Time (dias)'].mean()
+        media_cycle_time = df.loc[mascaras['concluida'], 'Cycle Time (dias)'].mean()
+        if pd.isna(media_cycle_time):
+            media_cycle_time = 0
+    else:
+        com_datas = df['Criada'].notna() & df['Atualizada'].notna() & mascaras['concluida']
+        if com_datas.any():
+            media_dias = (df.loc[com_datas, 'Atualizada'] - df.loc[com_datas, 'Criada']).dt.days.mean()
+
+    # Tarefas cujo prazo foi alterado e deslize médio (em dias) dessas tarefas
+    prazo_alterado = 0
+    deslize_medio_prazo = 0
+    if 'Mudanças de Prazo' in df.columns:
+        com_mudanca = df['Mudanças de Prazo'] > 0
+        prazo_alterado = int(com_mudanca.sum())
+        if prazo_alterado > 0:
+            deslize_medio_prazo = df.loc[com_mudanca, 'Deslize Prazo (dias)'].mean()
+
+    # Identificar tarefas próximas do vencimento (próximos 7 dias)
+    proximas_vencer = int(mascaras['proxima'].sum())
+
+    # Calcular tempo total gasto e tempo médio por tarefa
+    tempo_total_gasto = df['Tempo Gasto (h)'].sum()
+    tempo_medio_tarefa = df['Tempo Gasto (h)'].mean() if df.shape[0] > 0 else 0
+
+    return {
+        'total_tarefas': df.shape[0],
+        'concluidas': concluidas,
+        'andamento': andamento,
+        'atrasadas': atrasadas,
+        'percentual_prazo': percentual_prazo,
+        'media_dias_conclusao': media_dias,
+        'media_cycle_time': media_cycle_time,
+        'prazo_alterado': prazo_alterado,
+        'deslize_medio_prazo': deslize_medio_prazo,
+        'proximas_vencer': proximas_vencer,
+        'tempo_total_gasto': tempo_total_gasto,
+        'tempo_medio_tarefa': tempo_medio_tarefa
+    }
+
+def inicios_periodos(hoje=None):
+    """Retorna o primeiro dia da semana e do mês atuais"""
+    hoje = hoje or datetime.datetime.now().date()
+    return {
+        'semana': hoje - datetime.timedelta(days=hoje.weekday()),  # Segunda-feira da semana atual
+        'mes': hoje.replace(day=1)  # Primeiro dia do mês atual
+    }
+
+def calcular_horas_worklog(worklogs, hoje=None):
+    """Soma, em um único groupby, as horas registradas por autor na semana e no mês atuais"""
+    colunas = {
+        periodo: np.where(worklogs['Iniciado'] >= pd.Timestamp(inicio), worklogs['Horas'].to_numpy(dtype='float64'), 0.0)
+        for periodo, inicio in inicios_periodos(hoje).items()
+    }
+    return pd.DataFrame(colunas, index=worklogs.index).groupby(worklogs['Autor'], observed=True).sum()
+
+def calcular_agregados_insights(df, hoje=None):
+    """Calcula, em um único groupby, os agregados por responsável da semana e do mês atuais"""
+    inicios = inicios_periodos(hoje)
+
+    concluida = df['Status'].isin(['Done', 'Concluído']).to_numpy()
+    andamento = df['Status'].isin(['In Progress', 'Em andamento']).to_numpy()
+    atrasada = df['Atrasada'].to_numpy(dtype=bool)
+    horas = df['Tempo Gasto (h)'].to_numpy(dtype='float64')
+    posicao = np.arange(len(df))
+    if 'Última Mudança de Prazo' in df.columns:
+        mudanca_prazo = df['Última Mudança de Prazo']
+    else:
+        mudanca_prazo = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+
+    # Uma coluna por (período, indicador); tarefas fora do período contam zero
+    colunas = {}
+    for periodo, inicio in inicios.items():
+        no_periodo = (df['Atualizada'] >= pd.Timestamp(inicio)).to_numpy()
+        colunas[(periodo, 'tarefas')] = no_periodo
+        colunas[(periodo, 'concluidas')] = no_periodo & concluida
+        colunas[(periodo, 'horas_concluidas')] = np.where(no_periodo & concluida, horas, 0.0)
+        colunas[(periodo, 'andamento')] = no_periodo & andamento
+        colunas[(periodo, 'atrasadas')] = no_periodo & atrasada
+        colunas[(periodo, 'horas')] = np.where(no_periodo, horas, 0.0)
+        colunas[(periodo, 'prazo_alterado')] = (mudanca_prazo >= pd.Timestamp(inicio)).to_numpy()
+        # Ordem de aparição do responsável dentro do período, como no filtro original
+        colunas[(periodo, 'ordem')] = np.where(no_periodo, posicao, len(df))
+
+    indicadores = pd.DataFrame(colunas, index=df.index)
+    agregacoes = {coluna: ('min' if coluna[1] == 'ordem' else 'sum') for coluna in colunas}
+    por_responsavel = indicadores.groupby(df['Responsável'], observed=True, sort=False).agg(agregacoes)
+
+    # Totais da equipe incluem tarefas sem responsável
+    equipe = indicadores.sum()
+
+    return por_responsavel, equipe
+
+def gerar_insights_periodos(df, hoje=None, worklogs=None):
+    """Gera os insights da semana e do mês a partir da tabela de agregados"""
+    if df.empty:
+        return {'semana': [], 'mes': []}
+
+    por_responsavel, equipe = calcular_agregados_insights(df, hoje)
+
+    # Horas registradas por pessoa (worklogs), quando sincronizadas
+    horas_por_autor = None
+    if worklogs is not None:
+        horas_por_autor = calcular_horas_worklog(worklogs, hoje)
+    nomes_periodo = {'semana': "semana", 'mes': "mês"}
+
+    resultado = {}
+    for periodo, nome_periodo in nomes_periodo.items():
+        insights = []
+        tabela = por_responsavel[periodo]
+        tabela = tabela[tabela['tarefas'] > 0].sort_values('ordem')
+
+        for responsavel, linha in tabela.iterrows():
+            n_concluidas = int(linha['concluidas'])
+            if n_concluidas > 0:
+                tempo_gasto = linha['horas_concluidas']
+                insights.append(
+                    f"{responsavel} concluiu {n_concluidas} tarefas nesta {nome_periodo}, " +
+                    f"gastando um total de {tempo_gasto:.1f}h ({(tempo_gasto/n_concluidas):.1f}h por tarefa)."
+                )
+
+            n_andamento = int(linha['andamento'])
+            if n_andamento > 0:
+                insights.append(
+                    f"{responsavel} está trabalhando em {n_andamento} tarefas atualmente."
+                )
+
+            n_atrasadas = int(linha['atrasadas'])
+            if n_atrasadas > 0:
+                insights.append(
+                    f"{responsavel} tem {n_atrasadas} tarefas atrasadas que precisam de atenção."
+                )
+
+        if horas_por_autor is not None:
+            horas_periodo = horas_por_autor[periodo]
+            for autor, horas in horas_periodo[horas_periodo > 0].sort_values(ascending=False).items():
+                insights.append(
+                    f"{autor} registrou {horas:.1f}h de trabalho nesta {nome_periodo}."
+                )
+
+        # Insights gerais
+        if horas_por_autor is not None and horas_por_autor[periodo].sum() > 0:
+            insights.append(
+                f"No total, a equipe registrou {horas_por_autor[periodo].sum():.1f}h de trabalho nesta {nome_periodo}."
+            )
+        elif equipe[(periodo, 'tarefas')] > 0:
+            insights.append(
+                f"No total, a equipe gastou {equipe[(periodo, 'horas')]:.1f}h trabalhando em tarefas nesta {nome_periodo}."
+            )
+
+        # Mudanças de prazo no período, a partir do histórico de transições
+        n_prazo_alterado = int(equipe[(periodo, 'prazo_alterado')])
+        if n_prazo_alterado > 0:
+            insights.append(
+                f"{n_prazo_alterado} tarefas tiveram o prazo alterado nesta {nome_periodo}."
+            )
+
+        resultado[periodo] = insights
+
+    return resultado
+
+def gerar_insights(df, periodo='semana'):
+    """Gera insights a partir dos dados para um determinado período"""
+    return gerar_insights_periodos(df)['semana' if periodo == 'semana' else 'mes']
+
+def contar_valores(df, coluna):
+    """Conta as tarefas por valor de uma coluna, ignorando categorias sem tarefas no filtro"""
+    contagem = df[coluna].value_counts().reset_index()
+    contagem.columns = [coluna, 'Quantidade']
+    contagem[coluna] = contagem[coluna].astype(str)
+    return contagem[contagem['Quantidade'] > 0].reset_index(drop=True)
+
+def combinar_projetos(frames):
+    """Junta os DataFrames dos projetos, refazendo as categorias sobre o conjunto completo"""
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    for coluna in ['Projeto', 'Status', 'Responsável', 'Prioridade']:
+        df[coluna] = df[coluna].astype('category')
+    return df
+
+def _worklogs_das_tarefas(worklogs, df):
+    """Worklogs das tarefas de df; com vários sites a chave da tarefa só é única junto com o site"""
+    if 'Site' in df and 'Site' in worklogs:
+        tarefas = pd.MultiIndex.from_arrays([df['Site'].astype(str), df['ID'].astype(str)])
+        chaves = pd.MultiIndex.from_arrays([worklogs['Site'].astype(str), worklogs['ID'].astype(str)])
+        return worklogs[chaves.isin(tarefas)]
+    return worklogs[worklogs['ID'].isin(df['ID'])]
+
+def filtrar_tarefas(df, responsavel, status, worklogs=None, projeto="Todos"):
+    """Aplica os filtros de projeto, responsável e status às tarefas e aos worklogs"""
+    # Filtro de projeto
+    if projeto != "Todos":
+        df = df[df['Projeto'] == projeto]
+        if worklogs is not None:
+            worklogs = _worklogs_das_tarefas(worklogs, df)
+
+    # Filtro de responsável
+    if responsavel != "Todos":
+        df = df[df['Responsável'] == responsavel]
+        if worklogs is not None:
+            worklogs = worklogs[worklogs['Autor'] == responsavel]
+
+    # Filtro de status
+    if status != "Todos":
+        df = df[df['Status'] == status]
+        if worklogs is not None:
+            worklogs = _worklogs_das_tarefas(worklogs, df)
+
+    return df, worklogs
+
+def calcular_pacote_metricas(df, responsavel, status, hoje=None, worklogs=None, projeto="Todos"):
+    """Calcula de uma vez os cards, tabelas de alerta, agregados dos gráficos e insights de um filtro"""
+    df, worklogs = filtrar_tarefas(adicionar_colunas_temporais(df, hoje), responsavel, status, worklogs, projeto)
+    mascaras = _mascaras_tarefas(df)
+
+    return {
+        'metricas': calcular_metricas(df, mascaras),
+        'proximas': df[mascaras['proxima']][['ID', 'Resumo', 'Responsável', 'Prazo', 'Dias Restantes']],
+        'atrasadas': df[mascaras['atrasada']][['ID', 'Resumo', 'Responsável', 'Prazo', 'Dias Restantes', 'Status']],
+        'status_counts': contar_valores(df, 'Status'),
+        'prioridade_counts': contar_valores(df, 'Prioridade'),
+        'responsavel_counts': contar_valores(df, 'Responsável'),
+        'insights': gerar_insights_periodos(df, hoje, worklogs)
+    }
+
+def montar_tarefas(snapshots):
+    """Junta os snapshots [(site, snapshot)] num só DataFrame, com o histórico e os worklogs das tarefas"""
+    snapshots = [(url, snapshot) for url, snapshot in snapshots if not snapshot['df'].empty]
+    if not snapshots:
+        return pd.DataFrame(), None
+
+    ids_por_site = {}
+    for url, snapshot in snapshots:
+        ids_por_site.setdefault(url, []).append(snapshot['ids'])
+
+    # Histórico de status/prazo e worklogs já foram sincronizados junto com o snapshot; as chaves
+    # das tarefas só são únicas dentro de um site, então o histórico é lido e ligado site a site
+    historicos = {url: calcular_metricas_historico(carregar_transicoes(url, pd.concat(ids).tolist()))
+                  for url, ids in ids_por_site.items()}
+    df = combinar_projetos([adicionar_historico(snapshot['df'], historicos[url]).assign(Site=url)
+                            for url, snapshot in snapshots])
+    df['Site'] = df['Site'].astype('category')
+
+    desde = min(inicios_periodos().values())
+    worklogs = pd.concat([carregar_worklogs(url, pd.concat(ids), desde).assign(Site=url)
+                          for url, ids in ids_por_site.items()], ignore_index=True)
+    for coluna in ['ID', 'Autor', 'Site']:
+        worklogs[coluna] = worklogs[coluna].astype('category')
+    return df, worklogs
+
+# ======= CACHE DE PERÍODOS =======
+
+# Trechos de datas de criação já buscados de cada projeto, por (url, email, token, projeto, filtros).
+# Cada trecho guarda o intervalo [inicio, fim) buscado, as tarefas e, se a busca foi truncada, o 'piso':
+# a data de criação da tarefa mais antiga trazida (só as tarefas a partir dela estão completas).
+# Trechos com mais de INTERVALO_ATUALIZACAO segundos deixam de valer, para que as atualizações tragam dados novos.
+_trechos = {}
+_trechos_lock = threading.Lock()
+
+def _intervalo_consulta(data_inicio, data_fim):
+    """Intervalo [inicio, fim) de datas de criação consultado por buscar_dados_jira"""
+    if data_inicio and data_fim:
+        # No JQL, 'created <= "AAAA-MM-DD"' compara com a meia-noite do dia, que fica de fora
+        return data_inicio, data_fim
+    # Padrão: últimos 30 dias, sem limite final
+    return (datetime.datetime.now() - datetime.timedelta(days=30)).date(), datetime.date.max
+
+def _cobertura(trecho):
+    """Dias do trecho com todas as tarefas buscadas"""
+    if trecho['piso'] is None:
+        return trecho['inicio'], trecho['fim']
+    dia_seguinte = datetime.date.fromisoformat(trecho['piso'][:10]) + datetime.timedelta(days=1)
+    return min(dia_seguinte, trecho['fim']), trecho['fim']
+
+def _lacunas(inicio, fim, cobertos):
+    """Partes de [inicio, fim) fora dos intervalos cobertos, da mais recente para a mais antiga"""
+    lacunas = []
+    cursor = inicio
+    for coberto_inicio, coberto_fim in sorted(cobertos):
+        if coberto_inicio > cursor:
+            lacunas.append((cursor, min(coberto_inicio, fim)))
+        cursor = max(cursor, coberto_fim)
+        if cursor >= fim:
+            break
+    if cursor < fim:
+        lacunas.append((cursor, fim))
+    return [(a, b) for a, b in reversed(lacunas) if a < b]
+
+def _data_criacao(issue):
+    return issue.get('fields', {}).get('created') or ''
+
+def _trechos_validos(base):
+    """Trechos ainda válidos do projeto, descartando os vencidos"""
+    limite = time.monotonic() - INTERVALO_ATUALIZACAO
+    with _trechos_lock:
+        validos = [trecho for trecho in _trechos.get(base, []) if trecho['buscado_em'] > limite]
+        if validos:
+            _trechos[base] = validos
+        else:
+            _trechos.pop(base, None)
+        return validos
+
+def descartar_trechos(url, email, token, project_key, filtros=()):
+    """Esquece os trechos buscados do projeto (a próxima busca vai toda ao Jira)"""
+    with _trechos_lock:
+        _trechos.pop((url, email, token, project_key, tuple(filtros)), None)
+
+def descartar_trechos_vencidos():
+    with _trechos_lock:
+        bases = list(_trechos)
+    for base in bases:
+        _trechos_validos(base)
+
+def buscar_dados_periodo(url, email, token, project_key, data_inicio=None, data_fim=None, filtros=()):
+    """Mesmo resultado de buscar_dados_jira, mas só busca no Jira as partes do período ainda não buscadas"""
+    base = (url, email, token, project_key, tuple(filtros))
+    inicio, fim = _intervalo_consulta(data_inicio, data_fim)
+    trechos = _trechos_validos(base)
+    buscas = 0
+
+    def no_periodo(issue):
+        return inicio.isoformat() <= _data_criacao(issue)[:10] < fim.isoformat()
+
+    for lacuna_inicio, lacuna_fim in _lacunas(inicio, fim, [_cobertura(trecho) for trecho in trechos]):
+        # Tarefas que faltam na lacuna são mais antigas que o teto; se já há tarefas mais novas
+        # suficientes, a lacuna (e as seguintes, ainda mais antigas) não muda o resultado
+        teto = min([lacuna_fim.isoformat()] + [
+            trecho['piso'] for trecho in trechos
+            if trecho['piso'] and trecho['inicio'] <= lacuna_inicio and lacuna_fim <= trecho['fim']
+        ])
+        mais_recentes = {issue['id'] for trecho in trechos for issue in trecho['tarefas']
+                         if no_periodo(issue) and _data_criacao(issue) >= teto}
+        if len(mais_recentes) >= MAX_TAREFAS_BUSCA:
+            break
+
+        sucesso, resultado = buscar_dados_jira(url, email, token, project_key, lacuna_inicio,
+                                               None if lacuna_fim == datetime.date.max else lacuna_fim, filtros)
+        if not sucesso:
+            return False, resultado
+        buscas += 1
+
+        issues = resultado['issues']
+        trecho = {
+            'inicio': lacuna_inicio,
+            'fim': lacuna_fim,
+            'buscado_em': time.monotonic(),
+            'tarefas': issues,
+            'piso': min(map(_data_criacao, issues)) if len(issues) >= MAX_TAREFAS_BUSCA else None
+        }
+        trechos.append(trecho)
+        with _trechos_lock:
+            _trechos.setdefault(base, []).append(trecho)
+
+    registrar_cache('jira_trechos', buscas == 0)
+
+    # União dos trechos, sem repetir tarefas que aparecem em mais de um
+    por_id = {}
+    for trecho in trechos:
+        for issue in trecho['tarefas']:
+            if no_periodo(issue):
+                por_id[issue['id']] = issue
+    issues = sorted(por_id.values(), key=_data_criacao, reverse=True)[:MAX_TAREFAS_BUSCA]
+    return True, {'issues': issues, 'total': len(issues)}
+
+# ======= ATUALIZAÇÃO EM SEGUNDO PLANO =======
+
+# Último snapshot bom de cada projeto, por (url, email, token, projeto, data_inicio, data_fim).
+# Cada snapshot é um dict que nunca é alterado depois de publicado; a publicação troca a entrada inteira.
+_snapshots = {}
+_ultimo_acesso = {}
+_ultima_falha = {}
+_snapshots_lock = threading.Lock()
+_agendador = None
+
+def _resumo_chave(chave):
+    # As credenciais entram (resumidas): as tarefas visíveis dependem das permissões de cada token
+    return hashlib.sha1(repr(chave).encode()).hexdigest()
+
+def _arquivo_snapshot(chave):
+    """Caminho do snapshot em disco de (site, credenciais, projeto, período, filtros)"""
+    return os.path.join(DIRETORIO_SNAPSHOTS, f"{_resumo_chave(chave)}.parquet")
+
+def listar_snapshots(email, token):
+    """Snapshots publicados no processo buscados com essas credenciais, por identificador, com site, projeto, período e filtros"""
+    with _snapshots_lock:
+        publicados = [(chave, snapshot) for chave, snapshot in _snapshots.items() if chave[1:3] == (email, token)]
+
+    # Cada usuário só vê o que buscou com o próprio token (as tarefas dependem das permissões dele)
+    datasets = {}
+    for chave, snapshot in publicados:
+        url, _, _, project_key, data_inicio, data_fim, filtros = chave
+        datasets[_resumo_chave(chave)] = {
+            'site': url, 'projeto': project_key, 'data_inicio': data_inicio, 'data_fim': data_fim,
+            'filtros': [list(filtro) for filtro in filtros], 'snapshot': snapshot
+        }
+    return datasets
+
+def _salvar_snapshot_disco(chave, snapshot):
+    """Grava o DataFrame processado em Parquet, trocando o arquivo anterior de uma vez"""
+    try:
+        os.makedirs(DIRETORIO_SNAPSHOTS, exist_ok=True)
+        arquivo = _arquivo_snapshot(chave)
+        temporario = f"{arquivo}.{threading.get_ident()}.tmp"
+        snapshot['df'].assign(_id_jira=snapshot['ids'].index).to_parquet(temporario, index=False)
+        os.replace(temporario, arquivo)
+    except Exception as e:
+        print(f"Erro ao salvar snapshot do Jira: {str(e)}")
+
+def _remover_snapshot_disco(chave):
+    try:
+        os.remove(_arquivo_snapshot(chave))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Erro ao remover snapshot do Jira: {str(e)}")
+
+def _limpar_snapshots_disco():
+    """Remove os arquivos sem gravação há mais de TEMPO_DESCARTE (de chaves descartadas, nomes antigos ou gravações interrompidas)"""
+    limite = time.time() - TEMPO_DESCARTE
+    try:
+        arquivos = [entrada.path for entrada in os.scandir(DIRETORIO_SNAPSHOTS) if entrada.is_file()]
+    except FileNotFoundError:
+        return
+    for arquivo in arquivos:
+        try:
+            if os.path.getmtime(arquivo) < limite:
+                os.remove(arquivo)
+        except OSError as e:
+            print(f"Erro ao remover snapshot do Jira: {str(e)}")
+
+def _carregar_snapshot_disco(chave):
+    """Lê o snapshot em disco (memory-mapped), datado pela última gravação do arquivo"""
+    arquivo = _arquivo_snapshot(chave)
+    if not os.path.exists(arquivo):
+        return None
+
+    try:
+        df = pd.read_parquet(arquivo, memory_map=True)
+    except Exception as e:
+        print(f"Erro ao ler snapshot do Jira: {str(e)}")
+        return None
+
+    id_jira = df.pop('_id_jira')
+    if df.empty:
+        df = pd.DataFrame()
+    return {
+        'df': df,
+        'ids': pd.Series(df['ID'].to_numpy() if 'ID' in df else [], index=id_jira.to_numpy(), dtype=object),
+        'atualizado_em': datetime.datetime.fromtimestamp(os.path.getmtime(arquivo)),
+        'avisos': []
+    }
+
+def _nome_compartilhado(chave):
+    # Como no disco, cada usuário só recebe o que buscou com o próprio token
+    return f"jira:snapshot:{_resumo_chave(chave)}"
+
+def _snapshot_compartilhado(chave, recente=False):
+    """Snapshot publicado por qualquer réplica no cache compartilhado (só os atualizados há pouco, se 'recente')"""
+    backend = obter_backend()
+    if backend is None:
+        return None
+    snapshot = backend.obter(_nome_compartilhado(chave))
+    limite = datetime.datetime.now() - datetime.timedelta(seconds=INTERVALO_ATUALIZACAO)
+    if snapshot is None or (recente and snapshot['atualizado_em'] <= limite):
+        return None
+    return snapshot
+
+def _publicar_snapshot(chave, snapshot):
+    with _snapshots_lock:
+        _snapshots[chave] = snapshot
+        _ultima_falha.pop(chave, None)
+
+def _atualizar_dataset(chave, aceitar_compartilhado=True):
+    """Atualiza o snapshot do projeto; sessões e agendador pedindo o mesmo projeto ao mesmo tempo compartilham a busca"""
+    return executar_unico(('dataset', chave), _atualizar_entre_replicas, chave, aceitar_compartilhado)
+
+def _atualizar_entre_replicas(chave, aceitar_compartilhado):
+    """Com cache compartilhado, só uma réplica busca o projeto no Jira e as outras usam o snapshot publicado por ela"""
+    backend = obter_backend()
+    if backend is None:
+        return _buscar_e_publicar(chave)
+
+    nome = _nome_compartilhado(chave)
+    with backend.trava(nome, expira=TEMPO_TRAVA_ATUALIZACAO, espera=TEMPO_TRAVA_ATUALIZACAO) as obtida:
+        # Outra réplica pode ter atualizado o projeto enquanto esta esperava a trava
+        snapshot = _snapshot_compartilhado(chave, recente=True) if aceitar_compartilhado else None
+        if snapshot is not None:
+            _publicar_snapshot(chave, snapshot)
+            return True, snapshot
+
+        if obtida is False:
+            # A espera acabou com outra réplica ainda buscando: serve o último snapshot (dela ou deste processo)
+            # em vez de buscar o projeto ao mesmo tempo; o agendador tenta de novo no próximo intervalo
+            snapshot = _snapshot_compartilhado(chave)
+            if snapshot is not None:
+                _publicar_snapshot(chave, snapshot)
+                return True, snapshot
+            with _snapshots_lock:
+                snapshot = _snapshots.get(chave)
+                _ultima_falha[chave] = datetime.datetime.now()
+            if snapshot is not None:
+                return True, snapshot
+            return False, "O projeto está sendo atualizado por outra instância do app; tente novamente em instantes"
+
+        sucesso, resultado = _buscar_e_publicar(chave)
+        if sucesso:
+            backend.gravar(nome, resultado, expira=TEMPO_DESCARTE)
+        return sucesso, resultado
+
+def _buscar_e_publicar(chave):
+    """Busca o projeto e sincroniza seu histórico e worklogs, publicando o snapshot só se a busca der certo"""
+    url, email, token, project_key = chave[:4]
+    sucesso, resultado = buscar_dados_periodo(*chave)
+    if not sucesso:
+        # Em caso de erro o snapshot anterior continua publicado; nova tentativa só no próximo intervalo
+        with _snapshots_lock:
+            _ultima_falha[chave] = datetime.datetime.now()
+        return False, resultado
+
+    avisos = []
+    sucesso_sync, resultado_sync = sincronizar_changelogs(url, email, token, resultado['issues'])
+    if not sucesso_sync:
+        avisos.append(f"Histórico de tarefas indisponível ({url}): {resultado_sync}")
+    # Vários projetos do mesmo site disparam a mesma sincronização de worklogs
+    sucesso_sync, resultado_sync = executar_unico(('worklogs', url, email, token), sincronizar_worklogs, url, email, token)
+    if not sucesso_sync:
+        avisos.append(f"Worklogs indisponíveis ({url}): {resultado_sync}")
+
+    # O snapshot guarda o DataFrame já processado e o id interno de cada tarefa (usado pelos worklogs)
+    df = processar_dados_jira(resultado)
+    if not df.empty:
+        df.insert(1, 'Projeto', project_key)
+    ids = pd.Series([issue.get('key', 'N/A') for issue in resultado['issues']],
+                    index=[str(issue.get('id')) for issue in resultado['issues']], dtype=object)
+
+    snapshot = {'df': df, 'ids': ids, 'atualizado_em': datetime.datetime.now(), 'avisos': avisos}
+    _publicar_snapshot(chave, snapshot)
+    _salvar_snapshot_disco(chave, snapshot)
+    return True, snapshot
+
+def _verificar_datasets():
+    """Atualiza os projetos com snapshot vencido e descarta os que ninguém mais acessa"""
+    agora = time.monotonic()
+    limite = datetime.datetime.now() - datetime.timedelta(seconds=INTERVALO_ATUALIZACAO)
+    with _snapshots_lock:
+        descartados = [chave for chave, acesso in _ultimo_acesso.items() if agora - acesso > TEMPO_DESCARTE]
+        for chave in descartados:
+            _ultimo_acesso.pop(chave)
+            _snapshots.pop(chave, None)
+            _ultima_falha.pop(chave, None)
+        vencidos = [
+            chave for chave, snapshot in _snapshots.items()
+            if max(snapshot['atualizado_em'], _ultima_falha.get(chave, snapshot['atualizado_em'])) <= limite
+            and agora - _ultimo_acesso.get(chave, 0) <= TEMPO_INATIVIDADE
+        ]
+
+    for chave in descartados:
+        _remover_snapshot_disco(chave)
+    descartar_trechos_vencidos()
+    if vencidos:
+        with ThreadPoolExecutor(max_workers=MAX_CONEXOES_JIRA) as executor:
+            list(executor.map(_atualizar_dataset, vencidos))
+
+def _loop_agendador():
+    # Os arquivos das chaves descartadas antes de um reinício não seriam mais removidos
+    _limpar_snapshots_disco()
+    while True:
+        time.sleep(INTERVALO_VERIFICACAO)
+        try:
+            _verificar_datasets()
+        except Exception as e:
+            # O agendador não pode parar; o último snapshot bom continua sendo servido
+            print(f"Erro na atualização em segundo plano do Jira: {str(e)}")
+
+def iniciar_agendador():
+    """Inicia (uma vez por processo) a thread que mantém os snapshots do Jira atualizados"""
+    global _agendador
+    with _snapshots_lock:
+        if _agendador is None or not _agendador.is_alive():
+            _agendador = threading.Thread(target=_loop_agendador, name="jira-agendador", daemon=True)
+            _agendador.start()
+
+def _medidas_jira():
+    with _snapshots_lock:
+        snapshots = len(_snapshots)
+    with _trechos_lock:
+        trechos = sum(len(lista) for lista in _trechos.values())
+    return [('cache_entradas', {'cache': 'jira_snapshots'}, snapshots),
+            ('cache_entradas', {'cache': 'jira_trechos'}, trechos)]
+
+registrar_coletor(_medidas_jira)
+
+def obter_snapshot(url, email, token, project_key, data_inicio=None, data_fim=None, forcar=False, filtros=()):
+    """Retorna (sucesso, snapshot) do projeto; só busca na hora se ainda não houver snapshot ou se 'forcar'"""
+    # Cada combinação de filtros da consulta tem seu próprio snapshot
+    chave = (url, email, token, project_key, data_inicio, data_fim, tuple(filtros))
+    iniciar_agendador()
+    with _snapshots_lock:
+        _ultimo_acesso[chave] = time.monotonic()
+        snapshot = _snapshots.get(chave)
+    if not forcar:
+        registrar_cache('jira_snapshots', snapshot is not None)
+
+    # Depois de um reinício, o snapshot de outra réplica (ou o em disco) é servido na hora
+    # e o agendador o atualiza na próxima verificação
+    if snapshot is None and not forcar:
+        snapshot = _snapshot_compartilhado(chave)
+        if snapshot is None:
+            snapshot = _carregar_snapshot_disco(chave)
+            registrar_cache('jira_snapshots_disco', snapshot is not None)
+        if snapshot is not None:
+            with _snapshots_lock:
+                snapshot = _snapshots.setdefault(chave, snapshot)
+
+    if forcar:
+        descartar_trechos(url, email, token, project_key, filtros)
+    if snapshot is None or forcar:
+        return _atualizar_dataset(chave, aceitar_compartilhado=not forcar)
+    return True, snapshot
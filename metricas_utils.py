@@ -0,0 +1,142 @@
+# metricas_utils.py
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIXO = "dashchegou"
+
+# Limites (em segundos) dos histogramas de latência
+LIMITES_HISTOGRAMA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Nome -> (tipo, descrição) de cada métrica exposta
+DESCRICOES = {
+    'pagina_execucao_seconds': ('histogram', 'Duração de cada execução (rerun) de página'),
+    'fragmento_execucao_seconds': ('histogram', 'Duração de cada execução de um trecho (fragmento) de página, junto com a página ou sozinho'),
+    'cache_consultas_total': ('counter', 'Consultas a caches, por resultado (acerto ou falha)'),
+    'cache_entradas': ('gauge', 'Entradas guardadas em cada cache'),
+    'cache_bytes': ('gauge', 'Bytes ocupados pelos caches do st.cache_data'),
+    'jira_requisicoes_total': ('counter', 'Requisições feitas ao Jira, por site e status HTTP'),
+    'jira_requisicao_seconds': ('histogram', 'Latência das requisições ao Jira'),
+    'db_consultas_total': ('counter', 'Comandos executados no banco de dados, por tipo'),
+    'db_consulta_seconds': ('histogram', 'Duração dos comandos no banco de dados'),
+    'db_conexoes_total': ('counter', 'Conexões abertas com o banco de dados'),
+    'sessoes': ('gauge', 'Sessões abertas'),
+    'sessoes_bytes': ('gauge', 'Memória estimada dos dados guardados nas sessões'),
+    'sessao_despejos_total': ('counter', 'Entradas retiradas de sessões paradas, por chave'),
+    'api_requisicoes_total': ('counter', 'Requisições à API de dados, por rota e status HTTP'),
+    'cache_compartilhado_seconds': ('histogram', 'Duração das leituras e gravações no cache compartilhado'),
+    'cache_compartilhado_erros_total': ('counter', 'Falhas do backend do cache compartilhado, por operação'),
+    'cache_compartilhado_travas_total': ('counter', 'Travas entre réplicas, obtidas ou com espera esgotada'),
+    'aquecimento_pronto': ('gauge', '1 depois que o aquecimento do processo terminou'),
+    'aquecimento_etapa_seconds': ('gauge', 'Duração de cada etapa do aquecimento'),
+}
+
+# Os valores são do processo inteiro (todas as sessões)
+_contadores = {}   # (nome, rótulos) -> valor
+_histogramas = {}  # (nome, rótulos) -> {'baldes': [...], 'soma': s, 'total': n}
+_coletores = []    # funções que devolvem medidas atuais (nome, rótulos, valor) na hora da leitura
+_lock = threading.Lock()
+
+def _chave(nome, rotulos):
+    return nome, tuple(sorted((chave, str(valor)) for chave, valor in rotulos.items()))
+
+def incrementar(nome, valor=1, **rotulos):
+    """Soma 'valor' ao contador"""
+    chave = _chave(nome, rotulos)
+    with _lock:
+        _contadores[chave] = _contadores.get(chave, 0) + valor
+
+def observar(nome, segundos, **rotulos):
+    """Registra uma duração no histograma"""
+    chave = _chave(nome, rotulos)
+    with _lock:
+        histograma = _histogramas.get(chave)
+        if histograma is None:
+            histograma = _histogramas[chave] = {'baldes': [0] * len(LIMITES_HISTOGRAMA), 'soma': 0.0, 'total': 0}
+        for indice, limite in enumerate(LIMITES_HISTOGRAMA):
+            if segundos <= limite:
+                histograma['baldes'][indice] += 1
+        histograma['soma'] += segundos
+        histograma['total'] += 1
+
+@contextmanager
+def cronometrar(nome, **rotulos):
+    """Registra no histograma o tempo gasto dentro do bloco"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+
+def registrar_cache(cache, acerto):
+    incrementar('cache_consultas_total', cache=cache, resultado='acerto' if acerto else 'falha')
+
+def registrar_coletor(funcao):
+    """Registra uma função chamada a cada leitura, que devolve medidas atuais [(nome, rótulos, valor)]"""
+    with _lock:
+        if funcao not in _coletores:
+            _coletores.append(funcao)
+
+def _medidas():
+    with _lock:
+        coletores = list(_coletores)
+    medidas = {}
+    for coletor in coletores:
+        try:
+            for nome, rotulos, valor in coletor():
+                medidas[_chave(nome, rotulos)] = valor
+        except Exception as e:
+            print(f"Erro ao coletar métricas: {str(e)}")
+    return medidas
+
+def amostras():
+    """Todas as métricas como lista de (nome, rótulos, valor); histogramas viram _count e _sum"""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {chave: (histograma['total'], histograma['soma']) for chave, histograma in _histogramas.items()}
+
+    resultado = [(nome, dict(rotulos), valor) for (nome, rotulos), valor in contadores.items()]
+    for (nome, rotulos), (total, soma) in histogramas.items():
+        resultado.append((f"{nome}_count", dict(rotulos), total))
+        resultado.append((f"{nome}_sum", dict(rotulos), soma))
+    resultado.extend((nome, dict(rotulos), valor) for (nome, rotulos), valor in _medidas().items())
+    return resultado
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _formatar_rotulos(rotulos):
+    if not rotulos:
+        return ''
+    return '{' + ','.join(f'{chave}="{_escapar(valor)}"' for chave, valor in rotulos) + '}'
+
+def texto_prometheus():
+    """Métricas no formato de texto do Prometheus"""
+    with _lock:
+        contadores = dict(_contadores)
+        histogramas = {chave: {'baldes': list(h['baldes']), 'soma': h['soma'], 'total': h['total']}
+                       for chave, h in _histogramas.items()}
+    medidas = _medidas()
+
+    por_nome = {}
+    for (nome, rotulos), valor in list(contadores.items()) + list(medidas.items()):
+        por_nome.setdefault(nome, []).append((rotulos, valor))
+    for (nome, rotulos), histograma in histogramas.items():
+        por_nome.setdefault(nome, []).append((rotulos, histograma))
+
+    linhas = []
+    for nome in sorted(por_nome):
+        tipo, descricao = DESCRICOES.get(nome, ('untyped', nome))
+        completo = f"{PREFIXO}_{nome}"
+        linhas.append(f"# HELP {completo} {descricao}")
+        linhas.append(f"# TYPE {completo} {tipo}")
+        for rotulos, valor in sorted(por_nome[nome], key=lambda item: item[0]):
+            if isinstance(valor, dict):
+                for limite, quantidade in zip(LIMITES_HISTOGRAMA, valor['baldes']):
+                    linhas.append(f"{completo}_bucket{_formatar_rotulos(rotulos + (('le', str(limite)),))} {quantidade}")
+                linhas.append(f"{completo}_bucket{_formatar_rotulos(rotulos + (('le', '+Inf'),))} {valor['total']}")
+                linhas.append(f"{completo}_sum{_formatar_rotulos(rotulos)} {valor['soma']}")
+                linhas.append(f"{completo}_count{_formatar_rotulos(rotulos)} {valor['total']}")
+            else:
+                linhas.append(f"{completo}{_formatar_rotulos(rotulos)} {valor}")
+    return '\n'.join(linhas) + '\n'
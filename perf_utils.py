@@ -0,0 +1,134 @@
+# perf_utils.py
+import builtins
+import functools
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from metricas_utils import cronometrar, observar
+from sessao_utils import registrar_acesso
+
+# Perfil das execuções de página (tempo total e tempo gasto em imports), ligado por variável de ambiente
+PERFIL_ATIVO = os.getenv("PERFIL_PAGINAS", "").lower() in ("1", "true", "sim")
+
+# ======= INICIALIZAÇÃO ÚNICA POR PROCESSO =======
+
+# Os scripts de página rodam de novo a cada interação; o que só precisa acontecer uma vez por
+# processo (criar tabelas, preparar caminhos) fica registrado aqui
+_inicializados = {}
+_inicializados_lock = threading.RLock()
+
+def executar_uma_vez(funcao, *args):
+    """Executa funcao(*args) só na primeira chamada do processo e devolve sempre o mesmo resultado"""
+    chave = (funcao.__module__, funcao.__qualname__, args)
+    if chave in _inicializados:
+        return _inicializados[chave]
+    with _inicializados_lock:
+        # Se a função falhar, nada é registrado e a próxima chamada tenta de novo
+        if chave not in _inicializados:
+            _inicializados[chave] = funcao(*args)
+        return _inicializados[chave]
+
+# ======= PERFIL DE EXECUÇÃO DAS PÁGINAS =======
+
+# Execução medida na thread atual (cada sessão roda a sua página na própria thread). Com o perfil ligado, o
+# builtins.__import__ é trocado uma vez, ao carregar o módulo, e não a cada execução (não há o que restaurar
+# se a página falhar); imports de outras threads (agendador, servidor auxiliar, limpeza das sessões, workers
+# da própria página) passam direto e não entram na conta da página
+_local = threading.local()
+_importar_original = builtins.__import__
+MODULOS_NO_RELATORIO = 3  # Imports mais lentos mostrados em cada linha do perfil
+
+# Nome da página -> estatísticas acumuladas no processo
+_estatisticas = {}
+_estatisticas_lock = threading.Lock()
+
+def _importar_medido(nome, *args, **kwargs):
+    medicao = getattr(_local, 'medicao', None)
+    if medicao is None or medicao['importando'] or medicao['thread'] != threading.get_ident():
+        return _importar_original(nome, *args, **kwargs)
+
+    # Só o import mais externo é cronometrado; o tempo dele já inclui os imports internos
+    medicao['importando'] = True
+    modulos = len(sys.modules)
+    inicio = time.perf_counter()
+    try:
+        return _importar_original(nome, *args, **kwargs)
+    finally:
+        duracao = time.perf_counter() - inicio
+        medicao['importando'] = False
+        medicao['importacoes'] += duracao
+        medicao['modulos'] += len(sys.modules) - modulos
+        medicao['por_modulo'][nome] = medicao['por_modulo'].get(nome, 0.0) + duracao
+
+if PERFIL_ATIVO:
+    builtins.__import__ = _importar_medido
+
+def _registrar(pagina, total, importacoes, modulos, por_modulo):
+    with _estatisticas_lock:
+        estatistica = _estatisticas.setdefault(pagina, {
+            'pagina': pagina, 'execucoes': 0, 'primeira_s': total, 'total_s': 0.0,
+            'importacoes_s': 0.0, 'maximo_s': 0.0, 'modulos_carregados': 0
+        })
+        estatistica['execucoes'] += 1
+        estatistica['total_s'] += total
+        estatistica['importacoes_s'] += importacoes
+        estatistica['maximo_s'] = max(estatistica['maximo_s'], total)
+        estatistica['modulos_carregados'] += modulos
+        execucoes = estatistica['execucoes']
+
+    lentos = sorted(por_modulo.items(), key=lambda item: item[1], reverse=True)[:MODULOS_NO_RELATORIO]
+    detalhe = ", ".join(f"{nome} {duracao * 1000:.0f} ms" for nome, duracao in lentos if duracao >= 0.001)
+    print(f"[perfil] {pagina} (execução {execucoes}): {total * 1000:.0f} ms, "
+          f"imports {importacoes * 1000:.0f} ms{f' ({detalhe})' if detalhe else ''}, "
+          f"topo da página {(total - importacoes) * 1000:.0f} ms, {modulos} módulos novos")
+
+@contextmanager
+def medir_execucao(pagina):
+    """Mede uma execução da página (duração nas métricas; com o perfil ligado, também imports e módulos novos)"""
+    if not PERFIL_ATIVO or getattr(_local, 'medicao', None) is not None:
+        with cronometrar('pagina_execucao_seconds', pagina=pagina):
+            yield
+        return
+
+    _local.medicao = {'thread': threading.get_ident(), 'importando': False, 'importacoes': 0.0,
+                      'modulos': 0, 'por_modulo': {}}
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - inicio
+        medicao = _local.medicao
+        _local.medicao = None
+        observar('pagina_execucao_seconds', total, pagina=pagina)
+        _registrar(pagina, total, medicao['importacoes'], medicao['modulos'], medicao['por_modulo'])
+
+def resumo_perfil():
+    """Estatísticas por página desde o início do processo, com as médias por execução"""
+    with _estatisticas_lock:
+        estatisticas = [dict(estatistica) for estatistica in _estatisticas.values()]
+    for estatistica in estatisticas:
+        estatistica['media_s'] = estatistica['total_s'] / estatistica['execucoes']
+        estatistica['media_importacoes_s'] = estatistica['importacoes_s'] / estatistica['execucoes']
+    return estatisticas
+
+# ======= FRAGMENTOS =======
+
+# Trechos de página que rodam de novo sozinhos quando um widget deles muda. Os dados de que o trecho
+# depende entram como argumentos (o Streamlit repete os da última execução completa da página); o que
+# muda dados usados fora do trecho precisa terminar com st.rerun() para a página inteira rodar de novo.
+def fragmento(nome):
+    """st.fragment com a duração de cada execução do trecho nas métricas"""
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            # A execução isolada do trecho não passa pelo script principal, que marca o uso da sessão
+            registrar_acesso()
+            with cronometrar('fragmento_execucao_seconds', fragmento=nome):
+                return funcao(*args, **kwargs)
+        return st.fragment(executar)
+    return decorar
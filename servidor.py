@@ -0,0 +1,29 @@
+# servidor.py
+import os
+
+from streamlit.web import bootstrap
+
+from aquecimento_utils import iniciar_aquecimento, aguardar_aquecimento, TEMPO_MAXIMO_AQUECIMENTO
+from perf_utils import executar_uma_vez
+from servidor_utils import iniciar_servidor_auxiliar
+import api  # Registra as rotas /api no servidor auxiliar
+
+# Ponto de entrada do container: o servidor auxiliar (métricas, API de dados e /ready) sobe junto com o processo,
+# sem esperar a primeira sessão, e o Streamlit roda no mesmo processo, compartilhando caches e snapshots.
+# O Streamlit só abre a porta depois do aquecimento, então o health check do deploy só passa com os caches prontos.
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+if __name__ == "__main__":
+    executar_uma_vez(iniciar_servidor_auxiliar)
+    executar_uma_vez(iniciar_aquecimento)
+    if not aguardar_aquecimento():
+        print(f"[aquecimento] não terminou em {TEMPO_MAXIMO_AQUECIMENTO} s; o app abre e o aquecimento continua")
+
+    # Mesmas opções de "streamlit run --server.port=$PORT --server.address=0.0.0.0"
+    opcoes = {
+        'server_port': int(os.getenv("PORT", "8501")),
+        'server_address': "0.0.0.0",
+        'server_headless': True
+    }
+    bootstrap.load_config_options(opcoes)
+    bootstrap.run(os.path.join(RAIZ, "iniciar.py"), False, [], opcoes)
@@ -0,0 +1,63 @@
+# servidor_utils.py
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from metricas_utils import texto_prometheus
+
+# Servidor HTTP auxiliar do processo (métricas e outros endpoints), ao lado do Streamlit.
+# Porta 0 desliga o servidor; por padrão só atende conexões locais.
+SERVIDOR_AUXILIAR_PORTA = int(os.getenv("SERVIDOR_AUXILIAR_PORTA", "9090"))
+SERVIDOR_AUXILIAR_ENDERECO = os.getenv("SERVIDOR_AUXILIAR_ENDERECO", "127.0.0.1")
+
+# Caminho -> função(parametros, cabecalhos) que devolve (status, cabeçalhos, corpo em bytes)
+_rotas = {}
+
+def registrar_rota(caminho, funcao):
+    """Registra um endpoint GET no servidor auxiliar"""
+    _rotas[caminho] = funcao
+
+def _metricas(parametros, cabecalhos):
+    return 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}, texto_prometheus().encode('utf-8')
+
+registrar_rota('/metrics', _metricas)
+
+class _Tratador(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        pass
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        funcao = _rotas.get(partes.path)
+        try:
+            if funcao is None:
+                status, cabecalhos, corpo = 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'Not found\n'
+            else:
+                status, cabecalhos, corpo = funcao(parse_qs(partes.query), self.headers)
+        except Exception as e:
+            print(f"Erro no servidor auxiliar ({partes.path}): {str(e)}")
+            status, cabecalhos, corpo = 500, {'Content-Type': 'text/plain; charset=utf-8'}, b'Internal error\n'
+
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+
+def iniciar_servidor_auxiliar():
+    """Inicia o servidor auxiliar numa thread de fundo; chamar uma vez por processo"""
+    if not SERVIDOR_AUXILIAR_PORTA:
+        return None
+    try:
+        servidor = _Servidor((SERVIDOR_AUXILIAR_ENDERECO, SERVIDOR_AUXILIAR_PORTA), _Tratador)
+    except OSError as e:
+        # Outro processo na mesma máquina já usa a porta; o app segue sem o servidor auxiliar
+        print(f"Servidor auxiliar não iniciado em {SERVIDOR_AUXILIAR_ENDERECO}:{SERVIDOR_AUXILIAR_PORTA}: {str(e)}")
+        return None
+    threading.Thread(target=servidor.serve_forever, name="servidor-auxiliar", daemon=True).start()
+    return servidor
@@ -0,0 +1,167 @@
+# sessao_utils.py
+import os
+import sys
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from metricas_utils import incrementar, registrar_coletor
+
+# Memória das sessões: dados grandes que podem ser remontados (a partir dos caches do processo ou do banco)
+# são retirados das sessões paradas e recarregados pela página quando a sessão volta a ser usada
+TEMPO_OCIOSO_SESSAO = int(os.getenv("SESSAO_TEMPO_OCIOSO", "900"))  # Segundos sem uso até os dados serem despejados
+LIMITE_MEMORIA_SESSOES = int(os.getenv("SESSAO_LIMITE_MEMORIA_MB", "512")) * 1024 * 1024  # Soma de todas as sessões
+TEMPO_MINIMO_DESPEJO = 60  # Acima do limite, só sessões sem uso há pelo menos esse tempo perdem os dados
+TAMANHO_MINIMO_DESPEJO = 256 * 1024  # Entradas menores não compensam a recarga
+INTERVALO_LIMPEZA = 60  # Segundos entre verificações
+
+# Chaves declaradas pelas páginas: recarregáveis podem ser despejadas; compartilhadas apontam para
+# caches do processo (não ocupam memória própria da sessão) e ficam fora das contas
+_chaves_recarregaveis = set()
+_chaves_compartilhadas = set()
+
+# id da sessão -> referências fracas ao SessionState ('estado'), ao SafeSessionState da execução ('seguro')
+# e à thread que roda o script ('execucao'), e o instante do último uso ('acesso')
+_sessoes = {}
+_sessoes_lock = threading.Lock()
+_limpeza = None
+
+# id da sessão -> bytes de cada entrada, medidos na última limpeza. O /metrics e a página de métricas leem
+# só essas medidas: percorrer todas as sessões a cada coleta disputaria a trava do estado com as execuções
+_tamanhos_medidos = {}
+
+def registrar_chaves_sessao(recarregaveis=(), compartilhadas=()):
+    """Declara as chaves de st.session_state que a página sabe recarregar e as que só referenciam caches do processo"""
+    with _sessoes_lock:
+        _chaves_recarregaveis.update(recarregaveis)
+        _chaves_compartilhadas.update(compartilhadas)
+
+def registrar_acesso():
+    """Marca a sessão atual como em uso (chamada a cada execução do app)"""
+    ctx = get_script_run_ctx()
+    if ctx is None:
+        return
+    # O SafeSessionState (e a thread do script) muda a cada execução; o SessionState por baixo dele é o da
+    # sessão. As referências fracas deixam a sessão ser liberada normalmente quando o navegador fecha.
+    seguro = ctx.session_state
+    with _sessoes_lock:
+        _sessoes[ctx.session_id] = {
+            'estado': weakref.ref(seguro._state),
+            'seguro': weakref.ref(seguro),
+            'execucao': weakref.ref(threading.current_thread()),
+            'acesso': time.monotonic()
+        }
+
+def tamanho_objeto(objeto, vistos=None):
+    """Bytes aproximados de um valor (DataFrames pelo memory_usage; coleções somando os itens)"""
+    vistos = set() if vistos is None else vistos
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(index=True, deep=True).sum())
+    if isinstance(objeto, (pd.Series, pd.Index)):
+        return int(objeto.memory_usage(deep=True))
+    if isinstance(objeto, dict):
+        return sys.getsizeof(objeto) + sum(
+            tamanho_objeto(chave, vistos) + tamanho_objeto(valor, vistos) for chave, valor in objeto.items())
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return sys.getsizeof(objeto) + sum(tamanho_objeto(item, vistos) for item in objeto)
+    return sys.getsizeof(objeto)
+
+def _tamanhos_sessao(estado, seguro):
+    """Bytes de cada entrada da sessão (sem as compartilhadas), sob a trava do SafeSessionState"""
+    vistos = set()
+    with seguro._lock if seguro is not None else nullcontext():
+        return {chave: tamanho_objeto(valor, vistos) for chave, valor in estado.filtered_state.items()
+                if chave not in _chaves_compartilhadas}
+
+def _sessoes_vivas():
+    """[(id, estado, SafeSessionState, segundos sem uso)], descartando sessões já encerradas"""
+    agora = time.monotonic()
+    vivas = []
+    with _sessoes_lock:
+        for sessao_id, info in list(_sessoes.items()):
+            estado = info['estado']()
+            if estado is None:
+                del _sessoes[sessao_id]
+            else:
+                vivas.append((sessao_id, estado, info['seguro'](), agora - info['acesso']))
+    return vivas
+
+def despejar_sessao(sessao_id, tamanhos):
+    """Remove da sessão as entradas recarregáveis grandes; devolve as chaves removidas"""
+    # Sob a trava das sessões o registrar_acesso de uma execução nova espera: ou o despejo termina antes
+    # e a página vê as entradas faltando, ou a execução já aparece em andamento e a sessão fica intacta
+    with _sessoes_lock:
+        info = _sessoes.get(sessao_id)
+        estado = info['estado']() if info else None
+        execucao = info['execucao']() if info else None
+        if estado is None or (execucao is not None and execucao.is_alive()):
+            return 0
+
+        # A trava do SafeSessionState protege o estado de quem ainda o use fora da execução (ex.: widgets)
+        seguro = info['seguro']()
+        removidas = []
+        with seguro._lock if seguro is not None else nullcontext():
+            for chave in _chaves_recarregaveis:
+                if tamanhos.get(chave, 0) >= TAMANHO_MINIMO_DESPEJO and chave in estado:
+                    del estado[chave]
+                    removidas.append(chave)
+                    incrementar('sessao_despejos_total', chave=chave)
+    return removidas
+
+def limpar_sessoes():
+    """Despeja as sessões paradas há mais de TEMPO_OCIOSO_SESSAO e, se a soma passar do limite, as menos recentes"""
+    global _tamanhos_medidos
+    sessoes = [(sessao_id, ocioso, _tamanhos_sessao(estado, seguro))
+               for sessao_id, estado, seguro, ocioso in _sessoes_vivas()]
+    total = sum(sum(tamanhos.values()) for _, _, tamanhos in sessoes)
+
+    # Da sessão parada há mais tempo para a mais recente; sessões com o script rodando ficam de fora
+    for sessao_id, ocioso, tamanhos in sorted(sessoes, key=lambda item: item[1], reverse=True):
+        if ocioso > TEMPO_OCIOSO_SESSAO or (total > LIMITE_MEMORIA_SESSOES and ocioso > TEMPO_MINIMO_DESPEJO):
+            for chave in despejar_sessao(sessao_id, tamanhos):
+                total -= tamanhos.pop(chave)
+    _tamanhos_medidos = {sessao_id: tamanhos for sessao_id, _, tamanhos in sessoes}
+
+def resumo_sessoes():
+    """Uso de memória por sessão na última limpeza, da maior para a menor"""
+    resumo = []
+    for sessao_id, _, _, ocioso in _sessoes_vivas():
+        tamanhos = _tamanhos_medidos.get(sessao_id, {})
+        maiores = sorted(tamanhos.items(), key=lambda item: item[1], reverse=True)[:5]
+        resumo.append({
+            'sessao': sessao_id[:8],
+            'ociosa_s': int(ocioso),
+            'bytes': sum(tamanhos.values()),
+            'maiores_entradas': ', '.join(f"{chave} ({tamanho / 1024:.0f} KB)" for chave, tamanho in maiores)
+        })
+    return sorted(resumo, key=lambda item: item['bytes'], reverse=True)
+
+def _medidas_sessoes():
+    tamanhos_medidos = _tamanhos_medidos
+    total = sum(sum(tamanhos.values()) for tamanhos in tamanhos_medidos.values())
+    return [('sessoes', {}, len(tamanhos_medidos)), ('sessoes_bytes', {}, total)]
+
+registrar_coletor(_medidas_sessoes)
+
+def _loop_limpeza():
+    while True:
+        time.sleep(INTERVALO_LIMPEZA)
+        try:
+            limpar_sessoes()
+        except Exception as e:
+            print(f"Erro na limpeza de memória das sessões: {str(e)}")
+
+def iniciar_limpeza_sessoes():
+    """Inicia a thread que despeja os dados das sessões paradas; chamar uma vez por processo"""
+    global _limpeza
+    if _limpeza is None:
+        _limpeza = threading.Thread(target=_loop_limpeza, name="limpeza-sessoes", daemon=True)
+        _limpeza.start()
@@ -0,0 +1,40 @@
+# tests/test_db_utils.py
+# Histórico de status dos projetos num banco SQLite temporário
+import datetime
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_utils
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """db_utils usando um projetos.db vazio no diretório temporário"""
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.chdir(tmp_path)
+    db_utils.descartar_projetos()
+    db_utils.init_db()
+    yield
+    db_utils.descartar_projetos()
+
+def inserir(nome, data_projeto, status="Em andamento"):
+    db_utils.insert_project(nome, data_projeto, None, "", status, "", "", "", [])
+    projetos = db_utils.load_data()
+    return int(projetos.loc[projetos['nome'] == nome, 'id'].iloc[0])
+
+def test_id_de_projeto_excluido_nao_e_reaproveitado(banco):
+    hoje = datetime.date.today()
+    antigo = inserir("Antigo", hoje - datetime.timedelta(days=30))
+    excluido = inserir("Recente", hoje - datetime.timedelta(days=10))
+    db_utils.delete_project(excluido)
+
+    # A criação do novo projeto fica datada antes da exclusão do anterior
+    novo = inserir("Novo", hoje - datetime.timedelta(days=5), status="Concluído")
+
+    assert novo != excluido
+    status = db_utils.status_na_data(hoje)
+    assert set(status['projeto_id']) == {antigo, novo}
+    assert status.loc[status['projeto_id'] == novo, 'status'].iloc[0] == "Concluído"
@@ -0,0 +1,139 @@
+# tests/test_processar_dados_jira.py
+# Compara o processar_dados_jira vetorizado com o laço original (cópia abaixo) em tarefas sintéticas com
+# semente fixa, incluindo campos ausentes, horas com empate no arredondamento e prazos vencidos.
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jira_utils import processar_dados_jira, adicionar_colunas_temporais
+
+def processar_dados_jira_laco(dados_raw):
+    """Versão original, tarefa por tarefa (referência do comportamento)"""
+    if not dados_raw or 'issues' not in dados_raw:
+        return pd.DataFrame()
+
+    issues = dados_raw['issues']
+    dados_processados = []
+
+    for issue in issues:
+        issue_id = issue.get('key', 'N/A')
+        summary = issue.get('fields', {}).get('summary', 'Sem título')
+        status = issue.get('fields', {}).get('status', {}).get('name', 'Sem status')
+
+        assignee = "Não atribuído"
+        if issue.get('fields', {}).get('assignee'):
+            assignee = issue.get('fields', {}).get('assignee', {}).get('displayName', 'Não atribuído')
+
+        created = issue.get('fields', {}).get('created', None)
+        if created:
+            created = datetime.strptime(created.split('T')[0], "%Y-%m-%d")
+
+        updated = issue.get('fields', {}).get('updated', None)
+        if updated:
+            updated = datetime.strptime(updated.split('T')[0], "%Y-%m-%d")
+
+        due_date = issue.get('fields', {}).get('duedate', None)
+        if due_date:
+            due_date = datetime.strptime(due_date, "%Y-%m-%d")
+
+        hoje = datetime.now().date()
+        is_atrasada = False
+        dias_restantes = None
+
+        if due_date:
+            dias_restantes = (due_date.date() - hoje).days
+            is_atrasada = dias_restantes < 0 and status != 'Done' and status != 'Concluído'
+
+        priority = issue.get('fields', {}).get('priority', {}).get('name', 'Normal')
+
+        original_estimate = issue.get('fields', {}).get('timetracking', {}).get('originalEstimateSeconds', 0) or 0
+        time_spent = issue.get('fields', {}).get('timetracking', {}).get('timeSpentSeconds', 0) or 0
+
+        dados_processados.append({
+            'ID': issue_id,
+            'Resumo': summary,
+            'Status': status,
+            'Responsável': assignee,
+            'Criada': created,
+            'Atualizada': updated,
+            'Prazo': due_date,
+            'Dias Restantes': dias_restantes,
+            'Atrasada': is_atrasada,
+            'Prioridade': priority,
+            'Tempo Estimado (h)': round(original_estimate / 3600, 1) if original_estimate else 0,
+            'Tempo Gasto (h)': round(time_spent / 3600, 1) if time_spent else 0
+        })
+
+    return pd.DataFrame(dados_processados)
+
+def gerar_tarefas(total, semente):
+    """Tarefas com a variedade de formatos que o Jira devolve (campos faltando, nulos, horas quebradas)"""
+    rnd = random.Random(semente)
+    hoje = datetime.now()
+    issues = []
+    for indice in range(total):
+        criada = hoje - timedelta(days=rnd.randint(0, 400), minutes=rnd.randint(0, 1439))
+        campos = {
+            'status': {'name': rnd.choice(['To Do', 'In Progress', 'Done', 'Concluído'])} if rnd.random() < 0.95 else {},
+            'created': criada.strftime('%Y-%m-%dT%H:%M:%S.000-0300'),
+            'updated': (criada + timedelta(days=rnd.randint(0, 30))).strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+            'priority': {'name': rnd.choice(['High', 'Medium', 'Low'])} if rnd.random() < 0.9 else {},
+        }
+        if rnd.random() < 0.9:
+            campos['summary'] = f'Tarefa {indice}'
+        if rnd.random() < 0.8:
+            campos['assignee'] = rnd.choice([None, {'displayName': f'Pessoa {rnd.randint(1, 9)}'}, {}])
+        if rnd.random() < 0.7:
+            campos['duedate'] = (criada + timedelta(days=rnd.randint(-30, 90))).strftime('%Y-%m-%d')
+        elif rnd.random() < 0.5:
+            campos['duedate'] = None
+        if rnd.random() < 0.9:
+            # Múltiplos de 180 s caem em empates exatos de x.x5 h; os demais em valores quebrados
+            segundos = lambda: rnd.choice([0, None, rnd.randint(1, 400) * 180, rnd.randint(1, 200000)])
+            campos['timetracking'] = {'originalEstimateSeconds': segundos(), 'timeSpentSeconds': segundos()}
+        issue = {'id': str(10000 + indice), 'fields': campos}
+        if rnd.random() < 0.98:
+            issue['key'] = f'PROJ-{indice + 1}'
+        issues.append(issue)
+    return {'issues': issues, 'total': total}
+
+def normalizar(df):
+    """Mesmos tipos nas duas versões (categorias, float32 e NaT viram valores comparáveis)"""
+    df = df.copy()
+    for coluna in ['ID', 'Resumo', 'Status', 'Responsável', 'Prioridade']:
+        df[coluna] = df[coluna].astype(object)
+    for coluna in ['Criada', 'Atualizada', 'Prazo']:
+        df[coluna] = pd.to_datetime(df[coluna])
+    df['Dias Restantes'] = df['Dias Restantes'].astype('float64')
+    df['Atrasada'] = df['Atrasada'].astype(bool)
+    for coluna in ['Tempo Estimado (h)', 'Tempo Gasto (h)']:
+        df[coluna] = df[coluna].astype('float32')
+    return df
+
+@pytest.mark.parametrize('semente', [1, 7, 42, 2024])
+@pytest.mark.parametrize('total', [1, 50, 3000])
+def test_paridade_com_laco(total, semente):
+    dados = gerar_tarefas(total, semente)
+    esperado = normalizar(processar_dados_jira_laco(dados))
+    obtido = normalizar(adicionar_colunas_temporais(processar_dados_jira(dados)))
+    assert list(obtido.columns) == list(esperado.columns)
+    pd.testing.assert_frame_equal(obtido, esperado)
+
+def test_empates_no_arredondamento():
+    # 0.25 h e 0.35 h ficam abaixo/acima do empate em binário; o round() do Python decide cada um
+    segundos = [900, 1260, 2340, 5580, 9180, 18180]
+    dados = {'issues': [{'key': f'P-{i}', 'fields': {'timetracking': {'timeSpentSeconds': s}}}
+                        for i, s in enumerate(segundos)]}
+    obtido = processar_dados_jira(dados)['Tempo Gasto (h)']
+    assert np.array_equal(obtido.to_numpy(), np.array([round(s / 3600, 1) for s in segundos], dtype='float32'))
+
+@pytest.mark.parametrize('dados', [None, {}, {'issues': []}])
+def test_sem_tarefas(dados):
+    assert processar_dados_jira(dados).empty